@@ -33,60 +33,774 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Importar dependencias necesarias
+import os
+import threading
+import codecs
+import unicodedata
+import re
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import Any, Callable, Iterable, Iterator, Tuple
+import categorias
+from cache import ResponseCache
+from cassette import CassetteAdapter
+from series import DecodificadorSeries, Serie, decodificar_series
+from series_store import SeriesStore
+
+
+class SingleFlight:
+    """Agrupa peticiones idénticas concurrentes en una única ejecución
+    
+    La primera llamada con una clave ejecuta la función; las que llegan
+    mientras sigue en curso esperan y reciben el mismo resultado (o excepción).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_curso: Dict[str, Future] = {}
+        self.ejecutadas = 0
+        self.agrupadas = 0
+    
+    def ejecutar(self, clave: str, funcion: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Ejecuta funcion o espera a la ejecución en curso con la misma clave
+        Args:
+            clave: Identificador de la operación
+            funcion: Operación a ejecutar si no hay otra en curso
+            timeout: Segundos máximos que espera una llamada agrupada; al agotarse
+                lanza requests.exceptions.Timeout (la ejecución en curso continúa)
+        """
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._en_curso[clave] = futuro
+                self.ejecutadas += 1
+            else:
+                self.agrupadas += 1
+        
+        if not lider:
+            logger.info(f"Petición agrupada con otra en curso: {clave[:12]}")
+            try:
+                return futuro.result(timeout=timeout)
+            except FuturesTimeoutError:
+                raise requests.exceptions.Timeout(
+                    f"Tiempo agotado ({timeout:.1f}s) esperando la petición agrupada en curso"
+                )
+        
+        try:
+            resultado = funcion()
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+    
+    def estadisticas(self) -> Dict:
+        """Devuelve el número de ejecuciones reales y de llamadas agrupadas"""
+        with self._lock:
+            total = self.ejecutadas + self.agrupadas
+            return {
+                'ejecutadas': self.ejecutadas,
+                'agrupadas': self.agrupadas,
+                'en_curso': len(self._en_curso),
+                'ratio_agrupadas': round(self.agrupadas / total, 4) if total else 0.0
+            }
+
+
+class TokenBucket:
+    """Limitador de peticiones por cubo de fichas, compartido por todos los hilos
+    
+    Se reponen 'tasa' fichas por segundo hasta un máximo de 'rafaga'. Cada
+    petición consume una ficha y espera si no hay ninguna. Ante un 429 se pausa
+    a todos los llamantes durante el Retry-After y se reduce la tasa a la mitad;
+    después se recupera poco a poco hasta la tasa configurada.
+    """
+    
+    def __init__(self, tasa: float, rafaga: int):
+        if tasa <= 0 or rafaga < 1:
+            raise ValueError("La tasa debe ser positiva y la ráfaga al menos 1")
+        self.tasa_maxima = tasa
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self._fichas = float(rafaga)
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._lock = threading.Lock()
+        self.esperas = 0
+        self.penalizaciones = 0
+    
+    def _reponer(self, ahora: float):
+        self._fichas = min(self.rafaga, self._fichas + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+    
+    def adquirir(self, timeout: Optional[float] = None) -> bool:
+        """Consume una ficha, esperando lo necesario; False si se supera el timeout"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._reponer(ahora)
+                if ahora >= self._pausa_hasta and self._fichas >= 1:
+                    self._fichas -= 1
+                    return True
+                espera = max(self._pausa_hasta - ahora, (1 - self._fichas) / self.tasa)
+                self.esperas += 1
+            if limite is not None and time.monotonic() + espera > limite:
+                return False
+            time.sleep(espera)
+    
+    def penalizar(self, retry_after: Optional[float] = None):
+        """Aplica un 429: pausa global durante retry_after y reduce la tasa"""
+        with self._lock:
+            ahora = time.monotonic()
+            self._reponer(ahora)
+            self.penalizaciones += 1
+            self.tasa = max(self.tasa / 2, self.tasa_maxima / 16)
+            self._fichas = 0.0
+            if retry_after:
+                self._pausa_hasta = max(self._pausa_hasta, ahora + retry_after)
+        logger.warning(f"Límite de peticiones alcanzado: tasa reducida a {self.tasa:.2f}/s")
+    
+    def registrar_exito(self):
+        """Recupera la tasa de forma aditiva tras una respuesta correcta"""
+        with self._lock:
+            if self.tasa < self.tasa_maxima:
+                self.tasa = min(self.tasa_maxima, self.tasa + self.tasa_maxima / 20)
+    
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                'tasa_configurada': self.tasa_maxima,
+                'tasa_actual': round(self.tasa, 3),
+                'rafaga': self.rafaga,
+                'esperas': self.esperas,
+                'penalizaciones': self.penalizaciones
+            }
+
+
+class CircuitoAbiertoError(requests.exceptions.ConnectionError):
+    """El circuito hacia el INE está abierto y no se realizan peticiones"""
+
+
+class LimitadorAgotadoError(requests.exceptions.Timeout):
+    """No hubo turno en el limitador de peticiones dentro del tiempo disponible"""
+
+
+class CircuitBreaker:
+    """Corta las peticiones al INE tras varios fallos seguidos
+    
+    Estados: 'cerrado' (normal), 'abierto' (se rechazan las peticiones) y
+    'semiabierto' (pasado el tiempo de apertura se deja pasar una petición de
+    prueba; si tiene éxito el circuito se cierra y si falla vuelve a abrirse).
+    """
+    
+    def __init__(self, umbral_fallos: int = 5, tiempo_apertura: float = 60.0):
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_apertura = tiempo_apertura
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_desde: Optional[float] = None
+        self._prueba_en_curso = False
+    
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado()
+    
+    def _estado(self) -> str:
+        if self._abierto_desde is None:
+            return 'cerrado'
+        if time.monotonic() - self._abierto_desde >= self.tiempo_apertura:
+            return 'semiabierto'
+        return 'abierto'
+    
+    def permitir(self) -> bool:
+        """Indica si se puede realizar una petición ahora"""
+        with self._lock:
+            estado = self._estado()
+            if estado == 'cerrado':
+                return True
+            if estado == 'semiabierto' and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                logger.info("Circuito semiabierto: enviando petición de prueba al INE")
+                return True
+            return False
+    
+    def registrar_exito(self):
+        with self._lock:
+            if self._abierto_desde is not None:
+                logger.info("Circuito cerrado: el INE vuelve a responder")
+            self._fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+    
+    def registrar_fallo(self):
+        with self._lock:
+            self._fallos += 1
+            if self._prueba_en_curso or self._fallos >= self.umbral_fallos:
+                if self._abierto_desde is None or self._prueba_en_curso:
+                    logger.warning(f"Circuito abierto tras {self._fallos} fallos consecutivos")
+                self._abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+    
+    def liberar_prueba(self):
+        """Libera la petición de prueba que terminó sin registrar éxito ni fallo"""
+        with self._lock:
+            self._prueba_en_curso = False
+
+
 class INEApiClient:
     """Cliente para la API del INE"""
     
-    BASE_URL = "https://servicios.ine.es/wstempus/jsCache/ES"
-    
-    CATEGORIES = {
-        'provincias': {
-            'name': 'Datos por Provincia',
-            'url': 'https://servicios.ine.es/wstempus/js/ES/DATOS_TABLA/2855',
-            'default_params': {'nult': '4', 'det': '2'}
-        },
-        'municipios_habitantes': {
-            'name': 'Municipios por habitantes',
-            'url': 'https://servicios.ine.es/wstempus/js/ES/DATOS_TABLA/61399',
-            'default_params': {'nult': '4', 'det': '2'}
-        },
-        'censo_agrario': {
-            'name': 'Censo Agrario por Tamaño',
-            'url': 'https://servicios.ine.es/wstempus/js/ES/DATOS_TABLA/51156',
-            'default_params': {'nult': '4', 'det': '2'}
-        },
-        'tasa_empleo': {
-            'name': 'Tasa de Actividad, Paro y Empleo',
-            'url': 'https://servicios.ine.es/wstempus/jsCache/ES/DATOS_TABLA/3996',
-            'default_params': {'nult': '4', 'det': '2'}
-        },
-        'tasa_nacimientos': {
-            'name': 'Tasa de Nacimientos por Provincias',
-            'url': 'https://servicios.ine.es/wstempus/js/ES/DATOS_TABLA/6545',
-            'default_params': {'nult': '4', 'det': '2'}
-        },
-        'tasa_defunciones': {
-            'name': 'Tasa de Defunciones por Provincias',
-            'url': 'https://servicios.ine.es/wstempus/jsCache/ES/DATOS_TABLA/1482',
-            'default_params': {'nult': '4', 'det': '2'}
-        }
-    }
+    # Servidor de la API; INE_HOST permite apuntar a un servidor local (mock_server.py)
+    HOST = os.environ.get('INE_HOST', 'https://servicios.ine.es').rstrip('/')
+    BASE_URL = f"{HOST}/wstempus/jsCache/ES"
+    
+    # Entradas derivadas del registro declarativo de categorias.py
+    CATEGORIES = categorias.categorias_api(HOST)
+    
+    # Caché persistente de respuestas compartida por todas las llamadas
+    _cache = ResponseCache()
+    
+    # Agrupación de descargas idénticas simultáneas (a nivel de proceso)
+    _single_flight = SingleFlight()
+    
+    # Pool de conexiones compartido: un único adaptador (thread-safe) montado
+    # en una sesión ligera por hilo para no compartir cookies entre hilos
+    POOL_SIZE = int(os.environ.get('INE_POOL_SIZE', 10))
+    _adaptador: Optional[HTTPAdapter] = None
+    _adaptador_lock = threading.Lock()
+    _sesiones = threading.local()
     
     @staticmethod
-    def _get_session():
-        """Configura una sesión de requests con retry más robusto"""
-        session = requests.Session()
+    def _crear_adaptador(pool_size: int) -> HTTPAdapter:
+        """Crea el adaptador HTTP con retry y pool de conexiones persistentes"""
+        # Solo reintentos rápidos de conexión: los errores HTTP se reintentan en
+        # _peticion, que respeta el presupuesto de tiempo de cada llamada
         retry = Retry(
-            total=5,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "OPTIONS"],
-            respect_retry_after_header=True
+            total=2,
+            read=0,
+            status=0,
+            # Los 429/503 con Retry-After deben llegar a _peticion, que los
+            # reintenta dentro del presupuesto (urllib3 lanzaría MaxRetryError)
+            respect_retry_after_header=False,
+            raise_on_status=False,
+            backoff_factor=0.1,
+            allowed_methods=["HEAD", "GET", "OPTIONS"]
         )
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-        session.headers.update({'Accept': 'application/json'})
+        return HTTPAdapter(
+            max_retries=retry,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size
+        )
+    
+    @staticmethod
+    def _get_adaptador() -> HTTPAdapter:
+        """Devuelve el adaptador compartido, creándolo la primera vez
+        
+        Si INE_CASSETTE está definido se usa un cassette de grabación/reproducción
+        en el modo indicado por INE_CASSETTE_MODO ('replay' por defecto).
+        """
+        if INEApiClient._adaptador is None:
+            with INEApiClient._adaptador_lock:
+                if INEApiClient._adaptador is None:
+                    adaptador = INEApiClient._crear_adaptador(INEApiClient.POOL_SIZE)
+                    ruta_cassette = os.environ.get('INE_CASSETTE')
+                    if ruta_cassette:
+                        adaptador = CassetteAdapter(
+                            ruta_cassette, os.environ.get('INE_CASSETTE_MODO', 'replay'), adaptador
+                        )
+                    INEApiClient._adaptador = adaptador
+        return INEApiClient._adaptador
+    
+    @staticmethod
+    def usar_cassette(ruta: Optional[str], modo: str = 'replay'):
+        """Graba ('record') o reproduce ('replay') las respuestas de la API en un cassette
+        
+        Lo grabado se escribe al desactivar el cassette (usar_cassette(None) u otro
+        cassette) o, si no se desactiva, al terminar el proceso.
+        Args:
+            ruta: Fichero .json.gz del cassette; None vuelve al acceso normal a la red
+            modo: 'record' para grabar las respuestas reales, 'replay' para servirlas sin red
+        """
+        adaptador = INEApiClient._crear_adaptador(INEApiClient.POOL_SIZE)
+        if ruta is not None:
+            adaptador = CassetteAdapter(ruta, modo, adaptador)
+        with INEApiClient._adaptador_lock:
+            anterior = INEApiClient._adaptador
+            INEApiClient._adaptador = adaptador
+        if anterior is not None:
+            anterior.close()
+        if ruta is None:
+            logger.info("Cassette desactivado: acceso normal a la red")
+        else:
+            logger.info(f"Cassette {ruta} activado en modo {modo}")
+    
+    @staticmethod
+    def configurar_host(host: str):
+        """Cambia el servidor de la API en BASE_URL y en las URLs de CATEGORIES
+        Args:
+            host: Esquema y servidor, por ejemplo 'http://127.0.0.1:8765'
+        """
+        host = host.rstrip('/')
+        anterior = INEApiClient.HOST
+        INEApiClient.HOST = host
+        INEApiClient.BASE_URL = INEApiClient.BASE_URL.replace(anterior, host, 1)
+        for info in INEApiClient.CATEGORIES.values():
+            if info['url'].startswith(anterior):
+                info['url'] = host + info['url'][len(anterior):]
+        logger.info(f"Servidor de la API configurado: {host}")
+    
+    @staticmethod
+    def registrar_categoria(clave: str, info: Dict[str, Any]):
+        """Añade una categoría al registro (categorias.REGISTRO) y a CATEGORIES
+        Args:
+            clave: Identificador de la categoría
+            info: Entrada del registro (tabla, endpoint, reglas de las dimensiones...)
+        """
+        categorias.registrar(clave, info)
+        if info.get('tabla') is not None:
+            INEApiClient.CATEGORIES[clave] = categorias.entrada_api(clave, INEApiClient.HOST)
+        logger.info(f"Categoría {clave} registrada")
+    
+    @staticmethod
+    def _adaptador_real(adaptador: Optional[HTTPAdapter]) -> Optional[HTTPAdapter]:
+        """Adaptador con el pool de conexiones (el envuelto si hay un cassette activo)"""
+        return adaptador.real if isinstance(adaptador, CassetteAdapter) else adaptador
+    
+    @staticmethod
+    def configurar_pool(pool_size: int):
+        """Reconfigura el tamaño del pool de conexiones compartido
+        
+        Si hay un cassette activo se conserva y solo se sustituye su adaptador real.
+        """
+        if pool_size < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1")
+        with INEApiClient._adaptador_lock:
+            INEApiClient.POOL_SIZE = pool_size
+            nuevo = INEApiClient._crear_adaptador(pool_size)
+            if isinstance(INEApiClient._adaptador, CassetteAdapter):
+                anterior = INEApiClient._adaptador.cambiar_real(nuevo)
+            else:
+                anterior = INEApiClient._adaptador
+                INEApiClient._adaptador = nuevo
+        if anterior is not None:
+            anterior.close()
+        logger.info(f"Pool de conexiones reconfigurado con tamaño {pool_size}")
+
+    @staticmethod
+    def ampliar_pool(pool_size: int) -> bool:
+        """Amplía el pool del adaptador instalado sin sustituirlo
+
+        A diferencia de configurar_pool conserva el adaptador en uso (por ejemplo un
+        CassetteAdapter, cuyo adaptador real es el que se amplía).
+        Args:
+            pool_size: Número mínimo de conexiones por servidor
+        Returns:
+            False si el adaptador instalado no admite cambiar su pool
+        """
+        if pool_size < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1")
+        with INEApiClient._adaptador_lock:
+            adaptador = INEApiClient._adaptador
+            if adaptador is None:
+                # Aún no hay adaptador: se creará con el nuevo tamaño
+                INEApiClient.POOL_SIZE = max(INEApiClient.POOL_SIZE, pool_size)
+                return True
+            real = INEApiClient._adaptador_real(adaptador)
+            if type(real) is not HTTPAdapter:
+                logger.warning(
+                    f"El adaptador {type(real).__name__} no admite cambiar su pool; "
+                    f"se mantiene con tamaño {INEApiClient.POOL_SIZE}"
+                )
+                return False
+            if real._pool_maxsize >= pool_size:
+                return True
+            anterior = real.poolmanager
+            real.init_poolmanager(pool_size, pool_size, block=real._pool_block)
+            INEApiClient.POOL_SIZE = max(INEApiClient.POOL_SIZE, pool_size)
+        # Las conexiones en uso terminan su petición; las libres se cierran
+        anterior.clear()
+        logger.info(f"Pool de conexiones ampliado a tamaño {pool_size}")
+        return True
+
+    @staticmethod
+    def _get_session():
+        """Devuelve la sesión del hilo actual montada sobre el pool compartido"""
+        adaptador = INEApiClient._get_adaptador()
+        session = getattr(INEApiClient._sesiones, 'session', None)
+        if session is None or session.get_adapter('https://') is not adaptador:
+            session = requests.Session()
+            session.mount('http://', adaptador)
+            session.mount('https://', adaptador)
+            session.headers.update({'Accept': 'application/json'})
+            INEApiClient._sesiones.session = session
         return session
+    
+    @staticmethod
+    def estadisticas_conexiones() -> Dict:
+        """Devuelve métricas del pool: peticiones, conexiones abiertas y ratio de reutilización"""
+        adaptador = INEApiClient._adaptador_real(INEApiClient._adaptador)
+        peticiones = 0
+        conexiones = 0
+        if adaptador is not None:
+            pools = adaptador.poolmanager.pools
+            # keys() copia las claves bajo el lock del contenedor; un pool
+            # descartado entre tanto devuelve None
+            for clave in pools.keys():
+                pool = pools.get(clave)
+                if pool is not None:
+                    peticiones += pool.num_requests
+                    conexiones += pool.num_connections
+        ratio = 1 - conexiones / peticiones if peticiones else 0.0
+        return {
+            'pool_size': INEApiClient.POOL_SIZE,
+            'peticiones': peticiones,
+            'conexiones_nuevas': conexiones,
+            'ratio_reutilizacion': round(max(ratio, 0.0), 4)
+        }
+
+    # Presupuesto de tiempo por llamada y cobertura (hedging) entre js y jsCache
+    PRESUPUESTO_DEFECTO = float(os.environ.get('INE_PRESUPUESTO', 15))
+    RETARDO_COBERTURA_DEFECTO = 1.0
+    RETARDO_COBERTURA_MIN = 0.25
+    RETARDO_COBERTURA_MAX = 4.0
+    STATUS_REINTENTABLES = (429, 500, 502, 503, 504)
+    _latencias: Dict[str, deque] = {'js': deque(maxlen=100), 'jsCache': deque(maxlen=100)}
+    _latencias_lock = threading.Lock()
+    _circuito = CircuitBreaker(
+        umbral_fallos=int(os.environ.get('INE_CIRCUITO_FALLOS', 5)),
+        tiempo_apertura=float(os.environ.get('INE_CIRCUITO_APERTURA', 60))
+    )
+    # Limitador de peticiones compartido por todas las llamadas del proceso
+    _limitador = TokenBucket(
+        tasa=float(os.environ.get('INE_RPS', 5)),
+        rafaga=int(os.environ.get('INE_RAFAGA', 10))
+    )
+    _executor_cobertura = ThreadPoolExecutor(max_workers=16, thread_name_prefix='ine-cobertura')
+    
+    @staticmethod
+    def _endpoint(url: str) -> Optional[str]:
+        """Devuelve 'js' o 'jsCache' según el endpoint de la URL"""
+        if '/wstempus/jsCache/' in url:
+            return 'jsCache'
+        if '/wstempus/js/' in url:
+            return 'js'
+        return None
+    
+    @staticmethod
+    def _url_alternativa(url: str) -> Optional[str]:
+        """Intercambia el endpoint js por jsCache (y viceversa)"""
+        endpoint = INEApiClient._endpoint(url)
+        if endpoint == 'jsCache':
+            return url.replace('/wstempus/jsCache/', '/wstempus/js/', 1)
+        if endpoint == 'js':
+            return url.replace('/wstempus/js/', '/wstempus/jsCache/', 1)
+        return None
+    
+    @staticmethod
+    def _registrar_latencia(url: str, segundos: float):
+        endpoint = INEApiClient._endpoint(url)
+        if endpoint:
+            with INEApiClient._latencias_lock:
+                INEApiClient._latencias[endpoint].append(segundos)
+    
+    @staticmethod
+    def _percentil_latencia(endpoint: str, percentil: float) -> Optional[float]:
+        with INEApiClient._latencias_lock:
+            muestras = sorted(INEApiClient._latencias.get(endpoint, ()))
+        if len(muestras) < 5:
+            return None
+        return muestras[min(int(len(muestras) * percentil), len(muestras) - 1)]
+    
+    @staticmethod
+    def estadisticas_latencia() -> Dict:
+        """Devuelve p50/p95/p99 observados por endpoint"""
+        estadisticas = {}
+        for endpoint in INEApiClient._latencias:
+            estadisticas[endpoint] = {
+                'muestras': len(INEApiClient._latencias[endpoint]),
+                'p50': INEApiClient._percentil_latencia(endpoint, 0.50),
+                'p95': INEApiClient._percentil_latencia(endpoint, 0.95),
+                'p99': INEApiClient._percentil_latencia(endpoint, 0.99)
+            }
+        return estadisticas
+    
+    @staticmethod
+    def _ordenar_endpoints(url: str) -> List[str]:
+        """Ordena la URL y su alternativa según la latencia mediana observada"""
+        alternativa = INEApiClient._url_alternativa(url)
+        if alternativa is None:
+            return [url]
+        mediana = INEApiClient._percentil_latencia(INEApiClient._endpoint(url), 0.5)
+        mediana_alt = INEApiClient._percentil_latencia(INEApiClient._endpoint(alternativa), 0.5)
+        if mediana is not None and mediana_alt is not None and mediana_alt < mediana:
+            return [alternativa, url]
+        return [url, alternativa]
+    
+    @staticmethod
+    def _retardo_cobertura(url: str) -> float:
+        """Espera antes de lanzar la petición de cobertura: p95 del endpoint principal"""
+        p95 = INEApiClient._percentil_latencia(INEApiClient._endpoint(url), 0.95)
+        if p95 is None:
+            return INEApiClient.RETARDO_COBERTURA_DEFECTO
+        return min(max(p95, INEApiClient.RETARDO_COBERTURA_MIN), INEApiClient.RETARDO_COBERTURA_MAX)
+    
+    @staticmethod
+    def configurar_limite(peticiones_por_segundo: float, rafaga: int):
+        """Reconfigura el limitador de peticiones compartido"""
+        INEApiClient._limitador = TokenBucket(peticiones_por_segundo, rafaga)
+        logger.info(f"Limitador configurado a {peticiones_por_segundo}/s con ráfaga {rafaga}")
+    
+    @staticmethod
+    def estadisticas_limitador() -> Dict:
+        """Devuelve la tasa actual, esperas y penalizaciones del limitador"""
+        return INEApiClient._limitador.estadisticas()
+    
+    @staticmethod
+    def _adquirir_ficha(timeout: Optional[float] = None):
+        """Espera turno en el limitador o lanza LimitadorAgotadoError si no llega a tiempo"""
+        if not INEApiClient._limitador.adquirir(timeout):
+            raise LimitadorAgotadoError("Tiempo agotado esperando turno en el limitador de peticiones")
+    
+    @staticmethod
+    def _registrar_respuesta(response: requests.Response):
+        """Ajusta el limitador según la respuesta (429 con Retry-After o éxito)"""
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After', '')
+            INEApiClient._limitador.penalizar(float(retry_after) if retry_after.isdigit() else 1.0)
+        elif response.status_code < 400:
+            INEApiClient._limitador.registrar_exito()
+    
+    @staticmethod
+    def _get_medido(url: str, params: Optional[Dict], timeout: float,
+                    stream: bool = False) -> requests.Response:
+        """Realiza un GET con timeout y registra su latencia (hasta las cabeceras con stream)"""
+        limite = time.monotonic() + timeout
+        INEApiClient._adquirir_ficha(timeout)
+        inicio = time.monotonic()
+        restante = max(limite - inicio, 0.1)
+        response = INEApiClient._get_session().get(
+            url, params=params, stream=stream, timeout=(min(5.0, restante), restante)
+        )
+        INEApiClient._registrar_respuesta(response)
+        # Las respuestas fallidas no cuentan como latencia útil del endpoint
+        if response.status_code not in INEApiClient.STATUS_REINTENTABLES:
+            INEApiClient._registrar_latencia(url, time.monotonic() - inicio)
+        return response
+    
+    @staticmethod
+    def _liberar_error(response: requests.Response):
+        """Lee el cuerpo de una respuesta de error (un mensaje corto) y la cierra,
+        de modo que con stream su conexión vuelve al pool en lugar de cerrarse"""
+        try:
+            response.content
+        except requests.exceptions.RequestException:
+            pass
+        response.close()
+    
+    @staticmethod
+    def _cerrar_descartada(futuro: Future):
+        """Cierra la respuesta de una petición que no se usó para liberar su conexión"""
+        if not futuro.cancelled() and futuro.exception() is None:
+            futuro.result().close()
+    
+    @staticmethod
+    def _get_cubierto(url: str, params: Optional[Dict], timeout: float,
+                      stream: bool = False) -> requests.Response:
+        """Lanza la petición al endpoint más rápido y, si tarda más que su p95,
+        una segunda petición al endpoint alternativo; gana la primera respuesta válida
+        
+        Las respuestas descartadas se cierran, ya que con stream retienen su conexión.
+        """
+        urls = INEApiClient._ordenar_endpoints(url)
+        inicio = time.monotonic()
+        
+        def lanzar(url_destino: str) -> Future:
+            restante = max(timeout - (time.monotonic() - inicio), 0.1)
+            return INEApiClient._executor_cobertura.submit(
+                INEApiClient._get_medido, url_destino, params, restante, stream
+            )
+        
+        def descartar(futuros):
+            for futuro in futuros:
+                futuro.add_done_callback(INEApiClient._cerrar_descartada)
+        
+        pendientes = {lanzar(urls[0])}
+        hecho, _ = wait(pendientes, timeout=min(INEApiClient._retardo_cobertura(urls[0]), timeout))
+        cobertura_lanzada = len(urls) == 1
+        if not hecho and not cobertura_lanzada:
+            logger.info(f"Lanzando petición de cobertura a {urls[1]}")
+            pendientes.add(lanzar(urls[1]))
+            cobertura_lanzada = True
+        
+        ultimo_error: Optional[BaseException] = None
+        ultima_respuesta: Optional[requests.Response] = None
+        while pendientes:
+            restante = timeout - (time.monotonic() - inicio)
+            if restante <= 0:
+                break
+            hecho, pendientes = wait(pendientes, timeout=restante, return_when=FIRST_COMPLETED)
+            for futuro in hecho:
+                try:
+                    response = futuro.result()
+                except LimitadorAgotadoError as e:
+                    # Sin turno tampoco lo habrá para la cobertura; un error real
+                    # del INE tiene prioridad al informar
+                    ultimo_error = ultimo_error or e
+                    continue
+                except Exception as e:
+                    ultimo_error = e
+                else:
+                    if response.status_code not in INEApiClient.STATUS_REINTENTABLES:
+                        if ultima_respuesta is not None:
+                            INEApiClient._liberar_error(ultima_respuesta)
+                        descartar(pendientes | (hecho - {futuro}))
+                        return response
+                    if ultima_respuesta is not None:
+                        INEApiClient._liberar_error(ultima_respuesta)
+                    ultima_respuesta = response
+                # Si el endpoint principal falla antes del retardo, probar ya el alternativo
+                if not cobertura_lanzada:
+                    pendientes.add(lanzar(urls[1]))
+                    cobertura_lanzada = True
+        
+        descartar(pendientes)
+        if ultima_respuesta is not None:
+            return ultima_respuesta
+        if ultimo_error is not None:
+            raise ultimo_error
+        raise requests.exceptions.Timeout(f"Sin respuesta de {url} en {timeout:.1f}s")
+    
+    @staticmethod
+    def _peticion(url: str, params: Optional[Dict] = None,
+                  presupuesto: Optional[float] = None, stream: bool = False) -> requests.Response:
+        """GET con reintentos limitados por un presupuesto total de tiempo
+        Args:
+            url: URL a consultar
+            params: Parámetros de la consulta
+            presupuesto: Segundos máximos para la llamada completa, incluidos reintentos
+            stream: No leer el cuerpo; quien llama debe cerrar la respuesta
+        """
+        presupuesto = presupuesto or INEApiClient.PRESUPUESTO_DEFECTO
+        limite = time.monotonic() + presupuesto
+        intento = 0
+        while True:
+            if not INEApiClient._circuito.permitir():
+                raise CircuitoAbiertoError(
+                    "El servicio del INE no responde; se suspenden las peticiones temporalmente"
+                )
+            restante = limite - time.monotonic()
+            espera = 0.25 * (2 ** intento) * random.uniform(0.5, 1.0)
+            registrado = False
+            try:
+                try:
+                    response = INEApiClient._get_cubierto(url, params, restante, stream)
+                    if response.status_code not in INEApiClient.STATUS_REINTENTABLES:
+                        INEApiClient._circuito.registrar_exito()
+                        registrado = True
+                        return response
+                    retry_after = response.headers.get('Retry-After')
+                    if retry_after and retry_after.isdigit():
+                        espera = float(retry_after)
+                    motivo = f"HTTP {response.status_code}"
+                except LimitadorAgotadoError:
+                    # El turno se esperó con todo el presupuesto restante y el INE no
+                    # ha fallado: no cuenta para el circuito
+                    raise
+                except requests.exceptions.RequestException as e:
+                    response = None
+                    motivo = str(e)
+                
+                # Un 429 indica que el INE responde pero nos limita; lo gestiona el
+                # limitador (penalizar) y no cuenta como fallo para el circuito
+                if response is None or response.status_code != 429:
+                    INEApiClient._circuito.registrar_fallo()
+                    registrado = True
+            finally:
+                # Una excepción inesperada no debe dejar la prueba del circuito
+                # semiabierto en curso para siempre
+                if not registrado:
+                    INEApiClient._circuito.liberar_prueba()
+            intento += 1
+            if time.monotonic() + espera >= limite:
+                if response is not None:
+                    # Devolver la última respuesta para que la validación informe del error
+                    return response
+                raise requests.exceptions.Timeout(
+                    f"Presupuesto de {presupuesto:.1f}s agotado tras {intento} intentos: {motivo}"
+                )
+            logger.warning(f"Reintento {intento} de {url} en {espera:.2f}s ({motivo})")
+            if response is not None:
+                INEApiClient._liberar_error(response)
+            time.sleep(espera)
+    
+    @staticmethod
+    def _extracto(response: requests.Response, limite: int) -> str:
+        """Devuelve los primeros caracteres del cuerpo sin decodificar la respuesta completa"""
+        return response.content[:limite].decode(response.encoding or 'utf-8', errors='replace')
+
+    # Tokens relevantes para delimitar objetos: cadenas completas, comillas
+    # sin cerrar (la cadena continúa en el siguiente bloque) y llaves/corchetes
+    _TOKEN_JSON = re.compile(r'"(?:[^"\\]|\\.)*"|"|[{}\[\]]')
+
+    @staticmethod
+    def _iter_json_array(bloques: Iterable[str]) -> Iterator[Dict]:
+        """Parsea incrementalmente un array JSON de objetos, emitiendo un objeto cada vez
+        Args:
+            bloques: Fragmentos de texto consecutivos del cuerpo de la respuesta
+        """
+        buffer = ''
+        pos = 0
+        profundidad = 0
+        inicio_objeto = None
+        fin_array = False
+        
+        for bloque in bloques:
+            buffer += bloque
+            while not fin_array:
+                token = INEApiClient._TOKEN_JSON.search(buffer, pos)
+                if token is None:
+                    pos = len(buffer)
+                    break
+                texto = token.group()
+                if texto == '"':
+                    # Cadena incompleta: esperar al siguiente bloque
+                    pos = token.start()
+                    break
+                pos = token.end()
+                if texto[0] == '"':
+                    continue
+                if texto in '{[':
+                    profundidad += 1
+                    if profundidad == 2 and texto == '{':
+                        inicio_objeto = token.start()
+                    elif profundidad == 1 and texto == '{':
+                        raise ValueError("Se esperaba un array JSON de series")
+                    continue
+                profundidad -= 1
+                if profundidad == 1 and inicio_objeto is not None:
+                    yield json.loads(buffer[inicio_objeto:pos])
+                    # Descartar lo ya procesado para acotar la memoria
+                    buffer = buffer[pos:]
+                    pos = 0
+                    inicio_objeto = None
+                elif profundidad == 0:
+                    fin_array = True
+            if inicio_objeto is None and not fin_array:
+                buffer = buffer[pos:]
+                pos = 0
+        
+        if not fin_array:
+            raise ValueError("El array JSON de la respuesta está incompleto")
 
     @staticmethod
     def _validate_json_response(response: requests.Response) -> Dict:
@@ -101,52 +815,50 @@ class INEApiClient:
                 logger.warning(f"URL: {response.url}")
                 logger.warning(f"Status Code: {response.status_code}")
                 logger.warning(f"Headers: {dict(response.headers)}")
-                logger.warning(f"Contenido: {response.text[:500]}...")
-                if response.text.strip().startswith('La operación indicada no existe'):
-                    raise ValueError(f"La operación o tabla indicada no existe: {response.text}")
+                logger.warning(f"Contenido: {INEApiClient._extracto(response, 500)}...")
+                if INEApiClient._extracto(response, 500).strip().startswith('La operación indicada no existe'):
+                    raise ValueError(f"La operación o tabla indicada no existe: {INEApiClient._extracto(response, 500)}")
             
             # Loguear respuesta raw para debugging
             logger.info(f"URL consultada: {response.url}")
             logger.info(f"Status code: {response.status_code}")
-            logger.info(f"Respuesta raw de la API: {response.text[:1000]}...")
+            logger.debug(f"Respuesta raw de la API: {INEApiClient._extracto(response, 1000)}...")
             
             data = response.json()
             if not isinstance(data, (list, dict)):
                 error_msg = "La respuesta no tiene un formato JSON válido"
-                logger.error(f"{error_msg}. Contenido: {response.text[:500]}...")
+                logger.error(f"{error_msg}. Contenido: {INEApiClient._extracto(response, 500)}...")
                 raise ValueError(error_msg)
             return data
             
         except requests.exceptions.JSONDecodeError as e:
             error_msg = f"Error al decodificar JSON: {str(e)}"
             logger.error(f"{error_msg}. URL: {response.url}")
-            logger.error(f"Contenido: {response.text[:500]}...")
+            logger.error(f"Contenido: {INEApiClient._extracto(response, 500)}...")
             raise ValueError(error_msg)
         except requests.exceptions.HTTPError as e:
             error_msg = f"Error en la solicitud HTTP: {response.status_code} - {str(e)}"
             logger.error(f"{error_msg}. URL: {response.url}")
-            logger.error(f"Contenido: {response.text[:500]}...")
+            logger.error(f"Contenido: {INEApiClient._extracto(response, 500)}...")
             raise ValueError(error_msg)
         except Exception as e:
             error_msg = f"Error inesperado al procesar la respuesta: {str(e)}"
             logger.error(f"{error_msg}. URL: {response.url}")
-            logger.error(f"Contenido: {response.text[:500]}...")
+            logger.error(f"Contenido: {INEApiClient._extracto(response, 500)}...")
             raise ValueError(error_msg)
     
     @staticmethod
     def _validar_operacion(operacion: Dict) -> bool:
         """Valida si una operación tiene los campos mínimos necesarios"""
-        logger.info(f"Validando operación: {json.dumps(operacion, indent=2)}")
-        
         # Validar ID
         if not isinstance(operacion.get('Id'), (int, str)) and not isinstance(operacion.get('id'), (int, str)):
-            logger.warning(f"Operación sin ID válido: {json.dumps(operacion, indent=2)}")
+            logger.warning(f"Operación sin ID válido: {operacion}")
             return False
         
         # Solo requerimos el nombre como campo obligatorio
         nombre = operacion.get('Nombre') or operacion.get('nombre')
         if not nombre:
-            logger.warning(f"Operación sin nombre válido: {json.dumps(operacion, indent=2)}")
+            logger.warning(f"Operación sin nombre válido: {operacion}")
             return False
             
         # Normalizar el campo nombre
@@ -155,41 +867,49 @@ class INEApiClient:
         # Agregar valores por defecto para campos faltantes
         if 'Periodicidad' not in operacion and 'periodicidad' not in operacion:
             operacion['Periodicidad'] = 'No especificada'
-            logger.info(f"Agregando periodicidad por defecto para operación: {nombre}")
             
         if 'Codigo' not in operacion and 'codigo' not in operacion:
             operacion['Codigo'] = 'N/A'
-            logger.info(f"Agregando código por defecto para operación: {nombre}")
             
-        logger.info(f"Operación válida encontrada: {nombre}")
         return True
 
+    @staticmethod
+    def normalizar_texto(texto: str) -> str:
+        """Pasa a minúsculas y elimina tildes y diéresis para comparar sin acentos"""
+        descompuesto = unicodedata.normalize('NFKD', texto.lower())
+        return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+    PALABRAS_CLAVE_DEMOGRAFICAS = [
+        'población', 'demografía', 'censo', 'nacimientos',
+        'defunciones', 'matrimonios', 'migraciones', 'padrón',
+        'habitantes', 'residentes', 'demográfico', 'demográfica'
+    ]
+    
+    # Expresión precompilada sobre las palabras clave sin acentos
+    _PATRON_DEMOGRAFICO = re.compile('|'.join(
+        re.escape(''.join(c for c in unicodedata.normalize('NFKD', palabra)
+                          if not unicodedata.combining(c)))
+        for palabra in PALABRAS_CLAVE_DEMOGRAFICAS
+    ))
+
     @staticmethod
     def _es_operacion_demografica(operacion: Dict) -> bool:
         """Determina si una operación está relacionada con datos demográficos"""
-        palabras_clave = [
-            'población', 'demografía', 'censo', 'nacimientos',
-            'defunciones', 'matrimonios', 'migraciones', 'padrón',
-            'habitantes', 'residentes', 'demográfico', 'demográfica'
-        ]
-        
         nombre = operacion.get('Nombre') or operacion.get('nombre')
         if not nombre:
             return False
             
-        nombre = nombre.lower()
-        return any(palabra in nombre for palabra in palabras_clave)
+        return INEApiClient._PATRON_DEMOGRAFICO.search(INEApiClient.normalizar_texto(nombre)) is not None
 
     @staticmethod
     def get_operaciones() -> List[Dict]:
         """Obtiene lista de operaciones estadísticas demográficas"""
         try:
-            session = INEApiClient._get_session()
             url = f"{INEApiClient.BASE_URL}/OPERACIONES_DISPONIBLES"
             params = {'geo': '1', 'det': '2'}
             logger.info(f"Consultando operaciones en: {url}")
             
-            response = session.get(url, params=params)
+            response = INEApiClient._peticion(url, params)
             data = INEApiClient._validate_json_response(response)
             
             if not isinstance(data, list):
@@ -207,7 +927,6 @@ class INEApiClient:
                 if INEApiClient._validar_operacion(op) and INEApiClient._es_operacion_demografica(op):
                     op['id'] = op.get('Id') or op.get('id')
                     operaciones_procesadas.append(op)
-                    logger.debug(f"Operación válida agregada: {op.get('Nombre')}")
             
             logger.info(f"Operaciones válidas encontradas: {len(operaciones_procesadas)}")
             
@@ -223,31 +942,43 @@ class INEApiClient:
             logger.error(error_msg)
             raise ValueError(error_msg)
     
+    # Las tablas de una operación cambian muy poco
+    TTL_TABLAS = 24 * 3600
+    
     @staticmethod
-    def get_tablas_operacion(operacion_id: str) -> List[Dict]:
-        """Obtiene tablas de una operación específica"""
+    def get_tablas_operacion(operacion_id: str, usar_cache: bool = True) -> List[Dict]:
+        """Obtiene tablas de una operación específica
+        Args:
+            operacion_id: Identificador de la operación
+            usar_cache: Si es False se ignora la caché en disco y se consulta la API
+        """
         try:
             if not operacion_id:
                 error_msg = "No se proporcionó el ID de la operación"
                 logger.error(error_msg)
                 raise ValueError(error_msg)
                 
-            session = INEApiClient._get_session()
-            
             # Intentar primero con el endpoint operaciones_tabla
             url = f"{INEApiClient.BASE_URL}/TABLAS_OPERACION/{operacion_id}"
             params = {'geo': '1'}
+            
+            # La respuesta final (de cualquiera de los dos endpoints) se cachea bajo la URL principal
+            if usar_cache:
+                tablas_cache = INEApiClient._cache.get(url, ttl=INEApiClient.TTL_TABLAS)
+                if tablas_cache is not None:
+                    return tablas_cache
+            
             logger.info(f"Consultando tablas para operación {operacion_id} en: {url}")
             
             try:
-                response = session.get(url)
+                response = INEApiClient._peticion(url)
                 
                 # Si la respuesta es texto plano, puede ser un error
                 if response.headers.get('content-type', '').startswith('text/plain'):
                     # Intentar con el endpoint alternativo
                     url_alt = f"{INEApiClient.BASE_URL}/variables/{operacion_id}"
                     logger.info(f"Intentando endpoint alternativo: {url_alt}")
-                    response = session.get(url_alt)
+                    response = INEApiClient._peticion(url_alt)
             
             except requests.exceptions.RequestException as e:
                 logger.error(f"Error en la solicitud HTTP: {str(e)}")
@@ -273,7 +1004,12 @@ class INEApiClient:
                 if isinstance(tabla, dict) and tabla.get('nombre'):
                     tablas_procesadas.append(tabla)
                     
-            return sorted(tablas_procesadas, key=lambda x: x.get('nombre', '').lower())
+            tablas_procesadas = sorted(tablas_procesadas, key=lambda x: x.get('nombre', '').lower())
+            try:
+                INEApiClient._cache.set(url, None, tablas_procesadas)
+            except OSError as e:
+                logger.warning(f"No se pudo guardar la respuesta en caché: {str(e)}")
+            return tablas_procesadas
             
         except Exception as e:
             error_msg = f"Error al obtener tablas de la operación {operacion_id}: {str(e)}"
@@ -281,64 +1017,494 @@ class INEApiClient:
             raise ValueError(error_msg)
     
     @staticmethod
-    def get_datos_tabla(categoria: str = "demografia") -> Dict:
-        """Obtiene datos según la categoría especificada
+    def get_tablas_operaciones(operacion_ids: Iterable[str], max_workers: int = 4,
+                               usar_cache: bool = True) -> Tuple[Dict[str, List[Dict]], Dict[str, str]]:
+        """Obtiene las tablas de varias operaciones en paralelo
+        
+        Un fallo en una operación no interrumpe el lote: se informa en el
+        diccionario de errores y el resto de operaciones continúa.
         Args:
-            categoria: Nombre de la categoría (por defecto 'demografia')
+            operacion_ids: Identificadores de las operaciones
+            max_workers: Número máximo de operaciones consultadas a la vez
+            usar_cache: Si es False se ignora la caché en disco
+        Returns:
+            Tupla (tablas por operación, mensaje de error por operación fallida)
         """
+        if max_workers < 1:
+            raise ValueError("El número de hilos debe ser al menos 1")
+        
+        # Sin duplicados y conservando el orden de entrada
+        ids = [str(i) for i in dict.fromkeys(operacion_ids) if i not in (None, '')]
+        tablas: Dict[str, List[Dict]] = {}
+        errores: Dict[str, str] = {}
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ine-tablas') as executor:
+            futuros = {
+                executor.submit(INEApiClient.get_tablas_operacion, operacion_id, usar_cache): operacion_id
+                for operacion_id in ids
+            }
+            for futuro in as_completed(futuros):
+                operacion_id = futuros[futuro]
+                try:
+                    tablas[operacion_id] = futuro.result()
+                except Exception as e:
+                    errores[operacion_id] = str(e)
+        
+        logger.info(
+            f"Tablas obtenidas para {len(tablas)} de {len(ids)} operaciones "
+            f"({len(errores)} con error)"
+        )
+        return {i: tablas[i] for i in ids if i in tablas}, errores
+    
+    # Los metadatos de las tablas (grupos y valores) apenas cambian
+    TTL_METADATOS = 30 * 24 * 3600
+    
+    @staticmethod
+    def _get_json_cacheado(url: str, params: Optional[Dict] = None, ttl: Optional[float] = None):
+        """Obtiene una respuesta JSON validada, usando la caché en disco si está vigente"""
+        entrada = INEApiClient._cache.get_entrada(url, params)
+        if entrada is not None and (ttl is None or time.time() - entrada[1] <= ttl):
+            return entrada[0]
         try:
-            if categoria not in INEApiClient.CATEGORIES:
-                raise ValueError(f"Categoría no válida: {categoria}")
-                
-            category_info = INEApiClient.CATEGORIES[categoria]
-            url = category_info['url']
-            params = category_info['default_params'].copy()
-            
-            # Aplicar filtro de Teruel para censo agrario
-            if categoria == 'censo_agrario':
-                params['name'] = 'Teruel'
-                logger.info(f"Aplicando filtro para datos de Teruel en {categoria}")
-            
-            logger.info(f"Consultando datos de {category_info['name']} en: {url}")
+            return INEApiClient._single_flight.ejecutar(
+                ResponseCache.clave(url, params),
+                lambda: INEApiClient._get_json_red(url, params)
+            )
+        except ValueError:
+            if entrada is None:
+                raise
+            logger.warning(f"Usando copia caducada de {url} por error en la API")
+            return entrada[0]
+    
+    @staticmethod
+    def _get_json_red(url: str, params: Optional[Dict] = None):
+        """Descarga una respuesta JSON validada y la guarda en caché"""
+        try:
+            response = INEApiClient._peticion(url, params)
+        except requests.exceptions.RequestException as e:
+            raise ValueError(f"Error al conectar con el servidor: {str(e)}")
+        if response.headers.get('content-type', '').startswith('text/plain'):
+            raise ValueError(INEApiClient._extracto(response, 500).strip())
+        datos = INEApiClient._validate_json_response(response)
+        try:
+            INEApiClient._cache.set(url, params, datos)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la respuesta en caché: {str(e)}")
+        return datos
+    
+    # Metadatos ya descargados en este proceso (URL DATOS_TABLA -> grupos con sus valores)
+    _metadatos_tablas: Dict[str, List[Dict]] = {}
+    
+    @staticmethod
+    def _metadatos_tabla(url_tabla: str) -> List[Dict]:
+        """Grupos de una tabla (GRUPOS_TABLA) con sus valores (VALORES_GRUPOSTABLA)
+        
+        Se descargan una vez por proceso y se guardan en la caché en disco con
+        TTL_METADATOS.
+        Args:
+            url_tabla: URL DATOS_TABLA de la tabla
+        Returns:
+            Lista de grupos (Id, Nombre) con la lista de sus valores en 'valores'
+        """
+        metadatos = INEApiClient._metadatos_tablas.get(url_tabla)
+        if metadatos is None:
+            base, _, id_tabla = url_tabla.rpartition('/DATOS_TABLA/')
+            grupos = INEApiClient._get_json_cacheado(
+                f"{base}/GRUPOS_TABLA/{id_tabla}", ttl=INEApiClient.TTL_METADATOS
+            )
+            metadatos = []
+            for grupo in grupos:
+                valores = INEApiClient._get_json_cacheado(
+                    f"{base}/VALORES_GRUPOSTABLA/{id_tabla}/{grupo.get('Id')}",
+                    ttl=INEApiClient.TTL_METADATOS
+                )
+                metadatos.append(dict(grupo, valores=valores))
+            INEApiClient._metadatos_tablas[url_tabla] = metadatos
+        return metadatos
+    
+    @staticmethod
+    def get_variables_tabla(categoria: str) -> Dict[str, int]:
+        """Variables de la tabla de una categoría a partir de sus metadatos
+        
+        Con ellas DataProcessor.procesar_datos etiqueta por Id las series que
+        traen MetaData (tip=M) en lugar de partir su Nombre.
+        Args:
+            categoria: Nombre de la categoría
+        Returns:
+            Diccionario nombre de variable (grupo) -> FK_Variable; vacío si no
+            se pudieron obtener los metadatos
+        """
+        if categoria not in INEApiClient.CATEGORIES:
+            raise ValueError(f"Categoría no válida: {categoria}")
+        url = INEApiClient.CATEGORIES[categoria]['url']
+        try:
+            grupos = INEApiClient._metadatos_tabla(url)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"No se pudieron obtener las variables de {categoria}: {str(e)}")
+            return {}
+        variables = {}
+        for grupo in grupos:
+            fks = {valor.get('Fk_Variable', valor.get('FK_Variable')) for valor in grupo['valores']}
+            fks.discard(None)
+            # Los grupos que mezclan variables no identifican una dimensión
+            if len(fks) == 1:
+                variables[grupo.get('Nombre', '')] = fks.pop()
+        return variables
+    
+    @staticmethod
+    def _resolver_filtro_tv(url_tabla: str, nombre_valor: str) -> Optional[str]:
+        """Resuelve el filtro tv=variable:valor de una tabla a partir de sus metadatos
+        Args:
+            url_tabla: URL DATOS_TABLA de la tabla
+            nombre_valor: Nombre del valor buscado (por ejemplo 'Teruel')
+        Returns:
+            Cadena 'id_variable:id_valor' o None si no se encuentra
+        """
+        id_tabla = url_tabla.rpartition('/DATOS_TABLA/')[2]
+        buscado = nombre_valor.strip().lower()
+        try:
+            for grupo in INEApiClient._metadatos_tabla(url_tabla):
+                for valor in grupo['valores']:
+                    if str(valor.get('Nombre', '')).strip().lower() == buscado:
+                        return f"{valor.get('Fk_Variable')}:{valor.get('Id')}"
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"No se pudieron resolver los metadatos de la tabla {id_tabla}: {str(e)}")
+            return None
+        logger.warning(f"Valor '{nombre_valor}' no encontrado en los metadatos de la tabla {id_tabla}")
+        return None
+    
+    @staticmethod
+    def _preparar_consulta(categoria: str):
+        """Construye la URL y los parámetros de una categoría
+        Returns:
+            Tupla (url, params, filtro local) donde el filtro local es el prefijo de
+            Nombre a aplicar en cliente cuando no se pudo filtrar en el servidor
+        """
+        if categoria not in INEApiClient.CATEGORIES:
+            raise ValueError(f"Categoría no válida: {categoria}")
+        
+        category_info = INEApiClient.CATEGORIES[categoria]
+        url = category_info['url']
+        params = category_info['default_params'].copy()
+        filtro_local = None
+        
+        provincia = category_info.get('filtro_provincia')
+        if provincia:
+            filtro_tv = INEApiClient._resolver_filtro_tv(url, provincia)
+            if filtro_tv:
+                params['tv'] = filtro_tv
+                logger.info(f"Filtrando {categoria} en el servidor para {provincia} (tv={filtro_tv})")
+            else:
+                filtro_local = provincia
+                logger.info(f"Filtrando {categoria} en cliente para {provincia}")
+        
+        return url, params, filtro_local
+    
+    @staticmethod
+    def _consulta_cache(categoria: str, params_extra: Optional[Dict] = None) -> Tuple[str, Dict]:
+        """URL y parámetros con los que se guardan en caché los datos de una categoría
+        
+        No requieren red: el filtro de provincia entra por su nombre y no por el
+        tv que _preparar_consulta resuelve con los metadatos de la tabla, de modo
+        que la caché se consulta antes de cualquier petición.
+        """
+        if categoria not in INEApiClient.CATEGORIES:
+            raise ValueError(f"Categoría no válida: {categoria}")
+        category_info = INEApiClient.CATEGORIES[categoria]
+        params = category_info['default_params'].copy()
+        if category_info.get('filtro_provincia'):
+            params['_provincia'] = category_info['filtro_provincia']
+        INEApiClient._aplicar_params_extra(params, params_extra)
+        return category_info['url'], params
+    
+    @staticmethod
+    def _aplicar_params_extra(params: Dict, params_extra: Optional[Dict]):
+        """Añade los parámetros adicionales; 'date' descarta el 'nult' por defecto"""
+        if params_extra:
+            if 'date' in params_extra:
+                params.pop('nult', None)
+            params.update(params_extra)
+    
+    @staticmethod
+    def estadisticas_coalescencia() -> Dict:
+        """Devuelve cuántas descargas se ejecutaron y cuántas se agruparon con otra en curso"""
+        return INEApiClient._single_flight.estadisticas()
+    
+    @staticmethod
+    def _descargar_datos(url: str, params: Dict, filtro_local: Optional[str] = None,
+                         presupuesto: Optional[float] = None) -> List[Dict]:
+        """Descarga y valida la lista de series de una tabla (puede estar vacía)
+        
+        Las llamadas concurrentes con la misma URL, parámetros y filtro comparten
+        una única descarga.
+        """
+        clave = ResponseCache.clave(url, dict(params, _filtro_local=filtro_local or ''))
+        presupuesto = presupuesto or INEApiClient.PRESUPUESTO_DEFECTO
+        try:
+            # Quien se agrupa espera como mucho su propio presupuesto
+            return INEApiClient._single_flight.ejecutar(
+                clave, lambda: INEApiClient._descargar_datos_red(url, params, filtro_local, presupuesto),
+                timeout=presupuesto
+            )
+        except requests.exceptions.Timeout as e:
+            raise ValueError(f"Error al conectar con el servidor: {str(e)}")
+    
+    @staticmethod
+    def _descargar_datos_red(url: str, params: Dict, filtro_local: Optional[str] = None,
+                             presupuesto: Optional[float] = None) -> List[Dict]:
+        try:
+            response = INEApiClient._peticion(url, params, presupuesto)
             
-            session = INEApiClient._get_session()
-            try:
-                response = session.get(url, params=params)
-                
-                if response.headers.get('content-type', '').startswith('text/plain'):
-                    error_msg = response.text.strip()
-                    raise ValueError(error_msg)
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error en la solicitud HTTP: {str(e)}")
-                raise ValueError(f"Error al conectar con el servidor: {str(e)}")
+            if response.headers.get('content-type', '').startswith('text/plain'):
+                error_msg = response.text.strip()
+                raise ValueError(error_msg)
                 
-            data = INEApiClient._validate_json_response(response)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error en la solicitud HTTP: {str(e)}")
+            raise ValueError(f"Error al conectar con el servidor: {str(e)}")
             
-            if not data:
-                error_msg = "No se encontraron datos"
-                logger.warning(error_msg)
-                raise ValueError(error_msg)
+        data = INEApiClient._validate_json_response(response)
+        
+        # Validación detallada de la estructura de datos
+        if not isinstance(data, list):
+            error_msg = f"Formato de datos inválido. Se esperaba una lista, se recibió: {type(data)}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        
+        # Log básico de la estructura de datos
+        logger.info(f"Total de registros recibidos: {len(data)}")
+        
+        # Filtrado en cliente solo si no se pudo filtrar en el servidor
+        if filtro_local:
+            data = [d for d in data if isinstance(d, dict) and 
+                   d.get('Nombre', '').startswith(filtro_local)]
+            logger.info(f"Datos filtrados de {filtro_local}: {len(data)} registros")
+        
+        return data
+    
+    # Refrescos en segundo plano (stale-while-revalidate) y antigüedad de los datos servidos
+    _executor_refresco = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ine-refresco')
+    _refrescos_en_curso: set = set()
+    _refrescos_lock = threading.Lock()
+    # Momento de guardado de los datos servidos, por clave de caché de la consulta
+    _guardado_por_consulta: Dict[str, float] = {}
+    
+    @staticmethod
+    def _descargar_y_cachear(categoria: str, params_extra: Optional[Dict] = None,
+                             presupuesto: Optional[float] = None) -> Tuple[List[Dict], float]:
+        """Descarga la tabla de una categoría, exige que tenga datos y la guarda en caché
+        Returns:
+            Tupla (datos, timestamp de guardado en caché)
+        """
+        url, params, filtro_local = INEApiClient._preparar_consulta(categoria)
+        INEApiClient._aplicar_params_extra(params, params_extra)
+        logger.info(f"Consultando datos de {INEApiClient.CATEGORIES[categoria]['name']} en: {url}")
+        data = INEApiClient._descargar_datos(url, params, filtro_local, presupuesto)
+        
+        if not data:
+            error_msg = "No se encontraron datos"
+            logger.warning(error_msg)
+            raise ValueError(error_msg)
+        
+        try:
+            guardado = INEApiClient._cache.set(*INEApiClient._consulta_cache(categoria, params_extra), data)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la respuesta en caché: {str(e)}")
+            guardado = time.time()
+        return data, guardado
+    
+    @staticmethod
+    def _refrescar_en_segundo_plano(categoria: str, params_extra: Optional[Dict] = None):
+        """Programa la descarga de una categoría si no hay ya un refresco en curso"""
+        clave = ResponseCache.clave(*INEApiClient._consulta_cache(categoria, params_extra))
+        with INEApiClient._refrescos_lock:
+            if clave in INEApiClient._refrescos_en_curso:
+                return
+            INEApiClient._refrescos_en_curso.add(clave)
+        
+        def refrescar():
+            try:
+                _, guardado = INEApiClient._descargar_y_cachear(categoria, params_extra)
+                INEApiClient._guardado_por_consulta[clave] = guardado
+                logger.info(f"Refresco en segundo plano de {categoria} completado")
+            except Exception as e:
+                logger.warning(f"Refresco en segundo plano de {categoria} fallido: {str(e)}")
+            finally:
+                with INEApiClient._refrescos_lock:
+                    INEApiClient._refrescos_en_curso.discard(clave)
+        
+        INEApiClient._executor_refresco.submit(refrescar)
+    
+    @staticmethod
+    def antiguedad_datos(categoria: str, params_extra: Optional[Dict] = None) -> Optional[float]:
+        """Segundos transcurridos desde que se descargaron los últimos datos servidos de la consulta"""
+        clave = ResponseCache.clave(*INEApiClient._consulta_cache(categoria, params_extra))
+        guardado = INEApiClient._guardado_por_consulta.get(clave)
+        if guardado is None:
+            return None
+        return max(time.time() - guardado, 0.0)
+    
+    @staticmethod
+    def estado_servicio() -> str:
+        """Estado del circuito hacia el INE: 'cerrado', 'abierto' o 'semiabierto'"""
+        return INEApiClient._circuito.estado
+    
+    @staticmethod
+    def get_datos_tabla(categoria: str = "demografia", usar_cache: bool = True,
+                        params_extra: Optional[Dict] = None,
+                        presupuesto: Optional[float] = None,
+                        servir_obsoletos: bool = True) -> Dict:
+        """Obtiene datos según la categoría especificada (ver get_datos_versionados)"""
+        datos, _ = INEApiClient.get_datos_versionados(categoria, usar_cache, params_extra,
+                                                      presupuesto, servir_obsoletos)
+        return datos
+    
+    @staticmethod
+    def get_datos_versionados(categoria: str = "demografia", usar_cache: bool = True,
+                              params_extra: Optional[Dict] = None,
+                              presupuesto: Optional[float] = None,
+                              servir_obsoletos: bool = True) -> Tuple[Dict, float]:
+        """Obtiene los datos de una categoría junto con su versión
+        
+        La versión es el momento en que se descargaron los datos servidos (el
+        de su entrada de caché); cambia cuando se refrescan, así que sirve de
+        clave para memorizar resultados derivados (DataProcessor.filtrar_datos).
+        Args:
+            categoria: Nombre de la categoría (por defecto 'demografia')
+            usar_cache: Si es False se ignora la caché en disco y se consulta la API
+            params_extra: Parámetros adicionales de la consulta (por ejemplo 'date');
+                si incluye 'date' se descarta el 'nult' por defecto
+            presupuesto: Segundos máximos para obtener la respuesta, incluidos
+                reintentos y peticiones de cobertura (por defecto PRESUPUESTO_DEFECTO)
+            servir_obsoletos: Si la entrada de caché ha caducado, devolverla de inmediato
+                y refrescarla en segundo plano en lugar de esperar a la API
+        """
+        try:
+            # La caché se consulta sin red; la URL definitiva (con el filtro tv
+            # resuelto) solo se prepara si hay que descargar
+            url, params = INEApiClient._consulta_cache(categoria, params_extra)
+            clave = ResponseCache.clave(url, params)
+            category_info = INEApiClient.CATEGORIES[categoria]
             
-            # Validación detallada de la estructura de datos
-            if not isinstance(data, list):
-                error_msg = f"Formato de datos inválido. Se esperaba una lista, se recibió: {type(data)}"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
+            entrada = INEApiClient._cache.get_entrada(url, params) if usar_cache else None
+            if entrada is not None:
+                datos_cache, guardado = entrada
+                ttl = category_info.get('ttl')
+                if ttl is None or time.time() - guardado <= ttl:
+                    logger.info(f"Datos de {category_info['name']} servidos desde caché")
+                    INEApiClient._guardado_por_consulta[clave] = guardado
+                    return datos_cache, guardado
+                if servir_obsoletos:
+                    # Stale-while-revalidate: responder ya y refrescar en segundo plano
+                    logger.info(f"Datos caducados de {category_info['name']} servidos mientras se refrescan")
+                    INEApiClient._guardado_por_consulta[clave] = guardado
+                    INEApiClient._refrescar_en_segundo_plano(categoria, params_extra)
+                    return datos_cache, guardado
             
-            # Log básico de la estructura de datos
-            logger.info(f"Total de registros recibidos: {len(data)}")
+            try:
+                data, guardado = INEApiClient._descargar_y_cachear(categoria, params_extra, presupuesto)
+            except Exception as e:
+                if entrada is None:
+                    raise
+                # Ante un fallo del INE es preferible mostrar los últimos datos buenos
+                logger.warning(f"Sirviendo datos caducados de {category_info['name']} tras error: {str(e)}")
+                INEApiClient._guardado_por_consulta[clave] = entrada[1]
+                return entrada[0], entrada[1]
             
-            # Filtrar datos de Teruel para censo agrario
-            if categoria == 'censo_agrario':
-                data = [d for d in data if isinstance(d, dict) and 
-                       d.get('Nombre', '').startswith('Teruel')]
-                logger.info(f"Datos filtrados de Teruel: {len(data)} registros")
-                
+            INEApiClient._guardado_por_consulta[clave] = guardado
             logger.info("Datos obtenidos correctamente")
-            return data
+            return data, guardado
             
         except Exception as e:
             error_msg = f"Error al obtener datos: {str(e)}"
             logger.error(error_msg)
             raise ValueError(error_msg)
+    
+    @staticmethod
+    def iter_datos_tabla(categoria: str = "demografia", tamano_bloque: int = 64 * 1024) -> Iterator[Dict]:
+        """Descarga los datos de una categoría en streaming, emitiendo una serie cada vez
+        
+        El cuerpo de la respuesta se parsea de forma incremental, por lo que la
+        memoria máxima está acotada por la serie más grande y no por la tabla.
+        Las series se pueden pasar directamente a DataProcessor.procesar_datos.
+        Args:
+            categoria: Nombre de la categoría
+            tamano_bloque: Tamaño en bytes de cada bloque leído de la conexión
+        """
+        url, params, filtro_local = INEApiClient._preparar_consulta(categoria)
+        category_info = INEApiClient.CATEGORIES[categoria]
+        
+        logger.info(f"Consultando datos de {category_info['name']} en streaming: {url}")
+        
+        # Mismo camino que las descargas completas (circuito, limitador, reintentos
+        # y cobertura); no se agrupa con SingleFlight porque el cuerpo se consume
+        # una sola vez
+        try:
+            response = INEApiClient._peticion(url, params, stream=True)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error en la solicitud HTTP: {str(e)}")
+            raise ValueError(f"Error al conectar con el servidor: {str(e)}")
+        
+        with response:
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"Error en la solicitud HTTP: {str(e)}")
+                raise ValueError(f"Error al conectar con el servidor: {str(e)}")
+            if response.headers.get('content-type', '').startswith('text/plain'):
+                raise ValueError(response.text.strip())
+            
+            decodificador = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            bloques = (
+                decodificador.decode(bloque)
+                for bloque in response.iter_content(chunk_size=tamano_bloque)
+            )
+            
+            total = 0
+            for serie in INEApiClient._iter_json_array(bloques):
+                total += 1
+                if filtro_local and not serie.get('Nombre', '').startswith(filtro_local):
+                    continue
+                yield serie
+            
+            logger.info(f"Total de series procesadas en streaming: {total}")
+    
+    @staticmethod
+    def get_series(categoria: str = "demografia", usar_cache: bool = True,
+                   streaming: bool = False) -> List[Serie]:
+        """Obtiene los datos de una categoría como objetos Serie/Dato tipados
+        
+        Los metadatos repetidos (Unidad, Escala, TipoDato, Periodo) se comparten
+        entre todos los datos. Los objetos admiten .get() con las claves de la
+        API, así que DataProcessor los procesa igual que los diccionarios (con
+        get_variables_tabla se etiquetan por los Ids de su MetaData).
+        Args:
+            categoria: Nombre de la categoría
+            usar_cache: Si es False se ignora la caché en disco
+            streaming: Decodifica sobre iter_datos_tabla sin cargar la respuesta
+                completa (no usa la caché)
+        """
+        if streaming:
+            return list(DecodificadorSeries().iter_series(INEApiClient.iter_datos_tabla(categoria)))
+        return decodificar_series(INEApiClient.get_datos_tabla(categoria, usar_cache=usar_cache))
+    
+    @staticmethod
+    def get_store(categoria: str = "demografia", usar_cache: bool = True,
+                  streaming: bool = False) -> SeriesStore:
+        """Obtiene los datos de una categoría en un SeriesStore columnar
+        
+        El store ocupa unos pocos bytes por dato (arrays numpy) y se puede
+        pasar directamente a DataProcessor.procesar_datos. Lleva las variables
+        de la tabla (get_variables_tabla) para etiquetar las series por Id.
+        Args:
+            categoria: Nombre de la categoría
+            usar_cache: Si es False se ignora la caché en disco
+            streaming: Construye el store sobre iter_datos_tabla sin cargar la
+                respuesta completa (no usa la caché)
+        """
+        if streaming:
+            store = SeriesStore.desde_series(INEApiClient.iter_datos_tabla(categoria))
+        else:
+            store = SeriesStore.desde_series(INEApiClient.get_datos_tabla(categoria, usar_cache=usar_cache))
+        store.variables = INEApiClient.get_variables_tabla(categoria) or None
+        return store
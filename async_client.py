@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from api_client import INEApiClient
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncINEApiClient:
+    """Variante asíncrona del cliente de la API del INE
+
+    Cada llamada se ejecuta en un hilo propio sobre el cliente síncrono, de modo que
+    comparte la caché en disco, el pool de conexiones y la validación de
+    respuestas. Un semáforo limita el número de peticiones simultáneas.
+    """
+
+    def __init__(self, max_concurrencia: int = 4):
+        if max_concurrencia < 1:
+            raise ValueError("La concurrencia máxima debe ser al menos 1")
+        self.max_concurrencia = max_concurrencia
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrencia,
+                                            thread_name_prefix='ine-async')
+        # El pool debe admitir tantas conexiones como peticiones simultáneas; se
+        # amplía el adaptador instalado para no descartar un cassette activo
+        if INEApiClient.POOL_SIZE < max_concurrencia:
+            INEApiClient.ampliar_pool(max_concurrencia)
+
+    def close(self):
+        """Detiene los hilos del cliente esperando a las peticiones en curso"""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> 'AsyncINEApiClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # shutdown espera a los hilos: se hace fuera del bucle de eventos
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def _get_semaforo(self) -> asyncio.Semaphore:
+        # El semáforo se crea dentro del bucle de eventos en uso
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+        return self._semaforo
+
+    async def _ejecutar(self, funcion, *args, **kwargs):
+        async with self._get_semaforo():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(funcion, *args, **kwargs)
+            )
+
+    async def get_operaciones(self) -> List[Dict]:
+        """Obtiene lista de operaciones estadísticas demográficas"""
+        return await self._ejecutar(INEApiClient.get_operaciones)
+
+    async def get_tablas_operacion(self, operacion_id: str) -> List[Dict]:
+        """Obtiene tablas de una operación específica"""
+        return await self._ejecutar(INEApiClient.get_tablas_operacion, operacion_id)
+
+    async def get_tablas_operaciones(self, operacion_ids: Iterable[str]) -> Tuple[Dict[str, List[Dict]], Dict[str, str]]:
+        """Obtiene las tablas de varias operaciones con la concurrencia del cliente"""
+        ids = [str(i) for i in dict.fromkeys(operacion_ids) if i not in (None, '')]
+        resultados = await asyncio.gather(
+            *(self.get_tablas_operacion(operacion_id) for operacion_id in ids),
+            return_exceptions=True
+        )
+        tablas = {}
+        errores = {}
+        for operacion_id, resultado in zip(ids, resultados):
+            if isinstance(resultado, Exception):
+                errores[operacion_id] = str(resultado)
+            else:
+                tablas[operacion_id] = resultado
+        return tablas, errores
+
+    async def get_datos_tabla(self, categoria: str, usar_cache: bool = True) -> List[Dict]:
+        """Obtiene los datos validados de una categoría"""
+        return await self._ejecutar(INEApiClient.get_datos_tabla, categoria, usar_cache=usar_cache)
+
+    async def get_todas_categorias(self, categorias: Optional[Iterable[str]] = None,
+                                   usar_cache: bool = True) -> Tuple[Dict[str, List[Dict]], Dict[str, str]]:
+        """Descarga todas las categorías de forma concurrente
+        Args:
+            categorias: Categorías a descargar (por defecto todas las de CATEGORIES)
+            usar_cache: Si es False se fuerza la consulta a la API
+        Returns:
+            Tupla (datos por categoría, mensaje de error por categoría fallida)
+        """
+        categorias = list(categorias or INEApiClient.CATEGORIES.keys())
+        resultados = await asyncio.gather(
+            *(self.get_datos_tabla(categoria, usar_cache=usar_cache) for categoria in categorias),
+            return_exceptions=True
+        )
+
+        datos = {}
+        errores = {}
+        for categoria, resultado in zip(categorias, resultados):
+            if isinstance(resultado, Exception):
+                logger.error(f"Error al obtener {categoria}: {str(resultado)}")
+                errores[categoria] = str(resultado)
+            else:
+                datos[categoria] = resultado
+        return datos, errores
+
+
+async def precalentar(max_concurrencia: int = 6) -> Dict[str, str]:
+    """Refresca la caché de todas las categorías y devuelve los errores"""
+    inicio = time.perf_counter()
+    async with AsyncINEApiClient(max_concurrencia=max_concurrencia) as cliente:
+        datos, errores = await cliente.get_todas_categorias(usar_cache=False)
+    logger.info(
+        f"Precalentamiento completado en {time.perf_counter() - inicio:.2f}s: "
+        f"{len(datos)} categorías correctas, {len(errores)} con error"
+    )
+    return errores
+
+
+if __name__ == '__main__':
+    errores = asyncio.run(precalentar())
+    raise SystemExit(1 if errores else 0)
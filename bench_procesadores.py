@@ -0,0 +1,99 @@
+import argparse
+import gc
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from data_processor import DataProcessor
+from series import decodificar_series
+from series_store import SeriesStore
+from sinteticos import CATEGORIAS, generar_datos_tabla, variables_tabla
+
+
+def _procesar_por_filas(datos: List[Dict]) -> pd.DataFrame:
+    """Versión anterior de _procesar_datos_demografia (un dict por dato), como referencia"""
+    registros = []
+    for dato in datos:
+        nombre = dato.get('Nombre', '').strip()
+        valores = dato.get('Data', [])
+        if not nombre or not valores:
+            continue
+        partes = [p.strip() for p in nombre.split('.')]
+        if len(partes) < 2:
+            continue
+        for valor in valores:
+            # Con det=2 'Periodo' es un objeto; el año está en NombrePeriodo
+            periodo = valor.get('NombrePeriodo', '')
+            valor_numerico = valor.get('Valor')
+            if not periodo or valor_numerico is None:
+                continue
+            registros.append({
+                'Municipio': partes[0],
+                'Indicador': 'Total habitantes',
+                'Periodo': periodo,
+                'Valor': float(valor_numerico)
+            })
+    df = pd.DataFrame(registros)
+    df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
+    df['Periodo'] = pd.to_numeric(df['Periodo'], errors='coerce')
+    return df.sort_values('Periodo', ascending=False)
+
+
+def _medir(funcion: Callable, repeticiones: int) -> float:
+    """Mejor tiempo de varias ejecuciones, sin recolección de basura entre medias"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de los procesadores de DataProcessor")
+    parser.add_argument('--categoria', choices=list(CATEGORIAS), default='demografia')
+    parser.add_argument('--puntos', type=int, default=1_000_000, help="Datos de la tabla sintética")
+    parser.add_argument('--periodos', type=int, default=25, help="Periodos por serie")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    num_series = max(1, args.puntos // args.periodos)
+    print(f"Generando {args.categoria}: {num_series} series x {args.periodos} periodos...")
+    datos = generar_datos_tabla(args.categoria, num_series=num_series, num_periodos=args.periodos,
+                                metadatos=True)
+    tipadas = decodificar_series(datos)
+    store = SeriesStore.desde_series(datos)
+    print(f"{store.num_datos} datos; SeriesStore de {store.memoria() / 1e6:.1f} MB")
+
+    resultados = {}
+    if args.categoria == 'demografia':
+        resultados['por filas (anterior)'] = _medir(lambda: _procesar_por_filas(datos), args.repeticiones)
+        referencia = _procesar_por_filas(datos)
+        # El resultado tiene columnas categóricas; se compara con los tipos de la referencia
+        resultado = DataProcessor.procesar_datos(datos, args.categoria)
+        if not referencia.equals(resultado.astype(referencia.dtypes.to_dict())):
+            print("AVISO: el resultado columnar no coincide con el de referencia")
+    for nombre, entrada in (('columnar: dicts', datos), ('columnar: Serie', tipadas),
+                            ('columnar: SeriesStore', store)):
+        resultados[nombre] = _medir(
+            lambda: DataProcessor.procesar_datos(entrada, args.categoria), args.repeticiones
+        )
+    # Etiquetado por los Ids de MetaData (tip=M) en lugar de partir el Nombre
+    variables = {variable['Nombre']: variable['Id'] for variable in variables_tabla(args.categoria)}
+    for nombre, entrada in (('por Id: dicts', datos), ('por Id: Serie', tipadas),
+                            ('por Id: SeriesStore', store)):
+        resultados[nombre] = _medir(
+            lambda: DataProcessor.procesar_datos(entrada, args.categoria, variables), args.repeticiones
+        )
+
+    base = resultados.get('por filas (anterior)')
+    for nombre, segundos in resultados.items():
+        mejora = f"  x{base / segundos:.1f}" if base else ''
+        print(f"{nombre:<24} {segundos:8.3f}s{mejora}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Caché persistente en disco para respuestas de la API del INE
+
+    Cada entrada se guarda en un fichero JSON cuyo nombre es el hash de la URL
+    y los parámetros. La fecha de modificación del fichero marca el último
+    acceso, de modo que el orden LRU sobrevive a los reinicios del proceso.
+    """
+
+    DIRECTORIO_DEFECTO = os.environ.get('INE_CACHE_DIR', '.cache_ine')
+    MAX_BYTES_DEFECTO = int(os.environ.get('INE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+    def __init__(self, directorio: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directorio = directorio or self.DIRECTORIO_DEFECTO
+        self.max_bytes = max_bytes if max_bytes is not None else self.MAX_BYTES_DEFECTO
+        self._lock = threading.Lock()
+        self._tamanos: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._indexado = False
+
+    @staticmethod
+    def clave(url: str, params: Optional[Dict] = None) -> str:
+        """Calcula la clave de caché a partir de la URL y los parámetros"""
+        params_norm = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        contenido = json.dumps([url, params_norm], ensure_ascii=False)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.json")
+
+    def _indexar(self):
+        """Construye el índice de tamaños a partir de los ficheros existentes"""
+        if self._indexado:
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.json'):
+                continue
+            try:
+                tamano = os.path.getsize(os.path.join(self.directorio, nombre))
+            except OSError:
+                continue
+            self._tamanos[nombre[:-5]] = tamano
+            self._total_bytes += tamano
+        self._indexado = True
+
+    def get_entrada(self, url: str, params: Optional[Dict] = None) -> Optional[Tuple[Any, float]]:
+        """Devuelve (datos, timestamp de guardado) o None si no hay entrada"""
+        clave = self.clave(url, params)
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+            # Marcar el acceso para la política LRU
+            os.utime(ruta, None)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché corrupta, se descarta: {ruta} ({str(e)})")
+            with self._lock:
+                self._indexar()
+                self._eliminar(clave)
+            return None
+        return entrada.get('datos'), entrada.get('guardado', 0.0)
+
+    def get(self, url: str, params: Optional[Dict] = None, ttl: Optional[float] = None) -> Optional[Any]:
+        """Devuelve los datos cacheados si existen y no han caducado"""
+        entrada = self.get_entrada(url, params)
+        if entrada is None:
+            return None
+        datos, guardado = entrada
+        if ttl is not None and time.time() - guardado > ttl:
+            return None
+        return datos
+
+    def set(self, url: str, params: Optional[Dict], datos: Any) -> float:
+        """Guarda los datos de forma atómica y aplica la política de expulsión
+        Returns:
+            Timestamp de guardado (el que devolverá get_entrada)
+        """
+        clave = self.clave(url, params)
+        entrada = {
+            'url': url,
+            'params': params or {},
+            'guardado': time.time(),
+            'datos': datos
+        }
+        with self._lock:
+            self._indexar()
+            fd, ruta_tmp = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entrada, f, ensure_ascii=False)
+                os.replace(ruta_tmp, self._ruta(clave))
+            except Exception:
+                if os.path.exists(ruta_tmp):
+                    os.remove(ruta_tmp)
+                raise
+            tamano = os.path.getsize(self._ruta(clave))
+            self._total_bytes += tamano - self._tamanos.get(clave, 0)
+            self._tamanos[clave] = tamano
+            self._expulsar()
+        return entrada['guardado']
+
+    def _eliminar(self, clave: str):
+        """Borra una entrada; se llama con self._lock adquirido"""
+        try:
+            os.remove(self._ruta(clave))
+        except OSError:
+            pass
+        self._total_bytes -= self._tamanos.pop(clave, 0)
+
+    def _expulsar(self):
+        """Elimina las entradas menos usadas recientemente hasta respetar el límite"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        accesos = []
+        for clave in self._tamanos:
+            try:
+                accesos.append((os.path.getmtime(self._ruta(clave)), clave))
+            except OSError:
+                accesos.append((0.0, clave))
+        for _, clave in sorted(accesos):
+            if self._total_bytes <= self.max_bytes:
+                break
+            logger.info(f"Expulsando entrada de caché: {clave}")
+            self._eliminar(clave)
+
+    def limpiar(self):
+        """Elimina todas las entradas de la caché"""
+        with self._lock:
+            self._indexar()
+            for clave in list(self._tamanos):
+                self._eliminar(clave)
@@ -0,0 +1,229 @@
+import argparse
+import atexit
+import base64
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras que dejan de ser válidas porque se guarda el cuerpo ya descomprimido
+CABECERAS_EXCLUIDAS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+
+def clave_peticion(metodo: str, url: str) -> str:
+    """Clave de una petición con los parámetros de la query ordenados
+
+    Los endpoints js y jsCache sirven los mismos datos y el cliente elige entre
+    ellos según su latencia (peticiones de cobertura), así que comparten clave.
+    """
+    partes = urlsplit(url)
+    ruta = partes.path.replace('/wstempus/jsCache/', '/wstempus/js/', 1)
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return f"{metodo.upper()} {urlunsplit((partes.scheme, partes.netloc, ruta, query, ''))}"
+
+
+class Cassette:
+    """Fichero comprimido con las respuestas grabadas (estado, cabeceras y cuerpo)"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self.interacciones: Dict[str, Dict] = {}
+        self._pendiente = False
+        if os.path.exists(ruta):
+            with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+                interacciones = json.load(f).get('interacciones', {})
+            # Las claves se recalculan por si se grabaron con otra normalización
+            for clave, interaccion in interacciones.items():
+                metodo, _, url = clave.partition(' ')
+                self.interacciones[clave_peticion(metodo, url)] = interaccion
+
+    def grabar(self, clave: str, status: int, cabeceras: Dict[str, str], cuerpo: bytes, url: str):
+        with self._lock:
+            self.interacciones[clave] = {
+                'url': url,
+                'status': status,
+                'headers': {k: v for k, v in cabeceras.items() if k.lower() not in CABECERAS_EXCLUIDAS},
+                'body': base64.b64encode(cuerpo).decode('ascii')
+            }
+            self._pendiente = True
+
+    def buscar(self, clave: str) -> Optional[Dict]:
+        with self._lock:
+            return self.interacciones.get(clave)
+
+    def guardar(self):
+        """Escribe el cassette comprimido de forma atómica"""
+        with self._lock:
+            directorio = os.path.dirname(os.path.abspath(self.ruta))
+            os.makedirs(directorio, exist_ok=True)
+            fd, ruta_tmp = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f_bin, gzip.GzipFile(fileobj=f_bin, mode='wb') as f:
+                    f.write(json.dumps({'version': 1, 'interacciones': self.interacciones},
+                                       ensure_ascii=False).encode('utf-8'))
+                os.replace(ruta_tmp, self.ruta)
+                self._pendiente = False
+            except Exception:
+                if os.path.exists(ruta_tmp):
+                    os.remove(ruta_tmp)
+                raise
+
+    def guardar_pendiente(self):
+        """Escribe el cassette solo si hay interacciones grabadas sin guardar"""
+        if self._pendiente:
+            self.guardar()
+            logger.info(f"Cassette {self.ruta} guardado con {len(self.interacciones)} interacciones")
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Adaptador de requests que graba o reproduce las respuestas del INE
+
+    En modo 'record' delega en el adaptador real y graba cada respuesta en
+    memoria; el cassette se escribe una sola vez al cerrar el adaptador (o al
+    salir del proceso). En modo 'replay' responde solo desde el cassette, sin
+    acceso a la red. Una
+    petición no grabada devuelve un 404 en texto plano, igual que los errores
+    del INE, para que el cliente falle de inmediato sin reintentos.
+    """
+
+    MODOS = ('record', 'replay')
+
+    def __init__(self, ruta: str, modo: str = 'replay', adaptador_real: Optional[HTTPAdapter] = None):
+        super().__init__()
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de cassette no válido: {modo}")
+        if modo == 'replay' and not os.path.exists(ruta):
+            raise ValueError(f"No existe el cassette {ruta}")
+        self.modo = modo
+        self.cassette = Cassette(ruta)
+        self._real = adaptador_real or HTTPAdapter()
+        if modo == 'record':
+            atexit.register(self.cassette.guardar_pendiente)
+
+    @property
+    def real(self) -> HTTPAdapter:
+        """Adaptador que accede a la red (el que tiene el pool de conexiones)"""
+        return self._real
+
+    def cambiar_real(self, adaptador: HTTPAdapter) -> HTTPAdapter:
+        """Sustituye el adaptador real conservando el cassette; devuelve el anterior"""
+        anterior, self._real = self._real, adaptador
+        return anterior
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        clave = clave_peticion(request.method, request.url)
+        if self.modo == 'record':
+            response = self._real.send(request, **kwargs)
+            # Leer el cuerpo completo para poder grabarlo tal cual
+            cuerpo = response.content
+            self.cassette.grabar(clave, response.status_code, dict(response.headers), cuerpo, request.url)
+            return response
+
+        interaccion = self.cassette.buscar(clave)
+        if interaccion is None:
+            logger.warning(f"Petición no grabada en el cassette: {clave}")
+            return self._construir_respuesta(
+                request, 404, {'Content-Type': 'text/plain; charset=utf-8'},
+                f"No hay respuesta grabada para {clave}".encode('utf-8')
+            )
+        return self._construir_respuesta(
+            request, interaccion['status'], interaccion['headers'],
+            base64.b64decode(interaccion['body'])
+        )
+
+    @staticmethod
+    def _construir_respuesta(request: requests.PreparedRequest, status: int,
+                             cabeceras: Dict[str, str], cuerpo: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(cabeceras)
+        response.headers['Content-Length'] = str(len(cuerpo))
+        response._content = cuerpo
+        response._content_consumed = True
+        response.raw = io.BytesIO(cuerpo)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK' if status < 400 else 'Error'
+        return response
+
+    def close(self):
+        if self.modo == 'record':
+            atexit.unregister(self.cassette.guardar_pendiente)
+            self.cassette.guardar_pendiente()
+        self._real.close()
+        super().close()
+
+
+def cargar_muestra(ruta: str) -> List[Dict]:
+    """Lee una muestra pegada de la API (series sueltas separadas por comas) como lista"""
+    with open(ruta, 'r', encoding='utf-8-sig') as f:
+        texto = f.read().strip().rstrip(',')
+    if not texto.startswith(('{', '[')):
+        # Algunas muestras se copiaron sin la llave inicial
+        texto = '{' + texto
+    if not texto.startswith('['):
+        texto = f"[{texto}]"
+    datos = json.loads(texto)
+    if not isinstance(datos, list):
+        raise ValueError(f"La muestra {ruta} no contiene una lista de series")
+    return datos
+
+
+def crear_cassette_desde_muestras(ruta: str, muestras: Dict[str, List[str]]) -> int:
+    """Crea (o amplía) un cassette con las muestras pegadas en el repositorio
+    Args:
+        ruta: Fichero del cassette
+        muestras: Ficheros de muestra por categoría de INEApiClient.CATEGORIES
+    Returns:
+        Número de interacciones grabadas
+    """
+    from api_client import INEApiClient
+
+    cassette = Cassette(ruta)
+    for categoria, ficheros in muestras.items():
+        if categoria not in INEApiClient.CATEGORIES:
+            raise ValueError(f"Categoría no válida: {categoria}")
+        info = INEApiClient.CATEGORIES[categoria]
+        series = []
+        for fichero in ficheros:
+            series.extend(cargar_muestra(fichero))
+        url = requests.Request('GET', info['url'], params=info['default_params']).prepare().url
+        cuerpo = json.dumps(series, ensure_ascii=False).encode('utf-8')
+        cassette.grabar(clave_peticion('GET', url), 200,
+                        {'Content-Type': 'application/json; charset=utf-8'}, cuerpo, url)
+        logger.info(f"Muestra de {categoria}: {len(series)} series grabadas")
+    cassette.guardar()
+    return len(cassette.interacciones)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cassettes de respuestas del INE")
+    parser.add_argument('salida', help="Fichero del cassette (.json.gz)")
+    parser.add_argument('--muestra', nargs=2, action='append', metavar=('CATEGORIA', 'FICHERO'),
+                        required=True, help="Muestra pegada a grabar como respuesta de la categoría")
+    args = parser.parse_args(argv)
+
+    muestras: Dict[str, List[str]] = {}
+    for categoria, fichero in args.muestra:
+        muestras.setdefault(categoria, []).append(fichero)
+    total = crear_cassette_desde_muestras(args.salida, muestras)
+    print(f"Cassette {args.salida} con {total} interacciones")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,222 @@
+import bisect
+import heapq
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from api_client import INEApiClient
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogoINE:
+    """Índice local de operaciones y tablas del INE con búsqueda sin red
+
+    El catálogo se guarda en disco y se refresca en segundo plano. Las
+    búsquedas usan un índice de prefijos de palabra (lista ordenada + bisect)
+    y, como respaldo para erratas, un índice de trigramas; ambos trabajan
+    sobre los nombres normalizados sin acentos.
+    """
+
+    RUTA_DEFECTO = os.environ.get('INE_CATALOGO', '.catalogo_ine.json')
+    EDAD_MAXIMA_DEFECTO = 24 * 3600
+    MAX_WORKERS = 4
+
+    def __init__(self, ruta: Optional[str] = None):
+        self.ruta = ruta or self.RUTA_DEFECTO
+        self.actualizado: Optional[float] = None
+        self._entradas: List[Dict] = []
+        self._palabras: List[str] = []
+        self._posiciones_palabra: Dict[str, Set[int]] = {}
+        self._trigramas: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+        self._refresco: Optional[threading.Thread] = None
+        self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                contenido = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Catálogo corrupto, se reconstruirá: {str(e)}")
+            return
+        self._indexar(contenido.get('entradas', []), contenido.get('actualizado'))
+
+    def _guardar(self, entradas: List[Dict], actualizado: float):
+        directorio = os.path.dirname(os.path.abspath(self.ruta))
+        os.makedirs(directorio, exist_ok=True)
+        fd, ruta_tmp = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'actualizado': actualizado, 'entradas': entradas}, f, ensure_ascii=False)
+            os.replace(ruta_tmp, self.ruta)
+        except Exception:
+            if os.path.exists(ruta_tmp):
+                os.remove(ruta_tmp)
+            raise
+
+    @staticmethod
+    def _palabras_de(normalizado: str) -> List[str]:
+        """Palabras de un texto normalizado; comas y puntos también las separan"""
+        return normalizado.replace(',', ' ').replace('.', ' ').split()
+
+    @staticmethod
+    def _trigramas_de(texto: str) -> Set[str]:
+        relleno = f"  {texto} "
+        return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+    def _indexar(self, entradas: List[Dict], actualizado: Optional[float]):
+        """Construye los índices de prefijos y trigramas y los publica de golpe"""
+        for entrada in entradas:
+            entrada['nombre_normalizado'] = INEApiClient.normalizar_texto(entrada.get('nombre', ''))
+        # Ordenar por nombre para que la posición sirva de criterio de desempate
+        entradas = sorted(entradas, key=lambda e: e['nombre_normalizado'])
+        
+        posiciones_palabra = defaultdict(set)
+        trigramas = defaultdict(set)
+        for posicion, entrada in enumerate(entradas):
+            normalizado = entrada['nombre_normalizado']
+            for palabra in self._palabras_de(normalizado):
+                posiciones_palabra[palabra].add(posicion)
+            for trigrama in self._trigramas_de(normalizado):
+                trigramas[trigrama].add(posicion)
+
+        with self._lock:
+            self._entradas = entradas
+            self._palabras = sorted(posiciones_palabra)
+            self._posiciones_palabra = dict(posiciones_palabra)
+            self._trigramas = dict(trigramas)
+            self.actualizado = actualizado
+
+    def _por_prefijo(self, prefijo: str) -> Set[int]:
+        """Posiciones de las entradas con alguna palabra que empieza por el prefijo"""
+        inicio = bisect.bisect_left(self._palabras, prefijo)
+        fin = bisect.bisect_left(self._palabras, prefijo + '\uffff', inicio)
+        if fin - inicio == 1:
+            return self._posiciones_palabra[self._palabras[inicio]]
+        posiciones = set()
+        for palabra in self._palabras[inicio:fin]:
+            posiciones |= self._posiciones_palabra[palabra]
+        return posiciones
+
+    def buscar(self, consulta: str, limite: int = 20, tipo: Optional[str] = None) -> List[Dict]:
+        """Busca operaciones y tablas por prefijos de palabra o, si no bastan, por trigramas
+        Args:
+            consulta: Texto buscado (sin distinguir mayúsculas ni acentos)
+            limite: Número máximo de resultados
+            tipo: 'operacion' o 'tabla' para restringir el resultado
+        """
+        normalizada = INEApiClient.normalizar_texto(consulta).strip()
+        if not normalizada:
+            return []
+
+        with self._lock:
+            entradas = self._entradas
+
+            # Coincidencias por prefijo de todas las palabras de la consulta; las
+            # posiciones siguen el orden alfabético, así que basta con las menores
+            coincidencias = None
+            # Mismas palabras que en el índice: 'padron,' debe casar con 'padron'
+            for palabra in self._palabras_de(normalizada):
+                posiciones = self._por_prefijo(palabra)
+                coincidencias = posiciones if coincidencias is None else coincidencias & posiciones
+                if not coincidencias:
+                    break
+            if tipo is not None and coincidencias:
+                coincidencias = {p for p in coincidencias if entradas[p]['tipo'] == tipo}
+            resultados = heapq.nsmallest(limite, coincidencias or ())
+
+            # Respaldo por similitud de trigramas (tolera erratas)
+            if len(resultados) < limite:
+                trigramas_consulta = self._trigramas_de(normalizada)
+                conteo: Dict[int, int] = defaultdict(int)
+                for trigrama in trigramas_consulta:
+                    for posicion in self._trigramas.get(trigrama, ()):
+                        conteo[posicion] += 1
+                ya_incluidas = set(resultados)
+                similares = [
+                    (-comunes, posicion) for posicion, comunes in conteo.items()
+                    if comunes >= 0.4 * len(trigramas_consulta)
+                    and posicion not in ya_incluidas
+                    and (tipo is None or entradas[posicion]['tipo'] == tipo)
+                ]
+                resultados += [p for _, p in heapq.nsmallest(limite - len(resultados), similares)]
+
+        return [entradas[posicion] for posicion in resultados]
+
+    def es_demografica(self, nombre: str) -> bool:
+        """Aplica el filtro de palabras clave precompilado sin acentos"""
+        return INEApiClient._es_operacion_demografica({'Nombre': nombre})
+
+    def operaciones(self) -> List[Dict]:
+        with self._lock:
+            return [e for e in self._entradas if e['tipo'] == 'operacion']
+
+    def tablas(self, operacion_id: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            return [
+                e for e in self._entradas
+                if e['tipo'] == 'tabla' and (operacion_id is None or str(e['operacion_id']) == str(operacion_id))
+            ]
+
+    def refrescar(self) -> int:
+        """Descarga operaciones y tablas, guarda el catálogo y reconstruye los índices"""
+        operaciones = INEApiClient.get_operaciones()
+        tablas_por_operacion, errores = INEApiClient.get_tablas_operaciones(
+            [operacion.get('id') for operacion in operaciones], max_workers=self.MAX_WORKERS
+        )
+        for operacion_id, error in errores.items():
+            logger.warning(f"Sin tablas para la operación {operacion_id}: {error}")
+        
+        entradas = []
+        for operacion in operaciones:
+            operacion_id = operacion.get('id')
+            entradas.append({
+                'tipo': 'operacion',
+                'id': operacion_id,
+                'nombre': operacion.get('Nombre', ''),
+                'codigo': operacion.get('Codigo') or operacion.get('codigo'),
+                'operacion_id': operacion_id
+            })
+            for tabla in tablas_por_operacion.get(str(operacion_id), []):
+                entradas.append({
+                    'tipo': 'tabla',
+                    'id': tabla.get('id') or tabla.get('Id'),
+                    'nombre': tabla.get('nombre', ''),
+                    'periodicidad': tabla.get('periodicidad'),
+                    'operacion_id': operacion_id
+                })
+
+        actualizado = time.time()
+        self._guardar(entradas, actualizado)
+        self._indexar(entradas, actualizado)
+        logger.info(f"Catálogo actualizado con {len(entradas)} entradas")
+        return len(entradas)
+
+    def refrescar_en_segundo_plano(self, edad_maxima: Optional[float] = None) -> bool:
+        """Lanza un refresco en un hilo si el catálogo es más antiguo que edad_maxima
+        Returns:
+            True si se lanzó un refresco
+        """
+        edad_maxima = self.EDAD_MAXIMA_DEFECTO if edad_maxima is None else edad_maxima
+        if self.actualizado is not None and time.time() - self.actualizado < edad_maxima:
+            return False
+        if self._refresco is not None and self._refresco.is_alive():
+            return False
+
+        def tarea():
+            try:
+                self.refrescar()
+            except Exception as e:
+                logger.error(f"Error al refrescar el catálogo: {str(e)}")
+
+        self._refresco = threading.Thread(target=tarea, name='ine-catalogo', daemon=True)
+        self._refresco.start()
+        return True
@@ -0,0 +1,646 @@
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    # pyarrow es opcional: solo se usa en el modo Arrow (configurar_arrow)
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+
+# Registro declarativo de las categorías del cuadro de mando. Cada entrada:
+#   nombre: Título de la categoría en la interfaz
+#   tabla: Id de DATOS_TABLA (None si la categoría no se descarga de una tabla)
+#   endpoint: 'js' o 'jsCache' (servicio del INE con o sin caché en su CDN)
+#   parametros: Parámetros por defecto de la petición
+#   ttl: Segundos de validez de la respuesta en la caché local
+#   filtro_provincia: Provincia por la que se filtra la descarga (opcional)
+#   descripcion: Texto de los mensajes de error ("No se encontraron {descripcion} válidos")
+#   separador: Texto que separa las dimensiones en el Nombre de la serie
+#   omitir_vacias: Descarta las partes vacías del Nombre antes de aplicar las reglas
+#   min_partes: Número mínimo de partes del Nombre; con menos se descarta la serie
+#   dimensiones: Reglas de extracción de cada columna de etiquetas (ver _compilar_regla);
+#       'variable' es el nombre de la variable del INE (GRUPOS_TABLA) de la dimensión,
+#       con la que se etiqueta por Id cuando las series traen MetaData (tip=M)
+#   periodo: Campo de texto del periodo ('NombrePeriodo' o 'CodigoPeriodo') que se
+#       interpreta cuando el dato no trae Anyo y Periodo con su FK_Periodicidad (det=0);
+#       ver periodos.normalizar
+#   periodo_numerico: El Periodo es el año si todos los periodos son anuales; si no
+#       (o con False), una categórica ordenada cronológicamente ("2023T4", "2023M05")
+#   tipos: dtype de las columnas del DataFrame resultante (ver TIPOS_VALIDOS); por
+#       defecto las dimensiones son 'category', el Periodo numérico 'int16' (el
+#       trimestral o mensual, 'ordered') y el Valor 'float64'
+#   orden: Lista de (columna, ascendente) para ordenar el resultado
+#   orden_valores: Orden explícito de los valores de una columna al ordenar
+#   filtro: Lista de (columna, '==' o '!=', valor) que deben cumplir las filas
+# Tamaños de las explotaciones según SAU de la tabla 51156, en el orden del INE
+TAMANOS_CENSO: Dict[str, str] = {
+    'Todas las explotaciones': 'Total',
+    'Menor de 1 ha.': 'Menor de 1 ha.',
+    'De 1 a 1,99 ha.': 'De 1 a 1,99 ha.',
+    'De 2 a 4,99 ha.': 'De 2 a 4,99 ha.',
+    'De 5 a 9,99 ha.': 'De 5 a 9,99 ha.',
+    'De 10 a 19,99 ha.': 'De 10 a 19,99 ha.',
+    'De 20 a 29,99 ha.': 'De 20 a 29,99 ha.',
+    'De 30 a 49,99 ha.': 'De 30 a 49,99 ha.',
+    'De 50 a 99,99 ha.': 'De 50 a 99,99 ha.',
+    'De 100 ha. o más': 'De 100 ha. o más',
+}
+
+REGISTRO: Dict[str, Dict[str, Any]] = {
+    'demografia': {
+        'nombre': 'Demografía por municipios',
+        'tabla': None,
+        'descripcion': 'datos demográficos',
+        'separador': '.',
+        'dimensiones': [
+            {'columna': 'Municipio', 'regla': 'parte', 'posicion': 0, 'variable': 'Municipios'},
+            {'columna': 'Indicador', 'regla': 'constante', 'valor': 'Total habitantes'},
+        ],
+        'orden': [('Periodo', False)],
+    },
+    'provincias': {
+        'nombre': 'Datos por Provincia',
+        'tabla': '2855',
+        'endpoint': 'js',
+        'descripcion': 'datos de provincia',
+        'separador': '.',
+        'omitir_vacias': True,
+        'min_partes': 1,
+        'dimensiones': [
+            {'columna': 'Provincia', 'regla': 'parte', 'posicion': 0, 'variable': 'Provincias'},
+            # Nombre "Albacete. Hombres. Total habitantes. Personas."; la interfaz
+            # usa las etiquetas 'HOMBRE' y 'MUJER'
+            {'columna': 'Genero', 'regla': 'valores', 'desde': 1, 'mayusculas': True, 'defecto': 'Total',
+             'valores': {'Hombres': 'HOMBRE', 'Mujeres': 'MUJER', 'Hombre': 'HOMBRE', 'Mujer': 'MUJER'},
+             'variable': 'Sexo'},
+        ],
+        'orden': [('Periodo', False), ('Provincia', True)],
+    },
+    'municipios_habitantes': {
+        'nombre': 'Municipios por habitantes',
+        'tabla': '61399',
+        'endpoint': 'js',
+        'descripcion': 'datos de municipios',
+        'separador': ',',
+        'omitir_vacias': True,
+        'dimensiones': [
+            # Nombre "Provincia, Rango, Número de municipios"; la provincia puede
+            # contener el separador ('Balears, Illes', 'Coruña, A')
+            {'columna': 'Provincia', 'regla': 'unir', 'hasta': -2, 'variable': 'Provincias'},
+            # Parte del Nombre que es un rango; no se busca en el Nombre completo
+            # porque 'Total' también aparece en 'Total Nacional'
+            {'columna': 'Rango_Habitantes', 'regla': 'valores', 'desde': 1, 'defecto': 'Total',
+             'variable': 'Tamaño de los municipios', 'valores': [
+                'Total',
+                'Menos de 101 habitantes',
+                'De 101 a 500',
+                'De 501 a 1.000',
+                'De 1.001 a 2.000',
+                'De 2.001 a 5.000',
+                'De 5.001 a 10.000',
+                'De 10.001 a 20.000',
+                'De 20.001 a 50.000',
+                'De 50.001 a 100.000',
+                'De 100.001 a 500.000',
+                'Más de 500.000'
+            ]},
+        ],
+        'orden': [('Periodo', False), ('Provincia', True), ('Rango_Habitantes', True)],
+        # Los rangos se ordenan como en la lista de la dimensión, no alfabéticamente
+        'orden_valores': {'Rango_Habitantes': 'dimension'},
+        'tipos': {'Rango_Habitantes': 'ordered'},
+    },
+    'censo_agrario': {
+        'nombre': 'Censo Agrario por Tamaño',
+        'tabla': '51156',
+        'endpoint': 'js',
+        'filtro_provincia': 'Teruel',
+        'descripcion': 'datos del censo agrario',
+        # Nombre "Teruel, De 1 a 1,99 ha., Tierra arable, Nº explotaciones, Valor absoluto".
+        # Se separa por ', ' para no partir los tamaños ('1,99'); la provincia y el
+        # cultivo pueden contener el separador ('Balears, Illes', 'Hortalizas,
+        # incluidos melones y fresas'), así que se anclan en la parte del tamaño
+        'separador': ', ',
+        'dimensiones': [
+            {'columna': 'Provincia', 'regla': 'unir', 'antes_de': list(TAMANOS_CENSO),
+             'variable': 'Provincias'},
+            {'columna': 'Rango_Tamano', 'regla': 'valores', 'valores': TAMANOS_CENSO,
+             'variable': 'Tamaño de las explotaciones según SAU'},
+            # 'SAU (sin huertos)' es el total de la superficie agrícola utilizada
+            {'columna': 'Tipo_Cultivo', 'regla': 'unir', 'tras': list(TAMANOS_CENSO), 'hasta': -2,
+             'variable': 'Tipo de cultivo'},
+            {'columna': 'Tipo_Dato', 'regla': 'parte', 'posicion': -2, 'variable': 'Tipo de dato'},
+            # El tamaño medio se deriva de los valores absolutos: esas series se descartan
+            {'columna': 'Medida', 'regla': 'valores', 'valores': ['Valor absoluto'], 'desde': -1,
+             'variable': 'Medida'},
+        ],
+        'orden': [('Periodo', False), ('Tipo_Dato', True), ('Rango_Tamano', True)],
+        'orden_valores': {'Rango_Tamano': 'dimension'},
+        'tipos': {'Rango_Tamano': 'ordered'},
+        # Solo los registros relevantes: por tamaño y para todos los cultivos
+        'filtro': [('Rango_Tamano', '!=', 'Total'), ('Tipo_Cultivo', '==', 'SAU (sin huertos)')],
+    },
+    'tasa_empleo': {
+        'nombre': 'Tasa de Actividad, Paro y Empleo',
+        'tabla': '3996',
+        'endpoint': 'jsCache',
+        'ttl': 86400,
+        'descripcion': 'datos de empleo',
+        'separador': '.',
+        'omitir_vacias': True,
+        'dimensiones': [
+            # Nombre "Tasa de actividad. Almería. Ambos sexos. Total.": la provincia va
+            # detrás del tipo de tasa; en la serie nacional ("Tasa de actividad. Ambos
+            # sexos. Total Nacional. Total.") el sexo va delante y se salta
+            {'columna': 'Provincia', 'regla': 'parte', 'posicion': 1,
+             'excluir': ['Ambos sexos', 'Hombres', 'Mujeres'], 'variable': 'Provincias'},
+            # Sin tipo de tasa reconocible la serie se descarta (no hay 'defecto')
+            {'columna': 'Tipo_Tasa', 'regla': 'contiene', 'variable': 'Tasas', 'valores': {
+                'Tasa de actividad': 'Actividad',
+                'Tasa de paro': 'Paro',
+                'Tasa de empleo': 'Empleo'
+            }},
+            {'columna': 'Genero', 'regla': 'valores', 'valores': ['Hombres', 'Mujeres', 'Ambos sexos'],
+             'defecto': 'Ambos sexos', 'variable': 'Sexo'},
+        ],
+        'periodo_numerico': False,
+        'orden': [('Periodo', False), ('Provincia', True), ('Tipo_Tasa', True)],
+        # Tasas con dos decimales: float32 basta
+        'tipos': {'Valor': 'float32'},
+    },
+    'tasa_nacimientos': {
+        'nombre': 'Tasa de Nacimientos por Provincias',
+        'tabla': '6545',
+        'endpoint': 'js',
+        'descripcion': 'datos de nacimientos',
+        'separador': '.',
+        'dimensiones': [
+            {'columna': 'Provincia', 'regla': 'parte', 'posicion': 0, 'variable': 'Provincias'},
+            {'columna': 'Tipo', 'regla': 'constante', 'valor': 'Nacimientos'},
+        ],
+        'orden': [('Periodo', False)],
+        'tipos': {'Valor': 'float32'},
+    },
+    'tasa_defunciones': {
+        'nombre': 'Tasa de Defunciones por Provincias',
+        'tabla': '1482',
+        'endpoint': 'jsCache',
+        'descripcion': 'datos de defunciones',
+        'separador': '.',
+        'dimensiones': [
+            {'columna': 'Provincia', 'regla': 'parte', 'posicion': 0, 'variable': 'Provincias'},
+            {'columna': 'Tipo', 'regla': 'constante', 'valor': 'Defunciones'},
+        ],
+        'orden': [('Periodo', False)],
+        'tipos': {'Valor': 'float32'},
+    },
+}
+
+# Valores por defecto de las claves opcionales del registro
+VALORES_POR_DEFECTO: Dict[str, Any] = {
+    'tabla': None,
+    'endpoint': 'js',
+    # tip=M añade a cada serie los Ids de los valores de sus variables (MetaData)
+    'parametros': {'nult': '4', 'det': '2', 'tip': 'M'},
+    'ttl': 604800,
+    'omitir_vacias': False,
+    'min_partes': 2,
+    'periodo': 'NombrePeriodo',
+    'periodo_numerico': True,
+    'tipos': {},
+    'orden': [('Periodo', False)],
+    'orden_valores': {},
+    'filtro': [],
+}
+
+# Tipos admitidos en 'tipos': 'category' (categórica), 'ordered' (categórica
+# ordenada por orden_valores o alfabéticamente), enteros (se mantiene float64
+# si hay NaN o decimales), floats y 'object'
+TIPOS_VALIDOS = ('category', 'ordered', 'int16', 'int32', 'int64', 'float32', 'float64', 'object')
+
+# Modo Arrow: categorías en cadenas de pyarrow y números en ArrowDtype
+_usar_arrow = False
+
+
+def configurar_arrow(activar: bool):
+    """Activa o desactiva las columnas respaldadas por pyarrow en los DataFrames procesados"""
+    global _usar_arrow
+    if activar and pyarrow is None:
+        raise ValueError("El modo Arrow necesita pyarrow instalado")
+    _usar_arrow = activar
+
+
+def usar_arrow() -> bool:
+    return _usar_arrow
+
+
+if os.environ.get('INE_ARROW', '').lower() in ('1', 'true', 'si', 'sí'):
+    if pyarrow is None:
+        logger.warning("INE_ARROW está activado pero pyarrow no está instalado; se ignora")
+    else:
+        _usar_arrow = True
+
+# Marca de una regla obligatoria que no encuentra su valor: la serie se descarta
+_DESCARTAR = object()
+
+# Marca de una serie que no se puede etiquetar por Id: se etiqueta por su Nombre
+SIN_METADATOS = object()
+
+
+def definicion(clave: str) -> Dict[str, Any]:
+    """Entrada del registro completada con los valores por defecto"""
+    if clave not in REGISTRO:
+        raise ValueError(f"Categoría no válida: {clave}")
+    return {**VALORES_POR_DEFECTO, **REGISTRO[clave]}
+
+
+def normalizar_variable(nombre: str) -> str:
+    """Forma de comparar los nombres de variable del registro y de GRUPOS_TABLA"""
+    return ' '.join(str(nombre).split()).lower()
+
+
+def _fk_variable(valor: Any) -> Optional[int]:
+    """FK_Variable de un valor de MetaData (dict de la API u objeto ValorVariable)"""
+    fk = valor.get('FK_Variable', valor.get('Fk_Variable'))
+    if fk is None and isinstance(valor.get('Variable'), dict):
+        fk = valor['Variable'].get('Id')
+    return fk
+
+
+def categorias_api(host: str) -> Dict[str, Dict[str, Any]]:
+    """Entradas de INEApiClient.CATEGORIES de las categorías con tabla del INE
+    Args:
+        host: Esquema y servidor de la API, por ejemplo 'https://servicios.ine.es'
+    """
+    categorias = {}
+    for clave in REGISTRO:
+        info = definicion(clave)
+        if info['tabla'] is None:
+            continue
+        categorias[clave] = _entrada_api(info, host)
+    return categorias
+
+
+def entrada_api(clave: str, host: str) -> Dict[str, Any]:
+    """Entrada de INEApiClient.CATEGORIES de una categoría del registro"""
+    info = definicion(clave)
+    if info['tabla'] is None:
+        raise ValueError(f"La categoría {clave} no tiene tabla del INE")
+    return _entrada_api(info, host)
+
+
+def _entrada_api(info: Dict[str, Any], host: str) -> Dict[str, Any]:
+    entrada = {
+        'name': info['nombre'],
+        'url': f"{host}/wstempus/{info['endpoint']}/ES/DATOS_TABLA/{info['tabla']}",
+        'default_params': dict(info['parametros']),
+        'ttl': info['ttl']
+    }
+    if info.get('filtro_provincia'):
+        entrada['filtro_provincia'] = info['filtro_provincia']
+    return entrada
+
+
+def _compilar_regla(regla: Dict[str, Any], separador: str = '.') -> Callable[[List[str], str], Any]:
+    """Convierte una regla de dimensión en una función (partes, nombre) -> etiqueta
+
+    Reglas:
+        parte: partes[posicion], sin contar las partes de la lista 'excluir'
+        unir: partes[desde:hasta] unidas de nuevo con el separador, para valores
+            que lo contienen; con 'antes_de' ('tras') solo se cuentan las partes
+            anteriores (posteriores) a la primera que está en la lista
+        constante: valor fijo
+        contiene: primer valor de la lista (o clave del dict, que se traduce)
+            contenido en el Nombre completo
+        valores: primera parte (desde 'desde') que está en la lista de valores
+            (o clave del dict, que se traduce); con 'mayusculas' se compara sin
+            distinguir mayúsculas y los valores de la lista se devuelven en mayúsculas
+        ultima: última parte (desde 'desde') que contiene ('con') o no
+            contiene ('sin') el texto indicado, sin distinguir mayúsculas
+    Si no hay valor se usa 'defecto'; sin 'defecto' la serie se descarta.
+    """
+    tipo = regla['regla']
+    defecto = regla.get('defecto', _DESCARTAR)
+
+    if tipo == 'parte':
+        posicion = regla['posicion']
+        excluir = frozenset(regla.get('excluir', ()))
+        if excluir:
+            def parte(partes, nombre):
+                partes = [p for p in partes if p not in excluir]
+                return partes[posicion] if posicion < len(partes) else defecto
+            return parte
+        return lambda partes, nombre: partes[posicion] if posicion < len(partes) else defecto
+
+    if tipo == 'unir':
+        desde = regla.get('desde', 0)
+        hasta = regla.get('hasta')
+        union = f"{separador.strip()} "
+        tras = frozenset(regla.get('tras') or ())
+        antes_de = frozenset(regla.get('antes_de') or ())
+        if tras or antes_de:
+            anclas = tras or antes_de
+
+            def unir_anclado(partes, nombre):
+                ancla = next((i for i, parte in enumerate(partes) if parte in anclas), None)
+                if ancla is None:
+                    return defecto
+                partes = partes[ancla + 1:] if tras else partes[:ancla]
+                return union.join(partes[desde:hasta]) or defecto
+            return unir_anclado
+        return lambda partes, nombre: union.join(partes[desde:hasta]) or defecto
+
+    if tipo == 'constante':
+        valor = regla['valor']
+        return lambda partes, nombre: valor
+
+    if tipo == 'contiene':
+        valores = regla['valores']
+        traduccion = list(valores.items()) if isinstance(valores, dict) else [(v, v) for v in valores]
+
+        def contiene(partes, nombre):
+            for texto, etiqueta in traduccion:
+                if texto in nombre:
+                    return etiqueta
+            return defecto
+        return contiene
+
+    if tipo == 'valores':
+        desde = regla.get('desde', 0)
+        valores = regla['valores']
+        if regla.get('mayusculas'):
+            if isinstance(valores, dict):
+                traduccion = {texto.upper(): etiqueta for texto, etiqueta in valores.items()}
+            else:
+                traduccion = {v.upper(): v.upper() for v in valores}
+
+            def valores_mayusculas(partes, nombre):
+                for parte in partes[desde:]:
+                    etiqueta = traduccion.get(parte.upper())
+                    if etiqueta is not None:
+                        return etiqueta
+                return defecto
+            return valores_mayusculas
+        traduccion = dict(valores) if isinstance(valores, dict) else {v: v for v in valores}
+
+        def valores_exactos(partes, nombre):
+            for parte in partes[desde:]:
+                etiqueta = traduccion.get(parte)
+                if etiqueta is not None:
+                    return etiqueta
+            return defecto
+        return valores_exactos
+
+    if tipo == 'ultima':
+        desde = regla.get('desde', 0)
+        texto = (regla.get('con') or regla.get('sin')).lower()
+        buscado = 'con' in regla
+
+        def ultima(partes, nombre):
+            encontrada = ''
+            for parte in partes[desde:]:
+                if (texto in parte.lower()) == buscado:
+                    encontrada = parte
+            return encontrada or defecto
+        return ultima
+
+    raise ValueError(f"Regla de dimensión no válida: {tipo}")
+
+
+class CategoriaCompilada:
+    """Reglas de una categoría compiladas una sola vez
+
+    etiquetar() convierte el Nombre de una serie en la tupla de etiquetas de
+    sus dimensiones y finalizar() aplica el tipado, el orden y el filtro del
+    registro al DataFrame construido por DataProcessor. etiquetador_ids()
+    hace lo mismo a partir de los Ids de MetaData, sin procesar el Nombre.
+    """
+
+    def __init__(self, clave: str, info: Dict[str, Any]):
+        self.clave = clave
+        self.descripcion = info['descripcion']
+        self.campo_periodo = info['periodo']
+        self.periodo_numerico = info['periodo_numerico']
+        self.columnas = [dimension['columna'] for dimension in info['dimensiones']]
+        self.tipos = {columna: 'category' for columna in self.columnas}
+        self.tipos['Periodo'] = 'int16' if self.periodo_numerico else 'ordered'
+        self.tipos['Valor'] = 'float64'
+        self.tipos.update(info['tipos'])
+        invalidos = [tipo for tipo in self.tipos.values() if tipo not in TIPOS_VALIDOS]
+        if invalidos:
+            raise ValueError(f"Tipos no válidos en la categoría {clave}: {', '.join(invalidos)}")
+        self.orden = list(info['orden'])
+        self.filtro = list(info['filtro'])
+        self.orden_valores = {}
+        for columna, valores in info['orden_valores'].items():
+            if valores == 'dimension':
+                valores = next(d['valores'] for d in info['dimensiones'] if d['columna'] == columna)
+                if isinstance(valores, dict):
+                    # Orden de las etiquetas traducidas
+                    valores = list(dict.fromkeys(valores.values()))
+            self.orden_valores[columna] = {valor: i for i, valor in enumerate(valores)}
+        self.etiquetar = self._compilar_etiquetar(info)
+        self._dimensiones = list(info['dimensiones'])
+        self._etiquetadores_ids: Dict[Tuple, Optional[Callable]] = {}
+
+    @staticmethod
+    def _compilar_etiquetar(info: Dict[str, Any]) -> Callable[[str], Optional[Tuple]]:
+        separador = info['separador']
+        omitir_vacias = info['omitir_vacias']
+        min_partes = info['min_partes']
+        reglas = [_compilar_regla(dimension, separador) for dimension in info['dimensiones']]
+
+        def etiquetar(nombre: str) -> Optional[Tuple]:
+            if omitir_vacias:
+                partes = [p.strip() for p in nombre.split(separador) if p.strip()]
+            else:
+                partes = [p.strip() for p in nombre.split(separador)]
+            if len(partes) < min_partes:
+                return None
+            etiquetas = tuple(regla(partes, nombre) for regla in reglas)
+            return None if _DESCARTAR in etiquetas else etiquetas
+        return etiquetar
+
+    def etiquetador_ids(self, variables: Optional[Dict[str, int]]) -> Optional[Callable]:
+        """Etiquetador por Ids de MetaData para una tabla (se compila una vez)
+        Args:
+            variables: Nombre de variable -> FK_Variable de la tabla
+                (ver INEApiClient.get_variables_tabla)
+        Returns:
+            Función (tupla de Ids de la serie, Id -> valor de MetaData) -> etiquetas,
+            None si se descarta la serie o SIN_METADATOS si le falta alguna
+            variable; None si alguna dimensión no tiene variable en la tabla
+        """
+        if not variables:
+            return None
+        clave = tuple(sorted(variables.items()))
+        if clave not in self._etiquetadores_ids:
+            self._etiquetadores_ids[clave] = self._compilar_etiquetador_ids(variables)
+        return self._etiquetadores_ids[clave]
+
+    def _compilar_etiquetador_ids(self, variables: Dict[str, int]) -> Optional[Callable]:
+        por_nombre = {normalizar_variable(nombre): fk for nombre, fk in variables.items()}
+        # Por dimensión: (FK_Variable, regla aplicada al Nombre del valor) o (None, constante)
+        pasos = []
+        for dimension in self._dimensiones:
+            if dimension['regla'] == 'constante':
+                pasos.append((None, dimension['valor']))
+                continue
+            fk = por_nombre.get(normalizar_variable(dimension.get('variable', '')))
+            if fk is None:
+                return None
+            # El Nombre del valor es una única parte
+            pasos.append((fk, _compilar_regla(dict(dimension, posicion=0, desde=0, hasta=None,
+                                                   tras=None, antes_de=None))))
+
+        # Las reglas se aplican una vez por valor y las etiquetas una vez por
+        # combinación de Ids; el resto de series solo hacen una búsqueda
+        etiquetas_valor: Dict[Tuple[int, int], Any] = {}
+        etiquetas_ids: Dict[Tuple[int, ...], Any] = {}
+        pendiente = object()
+
+        def etiquetar_ids(ids: Tuple[int, ...], tabla_valores: Dict[int, Any]) -> Any:
+            etiquetas = etiquetas_ids.get(ids, pendiente)
+            if etiquetas is not pendiente:
+                return etiquetas
+            id_por_variable = {_fk_variable(tabla_valores[id_valor]): id_valor for id_valor in ids}
+            resultado = []
+            for k, (fk, regla) in enumerate(pasos):
+                if fk is None:
+                    resultado.append(regla)
+                    continue
+                id_valor = id_por_variable.get(fk)
+                if id_valor is None:
+                    resultado = SIN_METADATOS
+                    break
+                etiqueta = etiquetas_valor.get((k, id_valor), pendiente)
+                if etiqueta is pendiente:
+                    nombre = str(tabla_valores[id_valor].get('Nombre', '')).strip()
+                    etiqueta = etiquetas_valor[(k, id_valor)] = regla([nombre], nombre)
+                resultado.append(etiqueta)
+            if resultado is not SIN_METADATOS:
+                resultado = None if _DESCARTAR in resultado else tuple(resultado)
+            etiquetas_ids[ids] = resultado
+            return resultado
+        return etiquetar_ids
+
+    def finalizar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Aplica el orden, los tipos y el filtro del registro"""
+        if self.orden:
+            columnas = [columna for columna, _ in self.orden]
+            ascendente = [asc for _, asc in self.orden]
+            auxiliares = {}
+            for columna, posiciones in self.orden_valores.items():
+                auxiliar = f"{columna}_Order"
+                df[auxiliar] = _posiciones(df[columna], posiciones)
+                auxiliares[columna] = auxiliar
+            columnas = [auxiliares.get(columna, columna) for columna in columnas]
+            df = df.sort_values(columnas[0] if len(columnas) == 1 else columnas,
+                                ascending=ascendente[0] if len(ascendente) == 1 else ascendente)
+            if auxiliares:
+                df = df.drop(list(auxiliares.values()), axis=1)
+
+        # Los tipos se aplican después de ordenar para conservar el orden de filas
+        for columna, tipo in self.tipos.items():
+            if columna in df.columns:
+                df[columna] = _convertir(df[columna], tipo, self.orden_valores.get(columna))
+
+        if self.filtro:
+            mascara = pd.Series(True, index=df.index)
+            for columna, operador, valor in self.filtro:
+                if operador == '==':
+                    mascara &= df[columna] == valor
+                elif operador == '!=':
+                    mascara &= df[columna] != valor
+                else:
+                    raise ValueError(f"Operador de filtro no válido: {operador}")
+            df = df[mascara].copy()
+        return df
+
+
+def _posiciones(serie: pd.Series, posiciones: Dict[Any, int]) -> np.ndarray:
+    """Posición de cada valor en orden_valores (los desconocidos van al final)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Una búsqueda por categoría en lugar de por fila
+        por_codigo = np.array([posiciones.get(c, len(posiciones)) for c in serie.cat.categories] + [len(posiciones)])
+        return por_codigo[serie.cat.codes.to_numpy()]
+    return serie.map(posiciones).to_numpy()
+
+
+def _convertir(serie: pd.Series, tipo: str, posiciones: Optional[Dict[Any, int]] = None) -> pd.Series:
+    """Convierte una columna al tipo del registro (y a pyarrow en modo Arrow)"""
+    if tipo == 'object':
+        return serie.astype(object)
+
+    # Una categórica ya ordenada (el Periodo cronológico de periodos.columna)
+    # conserva su orden: no se convierte a número ni se reordena
+    ya_ordenada = isinstance(serie.dtype, pd.CategoricalDtype) and serie.cat.ordered and not posiciones
+    if ya_ordenada:
+        tipo = 'ordered'
+
+    if tipo in ('category', 'ordered'):
+        if not isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype('category')
+        if tipo == 'ordered' and not ya_ordenada:
+            presentes = list(serie.cat.categories)
+            if posiciones:
+                orden = sorted(posiciones, key=posiciones.get)
+                conjunto = set(presentes)
+                categorias = [c for c in orden if c in conjunto]
+                categorias += [c for c in presentes if c not in posiciones]
+            else:
+                categorias = sorted(presentes)
+            serie = serie.cat.set_categories(categorias, ordered=True)
+        if _usar_arrow:
+            categorias = serie.cat.categories
+            if categorias.dtype == object or pd.api.types.is_string_dtype(categorias.dtype):
+                serie = serie.cat.rename_categories(pd.Index(categorias, dtype=pd.StringDtype('pyarrow')))
+        return serie
+
+    if tipo.startswith('int'):
+        valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+        info = np.iinfo(tipo)
+        # Solo si la conversión no pierde información (sin NaN ni decimales)
+        if not (np.isfinite(valores).all() and (valores == np.round(valores)).all()
+                and (len(valores) == 0 or (valores.min() >= info.min and valores.max() <= info.max))):
+            tipo = 'float64'
+
+    if _usar_arrow:
+        return serie.astype(f"{tipo}[pyarrow]")
+    return serie.astype(tipo) if serie.dtype != tipo else serie
+
+
+_COMPILADAS: Dict[str, CategoriaCompilada] = {}
+
+
+def compilada(clave: str) -> CategoriaCompilada:
+    """Categoría compilada (se compila la primera vez que se pide)"""
+    categoria = _COMPILADAS.get(clave)
+    if categoria is None:
+        categoria = _COMPILADAS[clave] = CategoriaCompilada(clave, definicion(clave))
+    return categoria
+
+
+def registrar(clave: str, info: Dict[str, Any]) -> CategoriaCompilada:
+    """Añade o sustituye una categoría del registro y la compila
+
+    Añadir una tabla del INE es solo configuración: basta con su id, el
+    separador del Nombre y las reglas de sus dimensiones.
+    Usar INEApiClient.registrar_categoria para que también se pueda descargar.
+    """
+    faltan = [campo for campo in ('nombre', 'descripcion', 'separador', 'dimensiones')
+              if campo not in info]
+    if faltan:
+        raise ValueError(f"Faltan campos en la categoría {clave}: {', '.join(faltan)}")
+    # Compilar antes de registrar para no dejar una entrada inválida
+    categoria = CategoriaCompilada(clave, {**VALORES_POR_DEFECTO, **info})
+    REGISTRO[clave] = info
+    _COMPILADAS[clave] = categoria
+    return categoria
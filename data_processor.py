@@ -1,488 +1,304 @@
 import pandas as pd
-from typing import Dict, List, Optional, Any
+import numpy as np
+from array import array
+from typing import Dict, List, Optional, Any, Callable, Tuple
 import json
 
+import categorias
+import periodos
+from indice_filtros import CacheFiltros, IndiceFiltros
+from series import Serie, _detalle
+from series_store import SeriesStore
+
+
+def _array_objetos(valores: List) -> np.ndarray:
+    """Array de objetos 1-D (np.array interpretaría tuplas o listas como dimensiones)"""
+    resultado = np.empty(len(valores), dtype=object)
+    resultado[:] = valores
+    return resultado
+
+
 class DataProcessor:
+    # Resultados de filtrar_datos memorizados por categoría y versión de los datos
+    _cache_filtros = CacheFiltros()
+
     @staticmethod
-    def procesar_datos(datos: Dict, categoria: str) -> pd.DataFrame:
+    def procesar_datos(datos: Dict, categoria: str, variables: Optional[Dict[str, int]] = None) -> pd.DataFrame:
         """
-        Procesa los datos según la categoría especificada
+        Procesa los datos según la categoría especificada.
+        Acepta la lista completa de series, un iterador de series
+        (por ejemplo INEApiClient.iter_datos_tabla en modo streaming),
+        objetos Serie tipados o un SeriesStore columnar.
+        Con las variables de la tabla (INEApiClient.get_variables_tabla, o las
+        de SeriesStore.variables) las series con MetaData se etiquetan por Id
+        en lugar de partir su Nombre.
         """
         try:
-            # Definir las categorías válidas y sus procesadores correspondientes
-            categorias_validas = {
-                "demografia": DataProcessor._procesar_datos_demografia,
-                "municipios_habitantes": DataProcessor._procesar_datos_municipios,
-                "censo_agrario": DataProcessor._procesar_datos_censo_agrario,
-                "tasa_empleo": DataProcessor._procesar_datos_empleo,
-                "tasa_nacimientos": DataProcessor._procesar_datos_nacimientos,
-                "tasa_defunciones": DataProcessor._procesar_datos_defunciones
-            }
-            
-            if categoria not in categorias_validas:
+            # Las categorías válidas son las del registro declarativo
+            if categoria not in categorias.REGISTRO:
                 raise ValueError(f"Categoría no válida: {categoria}")
             
-            return categorias_validas[categoria](datos)
+            return DataProcessor._procesar_categoria(datos, categoria, variables)
             
         except Exception as e:
             raise ValueError(f"Error al procesar datos: {str(e)}")
 
     @staticmethod
-    def filtrar_datos(df: pd.DataFrame, filtros: Dict[str, Any]) -> pd.DataFrame:
+    def configurar_arrow(activar: bool):
+        """Activa las columnas respaldadas por pyarrow (categorías en cadenas de
+        Arrow y números en ArrowDtype); también con INE_ARROW=1. Necesita pyarrow.
+        """
+        categorias.configurar_arrow(activar)
+
+    @staticmethod
+    def filtrar_datos(df: pd.DataFrame, filtros: Dict[str, Any], categoria: Optional[str] = None,
+                      version: Optional[float] = None) -> pd.DataFrame:
         """
         Filtra el DataFrame según los criterios especificados
+
+        Cada filtro es un valor (igualdad), una lista de valores o una tupla
+        (desde, hasta) con los extremos incluidos (None deja el extremo abierto).
+        Usa el índice por columna de IndiceFiltros, que se construye una vez por
+        DataFrame, y devuelve las filas en el orden original (una vista sin
+        copia si son consecutivas). El resultado no debe modificarse en sitio.
+        Con la categoría y la versión de los datos (INEApiClient.get_datos_versionados)
+        el resultado se memoriza entre ejecuciones y sesiones.
         """
         try:
-            df_filtrado = df.copy()
-            
-            for columna, valor in filtros.items():
-                if columna in df_filtrado.columns and valor is not None:
-                    if isinstance(valor, list):
-                        df_filtrado = df_filtrado[df_filtrado[columna].isin(valor)]
-                    else:
-                        df_filtrado = df_filtrado[df_filtrado[columna] == valor]
-            
-            return df_filtrado
-            
+            if categoria is None or version is None:
+                return IndiceFiltros.para(df).filtrar(filtros)
+            return DataProcessor._cache_filtros.obtener(
+                categoria, version, df, filtros, lambda: IndiceFiltros.para(df).filtrar(filtros)
+            )
+
         except Exception as e:
             raise ValueError(f"Error al filtrar datos: {str(e)}")
 
     @staticmethod
-    def _procesar_datos_demografia(datos: Dict) -> pd.DataFrame:
-        """Procesa datos demográficos"""
-        try:
-            registros = []
-            for dato in datos:
-                nombre = dato.get('Nombre', '').strip()
-                valores = dato.get('Data', [])
-                
-                if not nombre or not valores:
+    def estadisticas_filtros() -> Dict:
+        """Aciertos, fallos y memoria de la caché de filtrar_datos"""
+        return DataProcessor._cache_filtros.estadisticas()
+
+    @staticmethod
+    def invalidar_filtros(categoria: Optional[str] = None):
+        """Descarta los resultados memorizados de una categoría (o de todas)"""
+        DataProcessor._cache_filtros.invalidar(categoria)
+
+    @staticmethod
+    def configurar_cache_filtros(max_bytes: int):
+        """Límite de memoria de la caché de filtrar_datos (también INE_FILTROS_MAX_BYTES)"""
+        DataProcessor._cache_filtros.configurar(max_bytes)
+
+    @staticmethod
+    def _extraer_columnas(datos, campo_periodo: str, periodo_numerico: bool = False,
+                          con_metadatos: bool = False
+                          ) -> Tuple[List[str], np.ndarray, Any, np.ndarray, List, Dict]:
+        """Recorre las series una sola vez y devuelve columnas paralelas
+
+        El periodo se normaliza una vez por periodo distinto a partir de Anyo y
+        Periodo (Valor y FK_Periodicidad) o, con det=0, del campo de texto
+        (ver periodos.normalizar).
+        Args:
+            datos: Lista o iterador de series (dicts u objetos Serie) o SeriesStore
+            campo_periodo: Campo de texto del periodo ('NombrePeriodo' o 'CodigoPeriodo')
+            periodo_numerico: Periodo como año si todos los periodos son anuales
+            con_metadatos: Recoge también los Ids de MetaData de cada serie
+        Returns:
+            Tupla (Nombre de cada serie, índice de la serie de cada dato, columna
+            Periodo (periodos.columna), valor float64 de cada dato, tupla de Ids de
+            MetaData de cada serie o None, valor de MetaData de cada Id), sin los
+            datos que no tienen periodo o valor
+        """
+        if isinstance(datos, SeriesStore):
+            tabla = [periodos.normalizar(campos.get('Anyo'), campos.get('Periodo'), campos.get(campo_periodo))
+                     for campos in datos.tabla_periodos]
+            con_periodo = np.array([periodo is not None for periodo in tabla], dtype=bool)
+            mascara = ~np.isnan(datos.valores)
+            if len(tabla):
+                mascara &= con_periodo[datos.periodos]
+            return (
+                [nombre.strip() for nombre in datos.nombres],
+                datos.indice_serie()[mascara],
+                periodos.columna(datos.periodos[mascara], tabla, periodo_numerico),
+                datos.valores[mascara],
+                datos.metadatos,
+                datos.tabla_valores
+            )
+        
+        nombres = []
+        indices = array('i')
+        codigos = array('i')
+        valores = []
+        metadatos = []
+        tabla_valores = {}
+        # Periodo distinto -> código en tabla (normalizado una sola vez)
+        codigos_periodo: Dict[Tuple, int] = {}
+        tabla = []
+        por_codigo = campo_periodo == 'CodigoPeriodo'
+        for dato in datos:
+            indice = len(nombres)
+            if con_metadatos:
+                valores_serie = dato.get('MetaData')
+                if valores_serie is None:
+                    metadatos.append(None)
+                else:
+                    ids = tuple(valor.get('Id') for valor in valores_serie)
+                    for id_valor, valor in zip(ids, valores_serie):
+                        if id_valor not in tabla_valores:
+                            tabla_valores[id_valor] = valor
+                    metadatos.append(ids)
+            if isinstance(dato, Serie):
+                # Acceso directo a los atributos de las series tipadas; los
+                # Periodo están internados, así que identifican el periodo
+                nombres.append((dato.nombre or '').strip())
+                for valor in dato.datos:
+                    if valor.valor is None:
+                        continue
+                    texto = valor.codigo_periodo if por_codigo else valor.nombre_periodo
+                    clave = (valor.anyo, valor.periodo, texto)
+                    codigo = codigos_periodo.get(clave)
+                    if codigo is None:
+                        codigo = codigos_periodo[clave] = len(tabla)
+                        tabla.append(periodos.normalizar(valor.anyo, _detalle(valor.periodo), texto))
+                    if tabla[codigo] is None:
+                        continue
+                    indices.append(indice)
+                    codigos.append(codigo)
+                    valores.append(valor.valor)
+                continue
+            nombres.append(dato.get('Nombre', '').strip())
+            for valor in dato.get('Data', []) or ():
+                get = valor.get
+                valor_numerico = get('Valor')
+                if valor_numerico is None:
                     continue
-                
-                # Extraer partes del nombre
-                partes = [p.strip() for p in nombre.split('.')]
-                if len(partes) < 2:
+                # El Id del Periodo del INE identifica periodicidad y valor
+                periodo = get('Periodo')
+                clave = (get('Anyo'), periodo.get('Id') if isinstance(periodo, dict) else None,
+                         get(campo_periodo))
+                codigo = codigos_periodo.get(clave)
+                if codigo is None:
+                    codigo = codigos_periodo[clave] = len(tabla)
+                    tabla.append(periodos.normalizar(clave[0], periodo, clave[2]))
+                if tabla[codigo] is None:
                     continue
-                
-                municipio = partes[0]
-                indicador = 'Total habitantes'
-                
-                # Procesar valores históricos
-                for valor in valores:
-                    periodo = valor.get('Periodo', '')
-                    valor_numerico = valor.get('Valor')
-                    
-                    if not periodo or valor_numerico is None:
-                        continue
-                    
-                    registros.append({
-                        'Municipio': municipio,
-                        'Indicador': indicador,
-                        'Periodo': periodo,
-                        'Valor': float(valor_numerico)
-                    })
-            
-            if not registros:
-                raise ValueError("No se encontraron datos demográficos válidos")
-            
-            # Crear DataFrame
-            df = pd.DataFrame(registros)
-            
-            # Convertir tipos de datos
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-            df['Periodo'] = pd.to_numeric(df['Periodo'], errors='coerce')
-            
-            # Ordenar por período
-            df = df.sort_values('Periodo', ascending=False)
+                indices.append(indice)
+                codigos.append(codigo)
+                valores.append(valor_numerico)
+        return (
+            nombres,
+            np.frombuffer(indices, dtype=np.int32),
+            periodos.columna(np.frombuffer(codigos, dtype=np.int32), tabla, periodo_numerico),
+            np.asarray(valores, dtype=np.float64),
+            metadatos if con_metadatos else [None] * len(nombres),
+            tabla_valores
+        )
+
+    @staticmethod
+    def _construir_df(datos, campo_periodo: str, etiquetar: Callable[[str], Optional[Tuple]],
+                      columnas: List[str], periodo_numerico: bool = False,
+                      etiquetar_ids: Optional[Callable] = None) -> pd.DataFrame:
+        """Construye el DataFrame de una categoría sin filas intermedias
+        
+        Las etiquetas se calculan una vez por serie a partir del Nombre (o de
+        los Ids de MetaData) y se repiten para cada dato como códigos de una
+        columna categórica.
+        Args:
+            datos: Series de la API (ver _extraer_columnas)
+            campo_periodo: Campo de texto del periodo (ver _extraer_columnas)
+            etiquetar: Función Nombre -> tupla de etiquetas; None descarta la serie
+            columnas: Nombres de las columnas de etiquetas, en el orden de la tupla
+            periodo_numerico: Periodo como año si todos los periodos son anuales
+            etiquetar_ids: Función (Ids de MetaData, valores) -> etiquetas
+                (CategoriaCompilada.etiquetador_ids); las series sin MetaData
+                se etiquetan por su Nombre
+        """
+        nombres, indices, periodos, valores, metadatos, tabla_valores = DataProcessor._extraer_columnas(
+            datos, campo_periodo, periodo_numerico, etiquetar_ids is not None
+        )
+        if etiquetar_ids is None:
+            etiquetas = [etiquetar(nombre) if nombre else None for nombre in nombres]
+        else:
+            etiquetas = []
+            for nombre, ids in zip(nombres, metadatos):
+                etiqueta = categorias.SIN_METADATOS if ids is None else etiquetar_ids(ids, tabla_valores)
+                if etiqueta is categorias.SIN_METADATOS:
+                    etiqueta = etiquetar(nombre) if nombre else None
+                etiquetas.append(etiqueta)
+        
+        valida = np.array([e is not None for e in etiquetas], dtype=bool)
+        if len(indices) and not valida.all():
+            mascara = valida[indices]
+            indices, periodos, valores = indices[mascara], periodos[mascara], valores[mascara]
+        
+        # Etiquetas categóricas: se factorizan por serie y cada dato solo
+        # guarda el código de su serie (categorías en orden alfabético)
+        columnas_df = {}
+        for k, columna in enumerate(columnas):
+            por_serie = _array_objetos([e[k] if e is not None else None for e in etiquetas])
+            codigos, valores_categoria = pd.factorize(por_serie, sort=True)
+            columnas_df[columna] = pd.Categorical.from_codes(codigos[indices], categories=valores_categoria)
+        columnas_df['Periodo'] = periodos
+        columnas_df['Valor'] = valores
+        return pd.DataFrame(columnas_df)
+
+    @staticmethod
+    def _procesar_categoria(datos, clave: str, variables: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+        """Procesa las series de una categoría según su entrada en categorias.REGISTRO
+        
+        Todas las categorías comparten este camino: las reglas del registro se
+        compilan una vez y solo se aplican al Nombre de cada serie, o a los
+        valores de MetaData si se conocen las variables de la tabla.
+        """
+        categoria = categorias.compilada(clave)
+        if variables is None and isinstance(datos, SeriesStore):
+            variables = datos.variables
+        try:
+            df = DataProcessor._construir_df(datos, categoria.campo_periodo, categoria.etiquetar,
+                                             categoria.columnas, categoria.periodo_numerico,
+                                             categoria.etiquetador_ids(variables))
+            if df.empty:
+                raise ValueError(f"No se encontraron {categoria.descripcion} válidos")
             
-            return df
+            return categoria.finalizar(df)
             
         except Exception as e:
-            raise ValueError(f"Error al procesar datos demográficos: {str(e)}")
+            raise ValueError(f"Error al procesar {categoria.descripcion}: {str(e)}")
+
+    @staticmethod
+    def _procesar_datos_demografia(datos: Dict) -> pd.DataFrame:
+        """Procesa datos demográficos"""
+        return DataProcessor._procesar_categoria(datos, 'demografia')
 
     @staticmethod
     def _procesar_datos_municipios(datos: Dict) -> pd.DataFrame:
         """Procesa datos de municipios por habitantes"""
-        try:
-            registros = []
-            rangos_habitantes = [
-                'Total',
-                'Menos de 101 habitantes',
-                'De 101 a 500',
-                'De 501 a 1.000',
-                'De 1.001 a 2.000',
-                'De 2.001 a 5.000',
-                'De 5.001 a 10.000',
-                'De 10.001 a 20.000',
-                'De 20.001 a 50.000',
-                'De 50.001 a 100.000',
-                'De 100.001 a 500.000',
-                'Más de 500.000'
-            ]
-            
-            for dato in datos:
-                nombre = dato.get('Nombre', '').strip()
-                valores = dato.get('Data', [])
-                
-                if not nombre or not valores:
-                    continue
-                
-                # Extraer partes del nombre y limpiar espacios
-                partes = [p.strip() for p in nombre.split(',') if p.strip()]
-                if len(partes) < 2:
-                    continue
-                
-                # Extraer provincia y rango
-                provincia = partes[0]
-                rango = 'Total'  # Valor por defecto
-                
-                # Buscar el rango en el nombre completo
-                for rango_valido in rangos_habitantes:
-                    if rango_valido in nombre:
-                        rango = rango_valido
-                        break
-                
-                # Procesar valores históricos
-                for valor in valores:
-                    periodo = valor.get('NombrePeriodo', '')
-                    valor_numerico = valor.get('Valor')
-                    
-                    if not periodo or valor_numerico is None:
-                        continue
-                    
-                    registros.append({
-                        'Provincia': provincia,
-                        'Rango_Habitantes': rango,
-                        'Periodo': periodo,
-                        'Valor': float(valor_numerico)
-                    })
-            
-            if not registros:
-                raise ValueError("No se encontraron datos de municipios válidos")
-            
-            # Crear DataFrame
-            df = pd.DataFrame(registros)
-            
-            # Convertir tipos de datos
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-            df['Periodo'] = pd.to_numeric(df['Periodo'], errors='coerce')
-            
-            # Ordenar por período y rango (manteniendo el orden específico de los rangos)
-            df['Rango_Order'] = df['Rango_Habitantes'].map({rango: i for i, rango in enumerate(rangos_habitantes)})
-            df = df.sort_values(['Periodo', 'Provincia', 'Rango_Order'], ascending=[False, True, True])
-            df = df.drop('Rango_Order', axis=1)
-            
-            return df
-            
-        except Exception as e:
-            raise ValueError(f"Error al procesar datos de municipios: {str(e)}")
+        return DataProcessor._procesar_categoria(datos, 'municipios_habitantes')
 
     @staticmethod
     def _procesar_datos_censo_agrario(datos: Dict) -> pd.DataFrame:
         """Procesa datos del censo agrario"""
-        try:
-            registros = []
-            for dato in datos:
-                nombre = dato.get('Nombre', '').strip()
-                valores = dato.get('Data', [])
-                
-                if not nombre or not valores:
-                    continue
-                
-                # Extraer partes del nombre
-                partes = [p.strip() for p in nombre.split('.')]
-                if len(partes) < 2:
-                    continue
-                
-                # Extraer información relevante
-                provincia = partes[0]
-                tipo_cultivo = ''
-                rango_tamano = ''
-                
-                # Procesar las partes del nombre para identificar tipo de cultivo y rango
-                for parte in partes[1:]:
-                    if 'ha' in parte.lower():
-                        rango_tamano = parte
-                    else:
-                        tipo_cultivo = parte
-                
-                if not tipo_cultivo:
-                    tipo_cultivo = 'Total'
-                if not rango_tamano:
-                    rango_tamano = 'Total'
-                
-                # Procesar valores históricos
-                for valor in valores:
-                    periodo = valor.get('Periodo', '')
-                    valor_numerico = valor.get('Valor')
-                    
-                    if not periodo or valor_numerico is None:
-                        continue
-                    
-                    registros.append({
-                        'Provincia': provincia,
-                        'Tipo_Cultivo': tipo_cultivo,
-                        'Rango_Tamano': rango_tamano,
-                        'Periodo': periodo,
-                        'Valor': float(valor_numerico)
-                    })
-            
-            if not registros:
-                raise ValueError("No se encontraron datos del censo agrario válidos")
-            
-            # Crear DataFrame
-            df = pd.DataFrame(registros)
-            
-            # Convertir tipos de datos
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-            df['Periodo'] = pd.to_numeric(df['Periodo'], errors='coerce')
-            
-            # Ordenar por período
-            df = df.sort_values('Periodo', ascending=False)
-            
-            # Filtrar para mostrar solo los registros relevantes
-            return df[
-                (df['Rango_Tamano'] != 'Total') & 
-                (df['Tipo_Cultivo'] == 'Total')
-            ].copy()
-            
-        except Exception as e:
-            raise ValueError(f"Error al procesar datos del censo agrario: {str(e)}")
+        return DataProcessor._procesar_categoria(datos, 'censo_agrario')
 
     @staticmethod
     def _procesar_datos_empleo(datos: Dict) -> pd.DataFrame:
         """Procesa datos de tasas de empleo, actividad y paro"""
-        try:
-            registros = []
-            for dato in datos:
-                nombre = dato.get('Nombre', '').strip()
-                valores = dato.get('Data', [])
-                
-                if not nombre or not valores:
-                    continue
-                
-                # Extraer partes del nombre y limpiar espacios
-                partes = [p.strip() for p in nombre.split('.') if p.strip()]
-                if len(partes) < 2:
-                    continue
-                
-                # Extraer información relevante
-                tipo_tasa = None
-                if 'Tasa de actividad' in nombre:
-                    tipo_tasa = 'Actividad'
-                elif 'Tasa de paro' in nombre:
-                    tipo_tasa = 'Paro'
-                elif 'Tasa de empleo' in nombre:
-                    tipo_tasa = 'Empleo'
-                else:
-                    continue
-                
-                # Extraer provincia y género
-                provincia = partes[0]
-                genero = 'Ambos sexos'  # Valor por defecto
-                
-                for parte in partes:
-                    if parte in ['Hombres', 'Mujeres', 'Ambos sexos']:
-                        genero = parte
-                        break
-                
-                # Procesar valores históricos
-                for valor in valores:
-                    periodo = valor.get('NombrePeriodo', '')  # Usar NombrePeriodo para obtener el formato correcto (e.g., "2023T4")
-                    valor_numerico = valor.get('Valor')
-                    
-                    if not periodo or valor_numerico is None:
-                        continue
-                    
-                    registros.append({
-                        'Provincia': provincia,
-                        'Tipo_Tasa': tipo_tasa,
-                        'Genero': genero,
-                        'Periodo': periodo,
-                        'Valor': float(valor_numerico)
-                    })
-            
-            if not registros:
-                raise ValueError("No se encontraron datos de empleo válidos")
-            
-            # Crear DataFrame
-            df = pd.DataFrame(registros)
-            
-            # Convertir tipos de datos
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-            
-            # Ordenar por período, provincia y tipo de tasa
-            df = df.sort_values(['Periodo', 'Provincia', 'Tipo_Tasa'], ascending=[False, True, True])
-            
-            return df
-            
-        except Exception as e:
-            raise ValueError(f"Error al procesar datos de empleo: {str(e)}")
+        return DataProcessor._procesar_categoria(datos, 'tasa_empleo')
 
     @staticmethod
     def _procesar_datos_nacimientos(datos: Dict) -> pd.DataFrame:
         """Procesa datos de tasas de nacimientos por provincia"""
-        try:
-            registros = []
-            for dato in datos:
-                nombre = dato.get('Nombre', '').strip()
-                valores = dato.get('Data', [])
-                
-                if not nombre or not valores:
-                    continue
-                
-                # Extraer partes del nombre
-                partes = [p.strip() for p in nombre.split('.')]
-                if len(partes) < 2:
-                    continue
-                
-                # Extraer provincia
-                provincia = partes[0]
-                
-                # Procesar valores históricos
-                for valor in valores:
-                    periodo = valor.get('NombrePeriodo', '')
-                    valor_numerico = valor.get('Valor')
-                    
-                    if not periodo or valor_numerico is None:
-                        continue
-                    
-                    registros.append({
-                        'Provincia': provincia,
-                        'Tipo': 'Nacimientos',
-                        'Periodo': periodo,
-                        'Valor': float(valor_numerico)
-                    })
-            
-            if not registros:
-                raise ValueError("No se encontraron datos de nacimientos válidos")
-            
-            # Crear DataFrame
-            df = pd.DataFrame(registros)
-            
-            # Convertir tipos de datos
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-            df['Periodo'] = pd.to_numeric(df['Periodo'], errors='coerce')
-            
-            # Ordenar por período
-            df = df.sort_values('Periodo', ascending=False)
-            
-            return df
-            
-        except Exception as e:
-            raise ValueError(f"Error al procesar datos de nacimientos: {str(e)}")
+        return DataProcessor._procesar_categoria(datos, 'tasa_nacimientos')
 
     @staticmethod
     def _procesar_datos_defunciones(datos: Dict) -> pd.DataFrame:
         """Procesa datos de tasas de defunciones por provincia"""
-        try:
-            registros = []
-            for dato in datos:
-                nombre = dato.get('Nombre', '').strip()
-                valores = dato.get('Data', [])
-                
-                if not nombre or not valores:
-                    continue
-                
-                # Extraer partes del nombre
-                partes = [p.strip() for p in nombre.split('.')]
-                if len(partes) < 2:
-                    continue
-                
-                # Extraer provincia (primera parte del nombre)
-                provincia = partes[0]
-                
-                # Procesar valores históricos
-                for valor in valores:
-                    periodo = valor.get('NombrePeriodo', '')
-                    valor_numerico = valor.get('Valor')
-                    
-                    if not periodo or valor_numerico is None:
-                        continue
-                    
-                    registros.append({
-                        'Provincia': provincia,
-                        'Tipo': 'Defunciones',
-                        'Periodo': periodo,
-                        'Valor': float(valor_numerico)
-                    })
-            
-            if not registros:
-                raise ValueError("No se encontraron datos de defunciones válidos")
-            
-            # Crear DataFrame
-            df = pd.DataFrame(registros)
-            
-            # Convertir tipos de datos
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-            df['Periodo'] = pd.to_numeric(df['Periodo'], errors='coerce')
-            
-            # Ordenar por período
-            df = df.sort_values('Periodo', ascending=False)
-            
-            return df
-            
-        except Exception as e:
-            raise ValueError(f"Error al procesar datos de defunciones: {str(e)}")
+        return DataProcessor._procesar_categoria(datos, 'tasa_defunciones')
 
     @staticmethod
     def _procesar_datos_provincia(datos: Dict) -> pd.DataFrame:
         """Procesa datos por provincia"""
-        try:
-            registros = []
-            for dato in datos:
-                nombre = dato.get('Nombre', '').strip()
-                valores = dato.get('Data', [])
-                
-                if not nombre or not valores:
-                    continue
-                
-                # Extraer partes del nombre y limpiar espacios
-                partes = [p.strip() for p in nombre.split('.') if p.strip()]
-                if not partes:
-                    continue
-                
-                # Extraer información relevante
-                provincia = partes[0]  # Primera parte es la provincia
-                genero = 'Total'
-                if len(partes) > 1:
-                    for parte in partes[1:]:
-                        if parte.upper() in ['HOMBRE', 'MUJER']:
-                            genero = parte.upper()
-                            break
-                
-                # Procesar valores históricos
-                for valor in valores:
-                    periodo = valor.get('Periodo', '')
-                    valor_numerico = valor.get('Valor')
-                    
-                    if not periodo or valor_numerico is None:
-                        continue
-                    
-                    registros.append({
-                        'Provincia': provincia,
-                        'Genero': genero,
-                        'Periodo': periodo,
-                        'Valor': float(valor_numerico)
-                    })
-            
-            if not registros:
-                raise ValueError("No se encontraron datos de provincia válidos")
-            
-            # Crear DataFrame
-            df = pd.DataFrame(registros)
-            
-            # Convertir tipos de datos
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-            df['Periodo'] = pd.to_numeric(df['Periodo'], errors='coerce')
-            
-            # Ordenar por período y provincia
-            df = df.sort_values(['Periodo', 'Provincia'], ascending=[False, True])
-            
-            return df
-            
-        except Exception as e:
-            raise ValueError(f"Error al procesar datos de provincia: {str(e)}")
+        return DataProcessor._procesar_categoria(datos, 'provincias')
 
     @staticmethod
     def obtener_municipios(df: pd.DataFrame) -> List[str]:
@@ -497,11 +313,16 @@ class DataProcessor:
 
     @staticmethod
     def obtener_periodos(df: pd.DataFrame) -> List[str]:
-        """Obtiene lista única de períodos del DataFrame"""
+        """Obtiene lista única de períodos del DataFrame en orden cronológico"""
         try:
-            if 'Periodo' in df.columns:
-                return sorted(df['Periodo'].unique().tolist())
-            return []
+            if 'Periodo' not in df.columns:
+                return []
+            periodo = df['Periodo']
+            if isinstance(periodo.dtype, pd.CategoricalDtype) and periodo.cat.ordered:
+                # Las categorías ya están en orden cronológico: basta con los códigos usados
+                usados = np.unique(periodo.cat.codes.to_numpy())
+                return periodo.cat.categories[usados[usados >= 0]].tolist()
+            return np.sort(periodo.dropna().unique()).tolist()
         except Exception as e:
             print(f"Error al obtener periodos: {str(e)}")
             return []
\ No newline at end of file
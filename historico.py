@@ -0,0 +1,356 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+import periodos
+from api_client import INEApiClient
+from data_processor import DataProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def _escribir_json_atomico(directorio: str, ruta: str, contenido: Dict):
+    """Escribe un fichero JSON mediante un temporal y os.replace"""
+    os.makedirs(directorio, exist_ok=True)
+    fd, ruta_tmp = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(contenido, f, ensure_ascii=False)
+        os.replace(ruta_tmp, ruta)
+    except Exception:
+        if os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+        raise
+
+
+class HistoricoSeries:
+    """Histórico persistente de las series de una categoría del INE
+
+    Guarda todas las series descargadas de una categoría en un único fichero
+    JSON, indexadas por su código (COD) y con los puntos de Data indexados por
+    su fecha. Las nuevas descargas se fusionan sobre el histórico existente.
+    """
+
+    DIRECTORIO_DEFECTO = os.environ.get('INE_HISTORICO_DIR', 'historico_ine')
+
+    def __init__(self, categoria: str, directorio: Optional[str] = None):
+        if categoria not in INEApiClient.CATEGORIES:
+            raise ValueError(f"Categoría no válida: {categoria}")
+        self.categoria = categoria
+        self.directorio = directorio or self.DIRECTORIO_DEFECTO
+        self.ruta = os.path.join(self.directorio, f"{categoria}.json")
+        self.actualizado: Optional[float] = None
+        self._series: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                contenido = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Histórico corrupto en {self.ruta}: {str(e)}")
+        self.actualizado = contenido.get('actualizado')
+        self._series = contenido.get('series', {})
+
+    def guardar(self):
+        """Escribe el histórico en disco de forma atómica"""
+        with self._lock:
+            self.actualizado = datetime.now().timestamp()
+            _escribir_json_atomico(self.directorio, self.ruta, {
+                'categoria': self.categoria,
+                'actualizado': self.actualizado,
+                'series': self._series
+            })
+
+    @staticmethod
+    def clave_serie(serie: Dict) -> str:
+        """Identificador estable de una serie"""
+        return serie.get('COD') or serie.get('Nombre', '').strip()
+
+    @staticmethod
+    def clave_dato(dato: Dict) -> str:
+        """Identificador del periodo de un punto de la serie"""
+        if dato.get('Fecha') is not None:
+            return str(dato['Fecha'])
+        return f"{dato.get('Anyo')}-{dato.get('NombrePeriodo')}"
+
+    @staticmethod
+    def es_definitivo(dato: Dict) -> bool:
+        """Indica si el dato es definitivo (det=2 devuelve TipoDato como objeto)"""
+        tipo = dato.get('TipoDato')
+        if isinstance(tipo, dict):
+            tipo = tipo.get('Nombre') or tipo.get('Codigo')
+        return str(tipo or '').lower() in ('definitivo', 'd')
+
+    def fusionar(self, series: Iterable[Dict]) -> Dict[str, int]:
+        """Fusiona series descargadas sobre el histórico
+
+        Un punto nuevo sustituye al existente del mismo periodo (revisiones del
+        INE), salvo que el existente sea definitivo y el nuevo provisional.
+        Returns:
+            Contadores de puntos nuevos, revisados y sin cambios
+        """
+        contadores = {'nuevos': 0, 'revisados': 0, 'sin_cambios': 0}
+        with self._lock:
+            for serie in series:
+                if not isinstance(serie, dict):
+                    continue
+                clave = self.clave_serie(serie)
+                if not clave:
+                    continue
+
+                existente = self._series.get(clave)
+                if existente is None:
+                    existente = {k: v for k, v in serie.items() if k != 'Data'}
+                    existente['Data'] = []
+                    self._series[clave] = existente
+                else:
+                    # Los metadatos de la serie se toman de la descarga más reciente
+                    existente.update({k: v for k, v in serie.items() if k != 'Data'})
+
+                puntos = {self.clave_dato(d): d for d in existente['Data']}
+                for dato in serie.get('Data') or []:
+                    clave_dato = self.clave_dato(dato)
+                    anterior = puntos.get(clave_dato)
+                    if anterior is None:
+                        contadores['nuevos'] += 1
+                    elif anterior == dato or (self.es_definitivo(anterior) and not self.es_definitivo(dato)):
+                        contadores['sin_cambios'] += 1
+                        continue
+                    else:
+                        contadores['revisados'] += 1
+                    puntos[clave_dato] = dato
+
+                # Mantener el orden del INE: periodo más reciente primero
+                existente['Data'] = sorted(
+                    puntos.values(),
+                    key=lambda d: (d.get('Fecha') or 0, d.get('Anyo') or 0),
+                    reverse=True
+                )
+        return contadores
+
+    def series(self) -> List[Dict]:
+        """Devuelve las series con el mismo formato que get_datos_tabla"""
+        return list(self._series.values())
+
+    def a_dataframe(self):
+        """Procesa el histórico con DataProcessor sin consultar la API"""
+        return DataProcessor.procesar_datos(self.series(), self.categoria)
+
+    @staticmethod
+    def _fecha_a_dia(fecha_ms: int) -> date:
+        # Fecha es la medianoche de Madrid en milisegundos UTC; desplazar dos horas
+        # garantiza caer en el día correcto tanto en horario de invierno como de verano
+        return (datetime.fromtimestamp(fecha_ms / 1000, tz=timezone.utc) + timedelta(hours=2)).date()
+
+    @staticmethod
+    def _dia_dato(dato: Dict) -> Optional[date]:
+        """Día de inicio del periodo de un punto: su Fecha o, si no la trae, su
+        Anyo y Periodo (FK_Periodo o NombrePeriodo); None si no tiene ninguno"""
+        if dato.get('Fecha') is not None:
+            return HistoricoSeries._fecha_a_dia(dato['Fecha'])
+        periodo = periodos.normalizar(dato.get('Anyo'), dato.get('Periodo'), dato.get('NombrePeriodo'))
+        if periodo is None or periodo[0] is None:
+            return None
+        return date(periodo[0] // 12, periodo[0] % 12 + 1, 1)
+
+    def fecha_inicio_delta(self) -> Optional[date]:
+        """Primer día a solicitar para traer solo periodos nuevos o revisables
+
+        Para cada serie se toma el periodo provisional más antiguo (puede ser
+        revisado) o, si todo es definitivo, el día siguiente al último periodo.
+        Las series sin ningún punto fechado no intervienen. Devuelve el mínimo
+        entre series, o None si ninguna serie tiene fechas.
+        """
+        inicio = None
+        for serie in self._series.values():
+            dias = [(dia, dato) for dato in serie.get('Data', [])
+                    for dia in (self._dia_dato(dato),) if dia is not None]
+            if not dias:
+                continue
+            provisionales = [dia for dia, dato in dias if not self.es_definitivo(dato)]
+            if provisionales:
+                inicio_serie = min(provisionales)
+            else:
+                inicio_serie = max(dia for dia, _ in dias) + timedelta(days=1)
+            if inicio is None or inicio_serie < inicio:
+                inicio = inicio_serie
+        return inicio
+
+
+def sincronizar(categoria: str, directorio: Optional[str] = None) -> Dict[str, int]:
+    """Descarga solo los periodos nuevos de una categoría y los fusiona en su histórico"""
+    historico = HistoricoSeries(categoria, directorio)
+    url, params, filtro_local = INEApiClient._preparar_consulta(categoria)
+
+    inicio = historico.fecha_inicio_delta()
+    if inicio is not None:
+        params.pop('nult', None)
+        params['date'] = f"{inicio.strftime('%Y%m%d')}:{date.today().strftime('%Y%m%d')}"
+        logger.info(f"Sincronizando {categoria} desde {inicio.isoformat()}")
+    else:
+        logger.info(f"Histórico de {categoria} vacío, descarga inicial con {params}")
+
+    series = INEApiClient._descargar_datos(url, params, filtro_local)
+    contadores = historico.fusionar(series)
+    historico.guardar()
+    logger.info(
+        f"Sincronización de {categoria}: {contadores['nuevos']} puntos nuevos, "
+        f"{contadores['revisados']} revisados"
+    )
+    return contadores
+
+
+def sincronizar_todas(categorias: Optional[Iterable[str]] = None,
+                      directorio: Optional[str] = None) -> Dict[str, Dict]:
+    """Sincroniza varias categorías sin abortar si alguna falla"""
+    resultados = {}
+    for categoria in categorias or INEApiClient.CATEGORIES.keys():
+        try:
+            resultados[categoria] = sincronizar(categoria, directorio)
+        except Exception as e:
+            logger.error(f"Error al sincronizar {categoria}: {str(e)}")
+            resultados[categoria] = {'error': str(e)}
+    return resultados
+
+
+def _ventanas(anyo_inicio: int, anyo_fin: int, anyos_por_ventana: int) -> List[str]:
+    """Divide el rango de años en ventanas de fechas con el formato del parámetro date"""
+    ventanas = []
+    for anyo in range(anyo_inicio, anyo_fin + 1, anyos_por_ventana):
+        fin = min(anyo + anyos_por_ventana - 1, anyo_fin)
+        ventanas.append(f"{anyo}0101:{fin}1231")
+    return ventanas
+
+
+def backfill(categoria: str, anyo_inicio: int = 1971, anyo_fin: Optional[int] = None,
+             anyos_por_ventana: int = 5, max_workers: int = 4,
+             directorio: Optional[str] = None, guardar_cada: int = 8) -> Dict[str, object]:
+    """Descarga el histórico completo de una categoría por ventanas de fechas en paralelo
+
+    Cada ventana completada se fusiona en memoria; el histórico se escribe cada
+    guardar_cada ventanas (y al terminar) y solo entonces se anotan esas
+    ventanas en el fichero de progreso, de modo que una ejecución interrumpida
+    continúa con las ventanas que no llegaron a disco.
+    Args:
+        categoria: Categoría de CATEGORIES a descargar
+        anyo_inicio: Primer año del rango
+        anyo_fin: Último año del rango (por defecto el actual)
+        anyos_por_ventana: Años incluidos en cada petición
+        max_workers: Número máximo de ventanas descargadas a la vez
+        directorio: Directorio del histórico
+        guardar_cada: Ventanas fusionadas entre dos escrituras del histórico
+    Returns:
+        Diccionario con las ventanas descargadas, omitidas y fallidas
+    """
+    if anyos_por_ventana < 1 or max_workers < 1 or guardar_cada < 1:
+        raise ValueError("El tamaño de ventana, el número de hilos y guardar_cada deben ser positivos")
+
+    historico = HistoricoSeries(categoria, directorio)
+    url, params_base, filtro_local = INEApiClient._preparar_consulta(categoria)
+    params_base.pop('nult', None)
+
+    ruta_progreso = os.path.join(historico.directorio, f"{categoria}.backfill.json")
+    try:
+        with open(ruta_progreso, 'r', encoding='utf-8') as f:
+            completadas = set(json.load(f).get('completadas', []))
+    except (FileNotFoundError, ValueError):
+        completadas = set()
+
+    ventanas = _ventanas(anyo_inicio, anyo_fin or date.today().year, anyos_por_ventana)
+    pendientes = [v for v in ventanas if v not in completadas]
+    logger.info(
+        f"Backfill de {categoria}: {len(pendientes)} ventanas pendientes "
+        f"de {len(ventanas)} ({len(ventanas) - len(pendientes)} ya completadas)"
+    )
+
+    resultado = {'descargadas': [], 'omitidas': sorted(set(ventanas) - set(pendientes)), 'fallidas': {}}
+    # Ventanas fusionadas en memoria que aún no se han escrito en el histórico
+    sin_guardar: List[str] = []
+
+    def descargar(ventana: str) -> List[Dict]:
+        params = dict(params_base, date=ventana)
+        return INEApiClient._descargar_datos(url, params, filtro_local)
+
+    def volcar():
+        # El progreso se anota después de escribir los datos que cubre
+        if not sin_guardar:
+            return
+        historico.guardar()
+        completadas.update(sin_guardar)
+        _escribir_json_atomico(historico.directorio, ruta_progreso, {
+            'categoria': categoria,
+            'completadas': sorted(completadas)
+        })
+        sin_guardar.clear()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ine-backfill') as executor:
+        futuros = {executor.submit(descargar, ventana): ventana for ventana in pendientes}
+        try:
+            for futuro in as_completed(futuros):
+                ventana = futuros[futuro]
+                try:
+                    series = futuro.result()
+                except Exception as e:
+                    logger.error(f"Error en la ventana {ventana} de {categoria}: {str(e)}")
+                    resultado['fallidas'][ventana] = str(e)
+                    continue
+
+                historico.fusionar(series)
+                sin_guardar.append(ventana)
+                resultado['descargadas'].append(ventana)
+                if len(sin_guardar) >= guardar_cada:
+                    volcar()
+        finally:
+            volcar()
+
+    logger.info(
+        f"Backfill de {categoria} terminado: {len(resultado['descargadas'])} ventanas "
+        f"descargadas, {len(resultado['fallidas'])} fallidas"
+    )
+    return resultado
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Histórico local de series del INE")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    parser_sync = subparsers.add_parser('sincronizar', help="Descarga solo los periodos nuevos")
+    parser_sync.add_argument('categorias', nargs='*', help="Categorías (por defecto todas)")
+    parser_sync.add_argument('--directorio', default=None)
+
+    parser_backfill = subparsers.add_parser('backfill', help="Descarga el histórico completo")
+    parser_backfill.add_argument('categorias', nargs='*', help="Categorías (por defecto todas)")
+    parser_backfill.add_argument('--desde', type=int, default=1971, help="Primer año")
+    parser_backfill.add_argument('--hasta', type=int, default=None, help="Último año")
+    parser_backfill.add_argument('--ventana', type=int, default=5, help="Años por petición")
+    parser_backfill.add_argument('--workers', type=int, default=4, help="Peticiones simultáneas")
+    parser_backfill.add_argument('--directorio', default=None)
+    parser_backfill.add_argument('--guardar-cada', type=int, default=8,
+                                 help="Ventanas entre dos escrituras del histórico")
+
+    args = parser.parse_args(argv)
+    if args.comando == 'sincronizar':
+        resultados = sincronizar_todas(args.categorias or None, args.directorio)
+        return 1 if any('error' in r for r in resultados.values()) else 0
+    if args.comando == 'backfill':
+        fallos = 0
+        for categoria in args.categorias or INEApiClient.CATEGORIES.keys():
+            resultado = backfill(categoria, args.desde, args.hasta, args.ventana,
+                                 args.workers, args.directorio, args.guardar_cada)
+            fallos += len(resultado['fallidas'])
+        return 1 if fallos else 0
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,386 @@
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Por encima de esta fracción de filas es más barato recorrer los códigos de
+# toda la columna que concatenar las listas de posiciones de cada valor
+FRACCION_MASCARA = 0.125
+
+logger = logging.getLogger(__name__)
+
+# Versión de cada índice construido (cambia si se reconstruye el del mismo DataFrame)
+_versiones = itertools.count(1)
+
+
+class _IndiceColumna:
+    """Índice invertido de una columna: valor -> posiciones de sus filas
+
+    Cada fila guarda el código de su valor (0 para los nulos). Las posiciones
+    de todas las filas se guardan ordenadas por código, de modo que las filas
+    del código k son orden[limites[k]:limites[k + 1]], en orden ascendente.
+    Los códigos siguen el orden de los valores (categorías de la columna o
+    valores ordenados), así que un rango de valores es un rango de códigos.
+    """
+
+    def __init__(self, serie: pd.Series):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.cat.codes.to_numpy()
+            self.valores = serie.cat.categories
+            self.por_categorias = bool(serie.cat.ordered)
+        else:
+            codigos, valores = pd.factorize(serie.to_numpy(), sort=True)
+            self.valores = pd.Index(valores)
+            self.por_categorias = False
+        self.codigos = (codigos + 1).astype(np.int32)
+        self.orden = np.argsort(self.codigos, kind='stable').astype(np.int32)
+        self.limites = np.searchsorted(self.codigos[self.orden], np.arange(len(self.valores) + 2))
+
+    def codigos_de(self, valores: List[Any], con_nulos: bool = False) -> np.ndarray:
+        """Códigos de los valores presentes en la columna (sin repetidos)"""
+        buscados = pd.Index(valores, tupleize_cols=False)
+        nulos = buscados.isna()
+        posiciones = self.valores.get_indexer(buscados[~nulos].unique())
+        codigos = np.unique(posiciones[posiciones >= 0] + 1)
+        if con_nulos and nulos.any():
+            codigos = np.concatenate(([0], codigos))
+        return codigos
+
+    def rango(self, desde: Any, hasta: Any) -> Any:
+        """Códigos de los valores entre desde y hasta (incluidos; None es abierto)
+
+        Devuelve una tupla (a, b) de códigos consecutivos [a, b) si el orden de
+        los valores lo permite o, si no, el array de códigos.
+        """
+        if self.por_categorias:
+            # Categórica ordenada: los extremos son categorías y el orden es el suyo
+            a = 0 if desde is None else self.valores.get_indexer([desde])[0]
+            b = len(self.valores) - 1 if hasta is None else self.valores.get_indexer([hasta])[0]
+            if a < 0 or b < 0:
+                return 1, 1
+            return a + 1, max(a, b + 1) + 1
+        if self.valores.is_monotonic_increasing:
+            try:
+                a = 0 if desde is None else int(self.valores.searchsorted(desde, side='left'))
+                b = len(self.valores) if hasta is None else int(self.valores.searchsorted(hasta, side='right'))
+                return a + 1, max(a, b) + 1
+            except TypeError:
+                return 1, 1
+        # Sin orden utilizable: se comparan los valores uno a uno
+        dentro = np.ones(len(self.valores), dtype=bool)
+        if desde is not None:
+            dentro &= np.asarray(self.valores >= desde)
+        if hasta is not None:
+            dentro &= np.asarray(self.valores <= hasta)
+        return np.flatnonzero(dentro) + 1
+
+    def num_filas(self, codigos: np.ndarray) -> int:
+        return int((self.limites[codigos + 1] - self.limites[codigos]).sum())
+
+
+class IndiceFiltros:
+    """Índice de filtrado de un DataFrame procesado
+
+    Los índices de cada columna se construyen la primera vez que se filtra por
+    ella. Cada filtro es una igualdad (valor), una lista de valores (isin) o
+    un rango (tupla (desde, hasta), extremos incluidos, None para un extremo
+    abierto). Se parte de las posiciones del filtro más selectivo y el resto
+    se comprueban solo sobre ellas, así que el coste depende del número de
+    filas seleccionadas y no del tamaño del DataFrame.
+
+    El DataFrame se trata como inmutable: si se modifican sus valores hay que
+    llamar a IndiceFiltros.invalidar.
+    """
+
+    _indices: Dict[int, 'IndiceFiltros'] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = weakref.ref(df)
+        self._huella = self._calcular_huella(df)
+        self._columnas: Dict[str, _IndiceColumna] = {}
+        self._lock_columnas = threading.Lock()
+        self._huella_datos: Optional[Tuple] = None
+        self.version = next(_versiones)
+
+    @staticmethod
+    def _calcular_huella(df: pd.DataFrame) -> Tuple:
+        return len(df), tuple(df.columns), tuple(str(t) for t in df.dtypes)
+
+    def huella_datos(self, df: pd.DataFrame) -> Tuple:
+        """Huella del contenido del DataFrame (columnas, tipos, índice y valores)
+
+        Se calcula una vez por DataFrame: dos procesados iguales de los mismos
+        datos comparten huella y dos con distintos valores no.
+        """
+        if self._huella_datos is None:
+            filas = pd.util.hash_pandas_object(df, index=True).to_numpy()
+            resumen = hashlib.blake2b(filas.tobytes(), digest_size=16).hexdigest()
+            self._huella_datos = self._huella + (resumen,)
+        return self._huella_datos
+
+    @classmethod
+    def para(cls, df: pd.DataFrame) -> 'IndiceFiltros':
+        """Índice del DataFrame, construido una vez y liberado con él"""
+        clave = id(df)
+        with cls._lock:
+            indice = cls._indices.get(clave)
+            if indice is not None and indice._df() is df and indice._huella == cls._calcular_huella(df):
+                return indice
+            indice = cls._indices[clave] = cls(df)
+            if indice._df() is df:
+                weakref.finalize(df, cls._liberar, clave, indice.version)
+        return indice
+
+    @classmethod
+    def _liberar(cls, clave: int, version: int):
+        with cls._lock:
+            indice = cls._indices.get(clave)
+            if indice is not None and indice.version == version:
+                del cls._indices[clave]
+
+    @classmethod
+    def invalidar(cls, df: Optional[pd.DataFrame] = None):
+        """Descarta el índice de un DataFrame (o todos)"""
+        with cls._lock:
+            if df is None:
+                cls._indices.clear()
+            else:
+                cls._indices.pop(id(df), None)
+
+    def _columna(self, df: pd.DataFrame, nombre: str) -> _IndiceColumna:
+        indice = self._columnas.get(nombre)
+        if indice is None:
+            with self._lock_columnas:
+                indice = self._columnas.get(nombre)
+                if indice is None:
+                    indice = self._columnas[nombre] = _IndiceColumna(df[nombre])
+        return indice
+
+    @staticmethod
+    def _predicado(indice: _IndiceColumna, valor: Any) -> Tuple[Any, int]:
+        """Convierte un filtro en (códigos permitidos, filas que lo cumplen)
+
+        Los códigos son un array o, para los rangos ordenados, una tupla (a, b)
+        de códigos consecutivos.
+        """
+        if isinstance(valor, tuple) and len(valor) == 2:
+            codigos = indice.rango(*valor)
+            if isinstance(codigos, tuple):
+                a, b = codigos
+                return codigos, int(indice.limites[b] - indice.limites[a])
+        elif isinstance(valor, list):
+            # Como isin: una lista con NaN selecciona también los nulos
+            codigos = indice.codigos_de(valor, con_nulos=True)
+        else:
+            codigos = indice.codigos_de([valor])
+        return codigos, indice.num_filas(codigos)
+
+    def posiciones(self, filtros: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Posiciones (ascendentes) de las filas que cumplen los filtros
+        Returns:
+            Array de posiciones, o None si ningún filtro aplica (todas las filas)
+        """
+        df = self._df()
+        if df is None:
+            raise ValueError("El DataFrame del índice ya no existe")
+        predicados = []
+        for columna, valor in filtros.items():
+            if columna in df.columns and valor is not None:
+                indice = self._columna(df, columna)
+                codigos, filas = self._predicado(indice, valor)
+                if filas == 0:
+                    return np.empty(0, dtype=np.int64)
+                if filas == len(df):
+                    # Lo cumplen todas las filas (por ejemplo, todos los municipios)
+                    continue
+                predicados.append((filas, indice, codigos))
+        if not predicados:
+            return None
+
+        # Candidatas: filas del predicado más selectivo
+        predicados.sort(key=lambda p: p[0])
+        filas, indice, codigos = predicados[0]
+        if isinstance(codigos, tuple):
+            a, b = codigos
+            candidatas = np.sort(indice.orden[indice.limites[a]:indice.limites[b]])
+        elif filas > FRACCION_MASCARA * len(df):
+            candidatas = np.flatnonzero(self._permitidos(indice, codigos)[indice.codigos])
+        else:
+            candidatas = np.sort(np.concatenate([
+                indice.orden[indice.limites[c]:indice.limites[c + 1]] for c in codigos
+            ]))
+
+        # El resto de predicados se comprueban sobre las candidatas
+        for _, indice, codigos in predicados[1:]:
+            candidatas = candidatas[self._permitidos(indice, codigos)[indice.codigos[candidatas]]]
+            if not len(candidatas):
+                break
+        return candidatas
+
+    @staticmethod
+    def _permitidos(indice: _IndiceColumna, codigos: Any) -> np.ndarray:
+        """Tabla de búsqueda código -> cumple el filtro"""
+        permitidos = np.zeros(len(indice.valores) + 1, dtype=bool)
+        if isinstance(codigos, tuple):
+            permitidos[codigos[0]:codigos[1]] = True
+        else:
+            permitidos[codigos] = True
+        return permitidos
+
+    def filtrar(self, filtros: Dict[str, Any]) -> pd.DataFrame:
+        """Filas que cumplen los filtros, en el orden del DataFrame
+
+        Si las filas seleccionadas son consecutivas (por ejemplo, todas) se
+        devuelve una vista del DataFrame sin copiar los datos.
+        """
+        df = self._df()
+        posiciones = self.posiciones(filtros)
+        if posiciones is None:
+            return df.iloc[:]
+        if len(posiciones) and posiciones[-1] - posiciones[0] + 1 == len(posiciones):
+            return df.iloc[posiciones[0]:posiciones[-1] + 1]
+        return df.iloc[posiciones]
+
+
+class CacheFiltros:
+    """Caché LRU en memoria de resultados de filtrado
+
+    La clave es (conjunto de datos, versión, huella del contenido del
+    DataFrame, filtros normalizados): el orden de los filtros y de los valores
+    de las listas no importa. El tamaño se limita
+    por los bytes de los DataFrames guardados. Cuando llega una versión nueva
+    de un conjunto de datos (se han refrescado) se descartan sus resultados
+    anteriores.
+    """
+
+    MAX_BYTES_DEFECTO = int(os.environ.get('INE_FILTROS_MAX_BYTES', 64 * 1024 * 1024))
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else self.MAX_BYTES_DEFECTO
+        self._lock = threading.Lock()
+        self._entradas: 'OrderedDict[Tuple, Tuple[pd.DataFrame, int]]' = OrderedDict()
+        self._versiones: Dict[Hashable, Hashable] = {}
+        self._total_bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def normalizar(df: pd.DataFrame, filtros: Dict[str, Any]) -> Tuple:
+        """Filtros como tupla hashable e independiente del orden
+
+        Se omiten los filtros que filtrar_datos ignora (valor None o columna
+        inexistente). Lanza TypeError si algún valor no es hashable.
+        """
+        normalizados = []
+        for columna, valor in filtros.items():
+            if valor is None or columna not in df.columns:
+                continue
+            if isinstance(valor, list):
+                clave = ('lista', frozenset(valor))
+            elif isinstance(valor, tuple) and len(valor) == 2:
+                clave = ('rango', valor)
+            else:
+                clave = ('valor', valor)
+            hash(clave)
+            normalizados.append((columna, clave))
+        return tuple(sorted(normalizados, key=lambda filtro: filtro[0]))
+
+    def obtener(self, conjunto: Hashable, version: Hashable, df: pd.DataFrame,
+                filtros: Dict[str, Any], calcular: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Devuelve el resultado memorizado o lo calcula con calcular()"""
+        try:
+            # La huella del contenido distingue DataFrames distintos con la misma
+            # categoría y versión (otros valores, tipos o columnas)
+            clave = (conjunto, version, IndiceFiltros.para(df).huella_datos(df), self.normalizar(df, filtros))
+        except TypeError:
+            return calcular()
+
+        with self._lock:
+            if self._versiones.get(conjunto, version) != version:
+                self._descartar(conjunto)
+            self._versiones[conjunto] = version
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0].copy(deep=False)
+            self.fallos += 1
+
+        # Copia compacta: una vista mantendría vivo el DataFrame completo
+        resultado = calcular().copy()
+        tamano = self._tamano(resultado)
+        with self._lock:
+            if tamano <= self.max_bytes and self._versiones.get(conjunto) == version:
+                anterior = self._entradas.pop(clave, None)
+                if anterior is not None:
+                    self._total_bytes -= anterior[1]
+                self._entradas[clave] = (resultado, tamano)
+                self._total_bytes += tamano
+                self._expulsar()
+        return resultado.copy(deep=False)
+
+    @staticmethod
+    def _tamano(df: pd.DataFrame) -> int:
+        """Bytes propios del resultado
+
+        Las categorías se comparten con el DataFrame de origen, así que de las
+        columnas categóricas solo se cuentan los códigos.
+        """
+        tamano = int(df.index.memory_usage(deep=True))
+        for columna in df.columns:
+            serie = df[columna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                tamano += serie.cat.codes.nbytes
+            else:
+                tamano += int(serie.memory_usage(index=False, deep=True))
+        return tamano
+
+    def _expulsar(self):
+        """Elimina los resultados menos usados recientemente hasta respetar el límite"""
+        while self._total_bytes > self.max_bytes and self._entradas:
+            _, (_, tamano) = self._entradas.popitem(last=False)
+            self._total_bytes -= tamano
+
+    def _descartar(self, conjunto: Hashable):
+        for clave in [c for c in self._entradas if c[0] == conjunto]:
+            self._total_bytes -= self._entradas.pop(clave)[1]
+        self._versiones.pop(conjunto, None)
+        logger.info(f"Resultados de filtrado descartados: {conjunto}")
+
+    def invalidar(self, conjunto: Optional[Hashable] = None):
+        """Descarta los resultados de un conjunto de datos (o todos)"""
+        with self._lock:
+            if conjunto is None:
+                self._entradas.clear()
+                self._versiones.clear()
+                self._total_bytes = 0
+            else:
+                self._descartar(conjunto)
+
+    def configurar(self, max_bytes: int):
+        """Cambia el límite de memoria (expulsando lo que sobre)"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._expulsar()
+
+    def estadisticas(self) -> Dict:
+        """Devuelve aciertos, fallos, entradas y memoria ocupada"""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'entradas': len(self._entradas),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'ratio_aciertos': round(self.aciertos / total, 4) if total else 0.0
+            }
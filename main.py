@@ -7,7 +7,7 @@ from api_client import INEApiClient
 from data_processor import DataProcessor
 from visualizer import DataVisualizer
 from utils import (format_nombre_operacion, format_nombre_tabla, 
-                  exportar_a_excel, exportar_a_csv)
+                  exportar_a_excel, exportar_a_csv, format_antiguedad)
 from report_generator import ReportGenerator
 
 st.set_page_config(
@@ -99,23 +99,28 @@ def main():
     try:
         # Cargar datos según la categoría seleccionada
         with st.spinner(f"Cargando datos de {INEApiClient.CATEGORIES[categoria_seleccionada]['name']}..."):
-            datos = INEApiClient.get_datos_tabla(categoria=categoria_seleccionada)
+            datos, version_datos = INEApiClient.get_datos_versionados(categoria=categoria_seleccionada)
             if not datos:
                 st.error(f"No se pudieron obtener los datos de {INEApiClient.CATEGORIES[categoria_seleccionada]['name']}.")
                 return
             
-            # Usar método específico para datos de provincia
+            # Mostrar la antigüedad de los datos (pueden ser los últimos buenos si el INE no responde)
+            antiguedad = INEApiClient.antiguedad_datos(categoria_seleccionada)
+            if INEApiClient.estado_servicio() != 'cerrado':
+                st.warning(f"El INE no responde en este momento. Mostrando los últimos datos disponibles ({format_antiguedad(antiguedad)}).")
+            elif antiguedad is not None:
+                st.caption(f"Datos actualizados {format_antiguedad(antiguedad)}")
+            
+            # Etiquetar las series por los Ids de MetaData con las variables de la
+            # tabla; si no se obtienen los metadatos se parte el Nombre
+            variables = INEApiClient.get_variables_tabla(categoria_seleccionada)
+            df = DataProcessor.procesar_datos(datos, categoria_seleccionada, variables or None)
             if categoria_seleccionada == 'provincias':
-                df = DataProcessor._procesar_datos_provincia(datos)
                 # Verificar columnas requeridas
-                if 'Indicador' not in df.columns or 'Region' not in df.columns:
+                if 'Provincia' not in df.columns or 'Genero' not in df.columns:
                     st.error("Error: Faltan columnas requeridas en los datos de provincia")
                     return
-            elif categoria_seleccionada == 'tasa_defunciones':
-                df = DataProcessor._procesar_datos_defunciones(datos)
-            else:
-                df = DataProcessor.json_to_dataframe(datos, categoria=categoria_seleccionada)
-                
+
             if df.empty:
                 st.error("No hay datos disponibles para mostrar.")
                 return
@@ -344,7 +349,7 @@ def main():
                                 
                                 # Tabla de resumen
                                 st.subheader("Resumen por Tipo de Cultivo")
-                                df_resumen = df_filtrado.groupby('Tipo_Cultivo').agg({
+                                df_resumen = df_filtrado.groupby('Tipo_Cultivo', observed=True).agg({
                                     'Superficie': ['sum', 'mean'],
                                     'Num_Explotaciones': ['sum', 'mean']
                                 }).round(2)
@@ -386,7 +391,7 @@ def main():
                             
                             # Tabla de resumen
                             st.subheader("Resumen Detallado")
-                            tabla_resumen = df_filtrado.groupby('Tipo_Cultivo').agg({
+                            tabla_resumen = df_filtrado.groupby('Tipo_Cultivo', observed=True).agg({
                                 'Superficie': ['sum', 'mean'],
                                 'Num_Explotaciones': ['sum', 'mean']
                             }).round(2)
@@ -451,7 +456,8 @@ def main():
                                 index=['Tipo_Explotacion', 'Tipo_Cultivo'],
                                 columns='Metrica',
                                 values='Valor',
-                                aggfunc='sum'
+                                aggfunc='sum',
+                                observed=True
                             ).round(2)
                             st.dataframe(df_resumen)
                         
@@ -540,14 +546,14 @@ def main():
                     'Periodo': periodo_seleccionado,
                     'Genero': genero_seleccionado
                 }
-                df_filtrado = DataProcessor.filtrar_datos(df, filtros)
+                df_filtrado = DataProcessor.filtrar_datos(df, filtros, categoria_seleccionada, version_datos)
             elif categoria_seleccionada == "municipios_habitantes":
                 # Usar filtrar_datos para mantener consistencia
                 filtros = {
                     'Municipio': provincia_seleccionada,
                     'Periodo': periodo_seleccionado
                 }
-                df_filtrado = DataProcessor.filtrar_datos(df, filtros)
+                df_filtrado = DataProcessor.filtrar_datos(df, filtros, categoria_seleccionada, version_datos)
 
             elif categoria_seleccionada in ["tasa_nacimientos", "tasa_defunciones"]:
                 # Verificar que el DataFrame tenga la columna Provincia
@@ -573,7 +579,7 @@ def main():
                         return
 
                     # Selector de período
-                    periodos = sorted(df['Periodo'].unique())
+                    periodos = DataProcessor.obtener_periodos(df)
                     periodo_seleccionado = st.selectbox(
                         "Seleccione Período:",
                         options=periodos,
@@ -638,7 +644,7 @@ def main():
                     st.subheader("Comparativa entre Provincias")
                     
                     # Tabla comparativa
-                    df_comp = df_filtrado.groupby('Provincia').agg({
+                    df_comp = df_filtrado.groupby('Provincia', observed=True).agg({
                         'Valor': ['mean', 'min', 'max', 'std']
                     }).round(2)
                     df_comp.columns = ['Media', 'Mínima', 'Máxima', 'Desv. Estándar']
@@ -716,7 +722,7 @@ def main():
                     )
                     
                     # Filtro de periodo
-                    periodos = sorted(df['Periodo'].unique().tolist(), reverse=True)
+                    periodos = DataProcessor.obtener_periodos(df)[::-1]
                     periodo_seleccionado = st.multiselect(
                         "Períodos:",
                         options=periodos,
@@ -729,7 +735,7 @@ def main():
                     'Periodo': periodo_seleccionado
                 }
             
-            df_filtrado = DataProcessor.filtrar_datos(df, filtros)
+            df_filtrado = DataProcessor.filtrar_datos(df, filtros, categoria_seleccionada, version_datos)
             st.session_state.datos_actuales = df_filtrado
             
     except Exception as e:
@@ -869,7 +875,7 @@ def main():
                     
                     # Crear columnas para métricas
                     cols = st.columns(len(df_sector['Tipo'].unique()))
-                    for i, (tipo, datos_tipo) in enumerate(df_sector.groupby('Tipo')):
+                    for i, (tipo, datos_tipo) in enumerate(df_sector.groupby('Tipo', observed=True)):
                         valor = datos_tipo['Valor'].iloc[0]
                         # Formatear según tipo de indicador
                         if 'porcentaje' in tipo.lower() or '%' in tipo:
@@ -985,7 +991,8 @@ def main():
                     df_resumen = df.pivot_table(
                         index=['Indicador', 'Genero'],
                         values='Valor',
-                        aggfunc=['mean', 'min', 'max']
+                        aggfunc=['mean', 'min', 'max'],
+                        observed=True
                     ).round(2)
                     df_resumen.columns = ['Media', 'Mínimo', 'Máximo']
                     st.dataframe(df_resumen)
@@ -1091,7 +1098,7 @@ def main():
                         
                         # Tabla resumen por región
                         st.subheader("Resumen Estadístico por Región")
-                        df_resumen = df_regiones.groupby(['Region', 'Genero'])['Valor'].agg([
+                        df_resumen = df_regiones.groupby(['Region', 'Genero'], observed=True)['Valor'].agg([
                             ('Media', 'mean'),
                             ('Mínimo', 'min'),
                             ('Máximo', 'max')
@@ -1106,7 +1113,7 @@ def main():
                                 ultimo_periodo = df_ind['Periodo'].max()
                                 df_ultimo = df_ind[df_ind['Periodo'] == ultimo_periodo]
                                 
-                                valores_regionales = df_ultimo.groupby('Region')['Valor'].mean()
+                                valores_regionales = df_ultimo.groupby('Region', observed=True)['Valor'].mean()
                                 diferencia_max = valores_regionales.max() - valores_regionales.min()
                                 region_max = valores_regionales.idxmax()
                                 region_min = valores_regionales.idxmin()
@@ -1451,7 +1458,7 @@ def main():
                 with col3:
                     periodo = st.selectbox(
                         "Período",
-                        options=sorted(df_empleo['Periodo'].unique(), reverse=True),
+                        options=DataProcessor.obtener_periodos(df_empleo)[::-1],
                         key="tasa_periodo"
                     )
                 
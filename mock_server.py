@@ -0,0 +1,330 @@
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from sinteticos import CATEGORIA_POR_TABLA, CATEGORIAS, PROVINCIAS, generar_datos_tabla, variables_tabla
+
+logger = logging.getLogger(__name__)
+
+# Operaciones de OPERACIONES_DISPONIBLES y tablas de cada una
+OPERACIONES = [
+    {'Id': 22, 'Codigo': 'EPOB', 'Nombre': 'Estadística del Padrón Continuo', 'tablas': ['2855', '61399']},
+    {'Id': 30, 'Codigo': 'CA', 'Nombre': 'Censo Agrario', 'tablas': ['51156']},
+    {'Id': 293, 'Codigo': 'EPA', 'Nombre': 'Encuesta de Población Activa', 'tablas': ['3996']},
+    {'Id': 23, 'Codigo': 'MNP', 'Nombre': 'Movimiento Natural de la Población. Nacimientos', 'tablas': ['6545']},
+    {'Id': 24, 'Codigo': 'MNPD', 'Nombre': 'Movimiento Natural de la Población. Defunciones', 'tablas': ['1482']},
+    {'Id': 50, 'Codigo': 'IPC', 'Nombre': 'Índice de Precios de Consumo', 'tablas': []}
+]
+
+class EscenarioMock:
+    """Comportamiento simulado del servidor: latencia, ráfagas de errores y volumen
+    Args:
+        latencia: Distribución ('ninguna', 'fija', 'uniforme', 'exponencial' o 'lognormal')
+        latencia_media: Latencia media en segundos
+        latencia_sigma: Dispersión de la distribución lognormal (cola larga)
+        latencia_max: Tope de la latencia de una respuesta
+        prob_429: Probabilidad por petición de iniciar una ráfaga de 429
+        prob_5xx: Probabilidad por petición de iniciar una ráfaga de 500/502/503/504
+        longitud_rafaga: Número de respuestas consecutivas de cada ráfaga
+        retry_after: Segundos de la cabecera Retry-After de los 429
+        prob_error_texto: Probabilidad de un 200 con mensaje de error en text/plain
+        escala: Múltiplo del volumen real de series de cada tabla (ver sinteticos.py)
+        num_series: Número exacto de series por tabla (tiene prioridad sobre escala)
+        semilla: Semilla de la latencia, los errores y los valores generados
+    """
+
+    LATENCIAS = ('ninguna', 'fija', 'uniforme', 'exponencial', 'lognormal')
+
+    def __init__(self, latencia: str = 'ninguna', latencia_media: float = 0.05,
+                 latencia_sigma: float = 1.0, latencia_max: float = 30.0,
+                 prob_429: float = 0.0, prob_5xx: float = 0.0, longitud_rafaga: int = 5,
+                 retry_after: int = 1, prob_error_texto: float = 0.0,
+                 escala: float = 1.0, num_series: Optional[int] = None,
+                 semilla: Optional[int] = None):
+        if latencia not in self.LATENCIAS:
+            raise ValueError(f"Distribución de latencia no válida: {latencia}")
+        if longitud_rafaga < 1:
+            raise ValueError("La longitud de las ráfagas debe ser al menos 1")
+        self.latencia = latencia
+        self.latencia_media = latencia_media
+        self.latencia_sigma = latencia_sigma
+        self.latencia_max = latencia_max
+        self.prob_429 = prob_429
+        self.prob_5xx = prob_5xx
+        self.longitud_rafaga = longitud_rafaga
+        self.retry_after = retry_after
+        self.prob_error_texto = prob_error_texto
+        self.escala = escala
+        self.num_series = num_series
+        self.semilla = semilla
+
+    def muestrear_latencia(self, rng: random.Random) -> float:
+        media = self.latencia_media
+        if self.latencia == 'ninguna' or media <= 0:
+            return 0.0
+        if self.latencia == 'fija':
+            valor = media
+        elif self.latencia == 'uniforme':
+            valor = rng.uniform(0, 2 * media)
+        elif self.latencia == 'exponencial':
+            valor = rng.expovariate(1 / media)
+        else:
+            # mu elegido para que la media de la lognormal sea latencia_media
+            mu = math.log(media) - self.latencia_sigma ** 2 / 2
+            valor = rng.lognormvariate(mu, self.latencia_sigma)
+        return min(valor, self.latencia_max)
+
+
+class ServidorMockINE(ThreadingHTTPServer):
+    """Servidor local que imita servicios.ine.es para pruebas de carga
+
+    Atiende OPERACIONES_DISPONIBLES, TABLAS_OPERACION, DATOS_TABLA (tablas de
+    INEApiClient.CATEGORIES), GRUPOS_TABLA y VALORES_GRUPOSTABLA bajo
+    /wstempus/js/ES y /wstempus/jsCache/ES, y aplica el EscenarioMock a cada
+    petición.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, direccion: Tuple[str, int] = ('127.0.0.1', 0),
+                 escenario: Optional[EscenarioMock] = None):
+        super().__init__(direccion, _ManejadorINE)
+        self.escenario = escenario or EscenarioMock()
+        self._rng = random.Random(self.escenario.semilla)
+        self._lock = threading.Lock()
+        self._rafaga_restante = 0
+        self._rafaga_status = 0
+        self._peticiones: Dict[str, int] = defaultdict(int)
+        self._respuestas: Dict[int, int] = defaultdict(int)
+        self._cuerpos: Dict[Tuple, bytes] = {}
+        # Lock aparte para no frenar las demás peticiones mientras se genera un cuerpo
+        self._lock_cuerpos = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar_en_segundo_plano(self) -> 'ServidorMockINE':
+        """Atiende peticiones en un hilo daemon y devuelve el propio servidor"""
+        self._hilo = threading.Thread(target=self.serve_forever, name='ine-mock', daemon=True)
+        self._hilo.start()
+        logger.info(f"Servidor mock del INE escuchando en {self.url}")
+        return self
+
+    def detener(self):
+        self.shutdown()
+        self.server_close()
+
+    def decidir_fallo(self) -> Tuple[Optional[int], float]:
+        """Decide si la petición falla (status o None) y la latencia a aplicar"""
+        escenario = self.escenario
+        with self._lock:
+            latencia = escenario.muestrear_latencia(self._rng)
+            if self._rafaga_restante == 0:
+                azar = self._rng.random()
+                if azar < escenario.prob_429:
+                    self._rafaga_status = 429
+                    self._rafaga_restante = escenario.longitud_rafaga
+                elif azar < escenario.prob_429 + escenario.prob_5xx:
+                    self._rafaga_status = self._rng.choice((500, 502, 503, 504))
+                    self._rafaga_restante = escenario.longitud_rafaga
+            if self._rafaga_restante:
+                self._rafaga_restante -= 1
+                return self._rafaga_status, latencia
+            if self._rng.random() < escenario.prob_error_texto:
+                return 200, latencia
+            return None, latencia
+
+    def registrar(self, endpoint: str, status: int):
+        with self._lock:
+            self._peticiones[endpoint] += 1
+            self._respuestas[status] += 1
+
+    def cuerpo_datos_tabla(self, id_tabla: str, nult: Optional[int], det: int,
+                           provincia: Optional[str], metadatos: bool = False) -> bytes:
+        """Cuerpo JSON de DATOS_TABLA, generado una vez por combinación de parámetros"""
+        escenario = self.escenario
+        clave = (id_tabla, nult, det, provincia, metadatos, escenario.escala, escenario.num_series)
+        with self._lock_cuerpos:
+            cuerpo = self._cuerpos.get(clave)
+            if cuerpo is None:
+                series = generar_datos_tabla(
+                    CATEGORIA_POR_TABLA[id_tabla], escala=escenario.escala,
+                    num_series=None if provincia else escenario.num_series, num_periodos=nult,
+                    det=det, semilla=escenario.semilla or 0, geografia=provincia, metadatos=metadatos
+                )
+                cuerpo = json.dumps(series, ensure_ascii=False).encode('utf-8')
+                self._cuerpos[clave] = cuerpo
+            return cuerpo
+
+    def estadisticas(self) -> Dict:
+        """Peticiones por endpoint y respuestas por código de estado"""
+        with self._lock:
+            return {
+                'peticiones': dict(self._peticiones),
+                'respuestas': dict(self._respuestas),
+                'total': sum(self._peticiones.values())
+            }
+
+
+class _ManejadorINE(BaseHTTPRequestHandler):
+    server: ServidorMockINE
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, formato, *args):
+        logger.debug(f"{self.address_string()} {formato % args}")
+
+    def _responder(self, status: int, cuerpo: bytes, tipo: str, cabeceras: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _responder_json(self, datos):
+        self._responder(200, json.dumps(datos, ensure_ascii=False).encode('utf-8'),
+                        'application/json; charset=utf-8')
+
+    @staticmethod
+    def _variables_tabla(id_tabla: str) -> List[Dict]:
+        if id_tabla not in CATEGORIA_POR_TABLA:
+            raise ValueError(f"tabla {id_tabla} desconocida")
+        return variables_tabla(CATEGORIA_POR_TABLA[id_tabla])
+
+    def _responder_texto(self, status: int, mensaje: str, cabeceras: Optional[Dict] = None):
+        self._responder(status, mensaje.encode('utf-8'), 'text/plain; charset=utf-8', cabeceras)
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        segmentos = [s for s in partes.path.split('/') if s]
+
+        if segmentos == ['__mock', 'estadisticas']:
+            self._responder_json(self.server.estadisticas())
+            return
+        # /wstempus/{js|jsCache}/ES/{FUNCION}/{argumentos...}
+        if len(segmentos) < 4 or segmentos[0] != 'wstempus' or segmentos[1] not in ('js', 'jsCache'):
+            self.server.registrar('desconocido', 404)
+            self._responder_texto(404, f"Recurso no encontrado: {partes.path}")
+            return
+        funcion, argumentos = segmentos[3], segmentos[4:]
+
+        status, latencia = self.server.decidir_fallo()
+        if latencia:
+            time.sleep(latencia)
+        self.server.registrar(funcion, status or 200)
+        if status == 429:
+            self._responder_texto(429, "Demasiadas peticiones, inténtelo más tarde",
+                                  {'Retry-After': str(self.server.escenario.retry_after)})
+            return
+        if status == 200:
+            self._responder_texto(200, "Error interno al procesar la consulta")
+            return
+        if status:
+            self._responder_texto(status, f"Error {status}: servicio no disponible temporalmente")
+            return
+
+        try:
+            self._atender(funcion, argumentos, params)
+        except (KeyError, ValueError) as e:
+            self._responder_texto(200, f"Consulta no válida: {str(e)}")
+
+    def _atender(self, funcion: str, argumentos: List[str], params: Dict[str, str]):
+        if funcion == 'OPERACIONES_DISPONIBLES':
+            self._responder_json([
+                {'Id': op['Id'], 'Cod_IOE': str(30000 + op['Id']), 'Nombre': op['Nombre'], 'Codigo': op['Codigo']}
+                for op in OPERACIONES
+            ])
+        elif funcion == 'TABLAS_OPERACION' and argumentos:
+            operacion = next((op for op in OPERACIONES if str(op['Id']) == argumentos[0]), None)
+            if operacion is None:
+                raise ValueError(f"operación {argumentos[0]} desconocida")
+            # El cliente lee 'nombre' en minúsculas; se incluyen ambas variantes
+            self._responder_json([
+                {'Id': int(id_tabla), 'Nombre': f"Tabla {id_tabla}", 'nombre': f"Tabla {id_tabla}",
+                 'Codigo': '', 'FK_Periodicidad': CATEGORIAS[CATEGORIA_POR_TABLA[id_tabla]]['periodicidad']}
+                for id_tabla in operacion['tablas']
+            ])
+        elif funcion == 'DATOS_TABLA' and argumentos:
+            id_tabla = argumentos[0]
+            if id_tabla not in CATEGORIA_POR_TABLA:
+                raise ValueError(f"tabla {id_tabla} desconocida")
+            provincia = None
+            if params.get('tv'):
+                _, _, id_valor = params['tv'].partition(':')
+                if not id_valor.isdigit() or not 1 <= int(id_valor) <= len(PROVINCIAS):
+                    raise ValueError(f"valor {id_valor} desconocido en tv={params['tv']}")
+                provincia = PROVINCIAS[int(id_valor) - 1]
+            cuerpo = self.server.cuerpo_datos_tabla(
+                id_tabla, int(params['nult']) if params.get('nult') else None,
+                int(params.get('det', 0)), provincia, 'M' in params.get('tip', '').upper()
+            )
+            self._responder(200, cuerpo, 'application/json; charset=utf-8')
+        elif funcion == 'GRUPOS_TABLA' and argumentos:
+            variables = self._variables_tabla(argumentos[0])
+            self._responder_json([{'Id': i, 'Nombre': v['Nombre']} for i, v in enumerate(variables, start=1)])
+        elif funcion == 'VALORES_GRUPOSTABLA' and len(argumentos) >= 2:
+            variables = self._variables_tabla(argumentos[0])
+            grupo = int(argumentos[1])
+            if not 1 <= grupo <= len(variables):
+                raise ValueError(f"grupo {grupo} desconocido")
+            self._responder_json(variables[grupo - 1]['valores'])
+        else:
+            raise ValueError(f"función {funcion} no soportada")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Servidor local que imita la API del INE",
+        epilog="Uso con el cliente: INE_HOST=http://127.0.0.1:8765 streamlit run main.py"
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--latencia', choices=EscenarioMock.LATENCIAS, default='ninguna')
+    parser.add_argument('--latencia-media', type=float, default=0.05, help="Segundos")
+    parser.add_argument('--latencia-sigma', type=float, default=1.0, help="Dispersión lognormal")
+    parser.add_argument('--prob-429', type=float, default=0.0, help="Probabilidad de ráfaga de 429")
+    parser.add_argument('--prob-5xx', type=float, default=0.0, help="Probabilidad de ráfaga de 5xx")
+    parser.add_argument('--rafaga', type=int, default=5, help="Respuestas por ráfaga")
+    parser.add_argument('--retry-after', type=int, default=1, help="Segundos de Retry-After")
+    parser.add_argument('--prob-error-texto', type=float, default=0.0,
+                        help="Probabilidad de error en text/plain con estado 200")
+    parser.add_argument('--escala', type=float, default=1.0, help="Múltiplo del volumen real")
+    parser.add_argument('--series', type=int, default=None, help="Número exacto de series por tabla")
+    parser.add_argument('--semilla', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    escenario = EscenarioMock(
+        latencia=args.latencia, latencia_media=args.latencia_media,
+        latencia_sigma=args.latencia_sigma, prob_429=args.prob_429, prob_5xx=args.prob_5xx,
+        longitud_rafaga=args.rafaga, retry_after=args.retry_after,
+        prob_error_texto=args.prob_error_texto, escala=args.escala, num_series=args.series,
+        semilla=args.semilla
+    )
+    servidor = ServidorMockINE((args.host, args.puerto), escenario)
+    print(f"Servidor mock del INE en {servidor.url} (Ctrl+C para terminar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        print(json.dumps(servidor.estadisticas(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
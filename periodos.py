@@ -0,0 +1,102 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Periodicidades del INE (FK_Periodicidad): meses que abarca cada periodo y
+# prefijo del código del periodo ("2023T4", "2023M05", "2023S1")
+PERIODICIDADES: Dict[int, Tuple[str, int, str]] = {
+    1: ('Mensual', 1, 'M'),
+    3: ('Trimestral', 3, 'T'),
+    6: ('Semestral', 6, 'S'),
+    12: ('Anual', 12, ''),
+}
+_MESES_POR_PREFIJO = {prefijo: meses for _, meses, prefijo in PERIODICIDADES.values() if prefijo}
+
+# Códigos de periodo en texto: año y, opcionalmente, prefijo y número del periodo
+_PATRON_CODIGO = re.compile(r'^\s*(\d{4})\s*(?:([MTS])\s*(\d{1,2}))?\s*$', re.IGNORECASE)
+
+
+def _periodo(anyo: int, meses: int, prefijo: str, numero: int) -> Tuple[int, str, bool]:
+    if meses == 12:
+        return anyo * 12, str(anyo), True
+    etiqueta = f"{anyo}{prefijo}{numero:02d}" if meses == 1 else f"{anyo}{prefijo}{numero}"
+    return anyo * 12 + (numero - 1) * meses, etiqueta, False
+
+
+def normalizar(anyo: Any, periodo: Any, nombre: Any) -> Optional[Tuple[Optional[int], str, bool]]:
+    """Clave de orden, etiqueta y si es anual de un periodo
+
+    La clave es el mes de inicio del periodo contado desde el año 0
+    (anyo * 12 + mes - 1), de modo que los periodos de cualquier periodicidad
+    se ordenan comparando enteros.
+    Args:
+        anyo: Anyo del dato
+        periodo: Periodo del dato con det=2 (diccionario u objeto series.Periodo
+            con Valor y FK_Periodicidad); con det=0 solo llega su Id
+        nombre: NombrePeriodo o CodigoPeriodo, para cuando falta la periodicidad
+    Returns:
+        (clave o None si no se reconoce el periodo, etiqueta, anual), o None si
+        el dato no tiene periodo
+    """
+    if isinstance(anyo, str):
+        anyo = int(anyo) if anyo.strip().isdigit() else None
+    if anyo is not None and periodo is not None and hasattr(periodo, 'get'):
+        periodicidad = PERIODICIDADES.get(periodo.get('FK_Periodicidad'))
+        valor = str(periodo.get('Valor', '')).strip()
+        if periodicidad is not None and valor.isdigit():
+            _, meses, prefijo = periodicidad
+            return _periodo(int(anyo), meses, prefijo, int(valor))
+
+    # Sin periodicidad (det=0): se interpreta el código en texto
+    nombre = '' if nombre is None else str(nombre).strip()
+    coincidencia = _PATRON_CODIGO.match(nombre)
+    if coincidencia:
+        anyo_codigo, prefijo, numero = coincidencia.groups()
+        if prefijo is None:
+            return _periodo(int(anyo_codigo), 12, '', 1)
+        prefijo = prefijo.upper()
+        meses = _MESES_POR_PREFIJO[prefijo]
+        if 1 <= int(numero) <= 12 // meses:
+            return _periodo(int(anyo_codigo), meses, prefijo, int(numero))
+    if nombre:
+        # Periodo no reconocido: se conserva su texto y se ordena antes que los
+        # demás (el último periodo, max(), sigue siendo el más reciente)
+        return None, nombre, False
+    if anyo is not None:
+        return _periodo(int(anyo), 12, '', 1)
+    return None
+
+
+def columna(codigos: np.ndarray, tabla: List[Tuple[Optional[int], str, bool]],
+            numerico: bool) -> Any:
+    """Columna Periodo a partir del código de periodo de cada dato
+    Args:
+        codigos: Posición en tabla del periodo de cada dato
+        tabla: Periodos distintos normalizados (ver normalizar)
+        numerico: Devuelve el año como número si todos los periodos usados son anuales
+    Returns:
+        Array con el año de cada dato o Categorical ordenada cronológicamente
+        (sus códigos son el orden de los periodos)
+    """
+    usados = np.flatnonzero(np.bincount(codigos, minlength=len(tabla)))
+    if numerico and all(tabla[k][2] and tabla[k][0] is not None for k in usados):
+        anyos = np.zeros(len(tabla), dtype=np.int64)
+        anyos[usados] = [tabla[k][0] // 12 for k in usados]
+        return anyos[codigos]
+
+    # Categorías en orden de clave; los periodos no reconocidos al principio
+    primera_clave: Dict[str, Tuple[bool, int]] = {}
+    for k in usados:
+        clave, etiqueta, _ = tabla[k]
+        orden = (clave is not None, clave or 0)
+        if etiqueta not in primera_clave or orden < primera_clave[etiqueta]:
+            primera_clave[etiqueta] = orden
+    categorias = sorted(primera_clave, key=lambda etiqueta: (primera_clave[etiqueta], etiqueta))
+    posicion = {etiqueta: i for i, etiqueta in enumerate(categorias)}
+    por_periodo = np.full(len(tabla), -1, dtype=np.int32)
+    for k in usados:
+        por_periodo[k] = posicion[tabla[k][1]]
+    return pd.Categorical.from_codes(por_periodo[codigos], categories=categorias, ordered=True)
@@ -0,0 +1,229 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class _RegistroINE:
+    """Base de los registros tipados: acceso por atributo y, por compatibilidad
+    con el código que recorre los diccionarios del INE, .get() y [] con las
+    claves originales de la API."""
+
+    __slots__ = ()
+
+    # Clave de la API -> atributo
+    _CLAVES: Dict[str, str] = {}
+
+    def get(self, clave: str, defecto: Any = None) -> Any:
+        atributo = self._CLAVES.get(clave)
+        if atributo is None:
+            return defecto
+        valor = getattr(self, atributo)
+        return defecto if valor is None else valor
+
+    def __getitem__(self, clave: str) -> Any:
+        if clave not in self._CLAVES:
+            raise KeyError(clave)
+        return getattr(self, self._CLAVES[clave])
+
+    def __contains__(self, clave: str) -> bool:
+        return clave in self._CLAVES and getattr(self, self._CLAVES[clave]) is not None
+
+    def a_dict(self) -> Dict:
+        """Diccionario con las claves de la API (omite los campos vacíos)"""
+        resultado = {}
+        for clave, atributo in self._CLAVES.items():
+            valor = getattr(self, atributo)
+            if valor is None:
+                continue
+            if isinstance(valor, _RegistroINE):
+                valor = valor.a_dict()
+            elif isinstance(valor, list):
+                valor = [v.a_dict() for v in valor]
+            resultado[clave] = valor
+        return resultado
+
+    def __repr__(self) -> str:
+        campos = ', '.join(f"{a}={getattr(self, a)!r}" for a in self.__slots__ if a != 'datos')
+        return f"{type(self).__name__}({campos})"
+
+
+class _Metadato(_RegistroINE):
+    """Objeto de metadatos que se repite en muchas series o datos; se interna"""
+
+    __slots__ = ('_solo_id',)
+
+    def __init__(self, origen: Dict):
+        for clave, atributo in self._CLAVES.items():
+            object.__setattr__(self, atributo, origen.get(clave))
+        object.__setattr__(self, '_solo_id', all(
+            origen.get(clave) is None for clave in self._CLAVES if clave != 'Id'
+        ))
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+
+    @property
+    def solo_id(self) -> bool:
+        """True si procede de un FK_ de det=0 (solo se conoce el Id)"""
+        return self._solo_id
+
+
+def _detalle(metadato: Optional[_Metadato]) -> Optional[_Metadato]:
+    return None if metadato is None or metadato._solo_id else metadato
+
+
+def _fk(metadato: Optional[_Metadato]) -> Optional[int]:
+    return metadato.id if metadato is not None and metadato._solo_id else None
+
+
+class Unidad(_Metadato):
+    __slots__ = ('id', 'nombre', 'codigo', 'abrev')
+    _CLAVES = {'Id': 'id', 'Nombre': 'nombre', 'Codigo': 'codigo', 'Abrev': 'abrev'}
+
+
+class Escala(_Metadato):
+    __slots__ = ('id', 'nombre', 'factor', 'codigo', 'abrev')
+    _CLAVES = {'Id': 'id', 'Nombre': 'nombre', 'Factor': 'factor', 'Codigo': 'codigo', 'Abrev': 'abrev'}
+
+
+class TipoDato(_Metadato):
+    __slots__ = ('id', 'nombre', 'codigo')
+    _CLAVES = {'Id': 'id', 'Nombre': 'nombre', 'Codigo': 'codigo'}
+
+
+class Periodo(_Metadato):
+    __slots__ = ('id', 'valor', 'fk_periodicidad', 'codigo', 'nombre', 'nombre_largo')
+    _CLAVES = {'Id': 'id', 'Valor': 'valor', 'FK_Periodicidad': 'fk_periodicidad',
+               'Codigo': 'codigo', 'Nombre': 'nombre', 'Nombre_largo': 'nombre_largo'}
+
+
+class ValorVariable(_Metadato):
+    """Valor de una variable de la tabla (MetaData de la serie con tip=M)"""
+    __slots__ = ('id', 'fk_variable', 'nombre', 'codigo')
+    _CLAVES = {'Id': 'id', 'FK_Variable': 'fk_variable', 'Nombre': 'nombre', 'Codigo': 'codigo'}
+
+
+class Dato(_RegistroINE):
+    """Punto de una serie; TipoDato y Periodo son objetos internados compartidos"""
+
+    __slots__ = ('fecha', 'anyo', 'nombre_periodo', 'codigo_periodo', 'valor', 'secreto',
+                 'tipo_dato', 'periodo')
+    # Con det=0 el INE solo envía FK_TipoDato y FK_Periodo, igual que aquí
+    _CLAVES = {'Fecha': 'fecha', 'Anyo': 'anyo', 'NombrePeriodo': 'nombre_periodo',
+               'CodigoPeriodo': 'codigo_periodo', 'Valor': 'valor', 'Secreto': 'secreto',
+               'TipoDato': '_tipo_dato_api', 'FK_TipoDato': '_fk_tipo_dato',
+               'Periodo': '_periodo_api', 'FK_Periodo': '_fk_periodo'}
+
+    def __init__(self, fecha: Optional[int], anyo: Optional[int], nombre_periodo: Optional[str],
+                 codigo_periodo: Optional[str], valor: Optional[float], secreto: bool,
+                 tipo_dato: Optional[TipoDato], periodo: Optional[Periodo]):
+        self.fecha = fecha
+        self.anyo = anyo
+        self.nombre_periodo = nombre_periodo
+        self.codigo_periodo = codigo_periodo
+        self.valor = valor
+        self.secreto = secreto
+        self.tipo_dato = tipo_dato
+        self.periodo = periodo
+
+    _tipo_dato_api = property(lambda self: _detalle(self.tipo_dato))
+    _fk_tipo_dato = property(lambda self: _fk(self.tipo_dato))
+    _periodo_api = property(lambda self: _detalle(self.periodo))
+    _fk_periodo = property(lambda self: _fk(self.periodo))
+
+
+class Serie(_RegistroINE):
+    """Serie de DATOS_TABLA con sus datos como lista de Dato
+
+    metadatos es la lista de ValorVariable de la serie (solo con tip=M).
+    """
+
+    __slots__ = ('cod', 'nombre', 'unidad', 'escala', 'datos', 'metadatos')
+    _CLAVES = {'COD': 'cod', 'Nombre': 'nombre', 'Unidad': '_unidad_api', 'FK_Unidad': '_fk_unidad',
+               'Escala': '_escala_api', 'FK_Escala': '_fk_escala', 'MetaData': 'metadatos', 'Data': 'datos'}
+
+    def __init__(self, cod: Optional[str], nombre: str, unidad: Optional[Unidad],
+                 escala: Optional[Escala], datos: List[Dato],
+                 metadatos: Optional[List[ValorVariable]] = None):
+        self.cod = cod
+        self.nombre = nombre
+        self.unidad = unidad
+        self.escala = escala
+        self.datos = datos
+        self.metadatos = metadatos
+
+    _unidad_api = property(lambda self: _detalle(self.unidad))
+    _fk_unidad = property(lambda self: _fk(self.unidad))
+    _escala_api = property(lambda self: _detalle(self.escala))
+    _fk_escala = property(lambda self: _fk(self.escala))
+
+
+class DecodificadorSeries:
+    """Convierte las series del INE (diccionarios) en objetos Serie y Dato
+
+    Los objetos Unidad, Escala, TipoDato, Periodo y ValorVariable se internan:
+    todos los datos con el mismo periodo comparten una única instancia. También
+    se comparten los años, las fechas y los nombres de periodo repetidos entre
+    series.
+    """
+
+    def __init__(self):
+        self._metadatos: Dict[Tuple, _Metadato] = {}
+        self._valores: Dict[Any, Any] = {}
+
+    def _internar_metadato(self, clase, origen) -> Optional[_Metadato]:
+        if origen is None:
+            return None
+        if isinstance(origen, dict):
+            # El Id del INE identifica el metadato; sin Id se compara el contenido
+            identificador = origen.get('Id')
+            clave = (clase, tuple(origen.items()) if identificador is None else identificador, True)
+        else:
+            # det=0: solo el identificador (FK_TipoDato, FK_Periodo...)
+            clave = (clase, origen)
+            origen = {'Id': origen}
+        metadato = self._metadatos.get(clave)
+        if metadato is None:
+            metadato = self._metadatos[clave] = clase(origen)
+        return metadato
+
+    def decodificar(self, serie: Dict) -> Serie:
+        """Decodifica una serie (acepta respuestas con det=0 y det=2)"""
+        # Años, fechas y nombres de periodo se comparten a través de un diccionario
+        internar = self._valores.setdefault
+        internar_metadato = self._internar_metadato
+        datos = []
+        for punto in serie.get('Data') or ():
+            get = punto.get
+            fecha = get('Fecha')
+            anyo = get('Anyo')
+            nombre_periodo = get('NombrePeriodo')
+            codigo_periodo = get('CodigoPeriodo')
+            valor = get('Valor')
+            datos.append(Dato(
+                internar(fecha, fecha),
+                internar(anyo, anyo),
+                internar(nombre_periodo, nombre_periodo),
+                internar(codigo_periodo, codigo_periodo),
+                None if valor is None else float(valor),
+                bool(get('Secreto', False)),
+                internar_metadato(TipoDato, get('TipoDato', get('FK_TipoDato'))),
+                internar_metadato(Periodo, get('Periodo', get('FK_Periodo')))
+            ))
+        metadatos = serie.get('MetaData')
+        return Serie(
+            serie.get('COD'),
+            serie.get('Nombre', ''),
+            internar_metadato(Unidad, serie.get('Unidad', serie.get('FK_Unidad'))),
+            internar_metadato(Escala, serie.get('Escala', serie.get('FK_Escala'))),
+            datos,
+            None if metadatos is None else [internar_metadato(ValorVariable, m) for m in metadatos]
+        )
+
+    def iter_series(self, series: Iterable[Dict]) -> Iterator[Serie]:
+        """Decodifica de forma perezosa (por ejemplo sobre INEApiClient.iter_datos_tabla)"""
+        for serie in series:
+            yield self.decodificar(serie)
+
+
+def decodificar_series(series: Iterable[Dict]) -> List[Serie]:
+    """Decodifica una respuesta DATOS_TABLA completa con metadatos internados"""
+    return list(DecodificadorSeries().iter_series(series))
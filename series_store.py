@@ -0,0 +1,256 @@
+import math
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class SeriesStore:
+    """Tabla DATOS_TABLA en formato columnar
+
+    Los datos de todas las series se guardan en arrays contiguos:
+    - periodos: código entero (int32) de cada dato en la tabla de periodos
+    - valores: float64 (NaN cuando el INE no publica el valor)
+    - secreto: int8 (0/1)
+    - tipos: código int8 del TipoDato en la tabla de tipos
+    - inicios: posición del primer dato de cada serie (inicios[i]:inicios[i + 1])
+    El Nombre, el COD y la unidad se guardan una sola vez por serie, y los
+    campos de periodo (Fecha, Anyo, NombrePeriodo, Periodo...) una vez por
+    periodo distinto. Con tip=M, metadatos guarda la tupla de Ids de los
+    valores de las variables de cada serie y tabla_valores el MetaData de
+    cada Id; variables (nombre de variable -> FK_Variable) se asigna con los
+    metadatos de la tabla (INEApiClient.get_variables_tabla). Al iterar el store se obtienen vistas con .get() como
+    las series originales, de modo que DataProcessor lo acepta sin cambios.
+    """
+
+    # Campos de un dato que dependen solo del periodo
+    CAMPOS_PERIODO = ('Fecha', 'Anyo', 'NombrePeriodo', 'CodigoPeriodo', 'Periodo', 'FK_Periodo')
+
+    def __init__(self, nombres: List[str], cods: List[Optional[str]], unidades: np.ndarray,
+                 inicios: np.ndarray, periodos: np.ndarray, valores: np.ndarray,
+                 secreto: np.ndarray, tipos: np.ndarray, tabla_periodos: List[Dict],
+                 tabla_tipos: List[Any], tabla_unidades: List[Tuple[Any, Any]],
+                 metadatos: Optional[List[Optional[Tuple[int, ...]]]] = None,
+                 tabla_valores: Optional[Dict[int, Any]] = None,
+                 variables: Optional[Dict[str, int]] = None):
+        self.nombres = nombres
+        self.cods = cods
+        self.unidades = unidades
+        self.inicios = inicios
+        self.periodos = periodos
+        self.valores = valores
+        self.secreto = secreto
+        self.tipos = tipos
+        self.tabla_periodos = tabla_periodos
+        self.tabla_tipos = tabla_tipos
+        self.tabla_unidades = tabla_unidades
+        self.metadatos = metadatos if metadatos is not None else [None] * len(nombres)
+        self.tabla_valores = tabla_valores if tabla_valores is not None else {}
+        self.variables = variables
+
+    @classmethod
+    def desde_series(cls, series: Iterable[Any]) -> 'SeriesStore':
+        """Construye el store a partir de series del INE (dicts, objetos Serie o un iterador)"""
+        nombres: List[str] = []
+        cods: List[Optional[str]] = []
+        unidades = array('i')
+        inicios = array('q', [0])
+        periodos = array('i')
+        valores = array('d')
+        secreto = array('b')
+        tipos = array('b')
+        codigos_periodo: Dict[Tuple, int] = {}
+        tabla_periodos: List[Dict] = []
+        codigos_tipo: Dict[Any, int] = {}
+        tabla_tipos: List[Any] = []
+        codigos_unidad: Dict[Any, int] = {}
+        tabla_unidades: List[Tuple[Any, Any]] = []
+        metadatos: List[Optional[Tuple[int, ...]]] = []
+        tuplas_ids: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+        tabla_valores: Dict[int, Any] = {}
+        nan = math.nan
+
+        for serie in series:
+            unidad = (serie.get('Unidad', serie.get('FK_Unidad')), serie.get('Escala', serie.get('FK_Escala')))
+            clave_unidad = tuple(_identificador(m) for m in unidad)
+            codigo_unidad = codigos_unidad.get(clave_unidad)
+            if codigo_unidad is None:
+                codigo_unidad = codigos_unidad[clave_unidad] = len(tabla_unidades)
+                tabla_unidades.append(unidad)
+            nombres.append(serie.get('Nombre', ''))
+            cods.append(serie.get('COD'))
+            unidades.append(codigo_unidad)
+            valores_serie = serie.get('MetaData')
+            if valores_serie is None:
+                metadatos.append(None)
+            else:
+                ids = tuple(valor.get('Id') for valor in valores_serie)
+                if ids not in tuplas_ids:
+                    tuplas_ids[ids] = ids
+                    for valor in valores_serie:
+                        tabla_valores.setdefault(valor.get('Id'), valor)
+                metadatos.append(tuplas_ids[ids])
+
+            for punto in serie.get('Data') or ():
+                get = punto.get
+                periodo = get('Periodo', get('FK_Periodo'))
+                clave_periodo = (get('Fecha'), get('NombrePeriodo'), _identificador(periodo))
+                codigo = codigos_periodo.get(clave_periodo)
+                if codigo is None:
+                    codigo = codigos_periodo[clave_periodo] = len(tabla_periodos)
+                    tabla_periodos.append({
+                        campo: get(campo) for campo in cls.CAMPOS_PERIODO if get(campo) is not None
+                    })
+                tipo = get('TipoDato', get('FK_TipoDato'))
+                clave_tipo = _identificador(tipo)
+                codigo_tipo = codigos_tipo.get(clave_tipo)
+                if codigo_tipo is None:
+                    codigo_tipo = codigos_tipo[clave_tipo] = len(tabla_tipos)
+                    tabla_tipos.append(tipo)
+                valor = get('Valor')
+                periodos.append(codigo)
+                valores.append(nan if valor is None else float(valor))
+                secreto.append(1 if get('Secreto') else 0)
+                tipos.append(codigo_tipo)
+            inicios.append(len(valores))
+
+        return cls(
+            nombres, cods,
+            np.frombuffer(unidades, dtype=np.int32).copy(),
+            np.frombuffer(inicios, dtype=np.int64).copy(),
+            np.frombuffer(periodos, dtype=np.int32).copy(),
+            np.frombuffer(valores, dtype=np.float64).copy(),
+            np.frombuffer(secreto, dtype=np.int8).copy(),
+            np.frombuffer(tipos, dtype=np.int8).copy(),
+            tabla_periodos, tabla_tipos, tabla_unidades, metadatos, tabla_valores
+        )
+
+    def __len__(self) -> int:
+        return len(self.nombres)
+
+    def __iter__(self) -> Iterator['VistaSerie']:
+        for indice in range(len(self.nombres)):
+            yield VistaSerie(self, indice)
+
+    def __getitem__(self, indice: int) -> 'VistaSerie':
+        if not -len(self) <= indice < len(self):
+            raise IndexError(indice)
+        return VistaSerie(self, indice % len(self))
+
+    @property
+    def num_datos(self) -> int:
+        return len(self.valores)
+
+    def indice_serie(self) -> np.ndarray:
+        """Índice de la serie a la que pertenece cada dato (int32)"""
+        return np.repeat(np.arange(len(self.nombres), dtype=np.int32), np.diff(self.inicios))
+
+    def memoria(self) -> int:
+        """Bytes aproximados de los arrays y de las etiquetas por serie"""
+        arrays = (self.unidades, self.inicios, self.periodos, self.valores, self.secreto, self.tipos)
+        etiquetas = sum(len(nombre) for nombre in self.nombres) + 8 * len(self.nombres)
+        return sum(a.nbytes for a in arrays) + etiquetas
+
+    def a_series(self) -> List[Dict]:
+        """Reconstruye la lista de series con la forma de la API"""
+        return [vista.a_dict() for vista in self]
+
+
+def _a_api(valor: Any) -> Any:
+    """Convierte los metadatos tipados (series.py) a diccionarios de la API"""
+    return valor.a_dict() if hasattr(valor, 'a_dict') else valor
+
+
+def _identificador(metadato: Any) -> Any:
+    """Id de un metadato del INE (dict, objeto tipado o FK entero)"""
+    if metadato is None or isinstance(metadato, (int, str)):
+        return metadato
+    return metadato.get('Id')
+
+
+class VistaDato:
+    """Vista de solo lectura de un dato del store con las claves de la API"""
+
+    __slots__ = ('_store', '_posicion')
+
+    def __init__(self, store: SeriesStore, posicion: int):
+        self._store = store
+        self._posicion = posicion
+
+    def get(self, clave: str, defecto: Any = None) -> Any:
+        store = self._store
+        posicion = self._posicion
+        if clave == 'Valor':
+            valor = store.valores[posicion]
+            return defecto if math.isnan(valor) else float(valor)
+        if clave == 'Secreto':
+            return bool(store.secreto[posicion])
+        if clave in ('TipoDato', 'FK_TipoDato'):
+            tipo = store.tabla_tipos[store.tipos[posicion]]
+            if tipo is None or isinstance(tipo, int) != (clave == 'FK_TipoDato'):
+                return defecto
+            return tipo
+        return store.tabla_periodos[store.periodos[posicion]].get(clave, defecto)
+
+    def __getitem__(self, clave: str) -> Any:
+        valor = self.get(clave, KeyError)
+        if valor is KeyError:
+            raise KeyError(clave)
+        return valor
+
+    def a_dict(self) -> Dict:
+        campos = self._store.tabla_periodos[self._store.periodos[self._posicion]]
+        resultado = {clave: _a_api(valor) for clave, valor in campos.items()}
+        for clave in ('TipoDato', 'FK_TipoDato', 'Valor', 'Secreto'):
+            valor = self.get(clave)
+            if valor is not None or clave == 'Valor':
+                resultado[clave] = _a_api(valor)
+        return resultado
+
+
+class VistaSerie:
+    """Vista de solo lectura de una serie del store con las claves de la API"""
+
+    __slots__ = ('_store', '_indice')
+
+    def __init__(self, store: SeriesStore, indice: int):
+        self._store = store
+        self._indice = indice
+
+    def get(self, clave: str, defecto: Any = None) -> Any:
+        store = self._store
+        if clave == 'Nombre':
+            return store.nombres[self._indice]
+        if clave == 'COD':
+            return store.cods[self._indice] if store.cods[self._indice] is not None else defecto
+        if clave == 'MetaData':
+            ids = store.metadatos[self._indice]
+            return defecto if ids is None else [store.tabla_valores[i] for i in ids]
+        if clave == 'Data':
+            inicio, fin = store.inicios[self._indice], store.inicios[self._indice + 1]
+            return [VistaDato(store, posicion) for posicion in range(inicio, fin)]
+        if clave in ('Unidad', 'FK_Unidad', 'Escala', 'FK_Escala'):
+            unidad, escala = store.tabla_unidades[store.unidades[self._indice]]
+            metadato = unidad if clave.endswith('Unidad') else escala
+            if metadato is None or isinstance(metadato, int) != clave.startswith('FK_'):
+                return defecto
+            return metadato
+        return defecto
+
+    def __getitem__(self, clave: str) -> Any:
+        valor = self.get(clave, KeyError)
+        if valor is KeyError:
+            raise KeyError(clave)
+        return valor
+
+    def a_dict(self) -> Dict:
+        resultado = {}
+        for clave in ('COD', 'Nombre', 'Unidad', 'FK_Unidad', 'Escala', 'FK_Escala'):
+            valor = self.get(clave)
+            if valor is not None:
+                resultado[clave] = _a_api(valor)
+        metadatos = self.get('MetaData')
+        if metadatos is not None:
+            resultado['MetaData'] = [_a_api(valor) for valor in metadatos]
+        resultado['Data'] = [dato.a_dict() for dato in self.get('Data')]
+        return resultado
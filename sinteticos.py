@@ -0,0 +1,335 @@
+import argparse
+import json
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+from categorias import REGISTRO, TAMANOS_CENSO
+
+logger = logging.getLogger(__name__)
+
+ZONA_MADRID = ZoneInfo('Europe/Madrid')
+
+PROVINCIAS = [
+    'Albacete', 'Alicante/Alacant', 'Almería', 'Araba/Álava', 'Asturias', 'Ávila', 'Badajoz',
+    'Balears, Illes', 'Barcelona', 'Bizkaia', 'Burgos', 'Cáceres', 'Cádiz', 'Cantabria',
+    'Castellón/Castelló', 'Ciudad Real', 'Córdoba', 'Coruña, A', 'Cuenca', 'Gipuzkoa', 'Girona',
+    'Granada', 'Guadalajara', 'Huelva', 'Huesca', 'Jaén', 'León', 'Lleida', 'Lugo', 'Madrid',
+    'Málaga', 'Murcia', 'Navarra', 'Ourense', 'Palencia', 'Palmas, Las', 'Pontevedra',
+    'Rioja, La', 'Salamanca', 'Santa Cruz de Tenerife', 'Segovia', 'Sevilla', 'Soria',
+    'Tarragona', 'Teruel', 'Toledo', 'Valencia/València', 'Valladolid', 'Zamora', 'Zaragoza',
+    'Ceuta', 'Melilla'
+]
+
+# Municipios del padrón continuo (aproximadamente los de España)
+NUM_MUNICIPIOS = 8131
+
+# Forma de las series de cada categoría de DataProcessor:
+#   plantilla: Nombre de la serie; {geo} es la primera dimensión (municipio o provincia)
+#   dimensiones: valores de las demás dimensiones, en el orden de la plantilla
+#   periodicidad: FK_Periodicidad del INE (12 = anual, 3 = trimestral)
+#   periodos: periodos por serie a escala 1 (lo que pide hoy el cuadro de mando)
+#   cada: años entre periodos (censos decenales)
+#   variables: variable del INE de cada dimensión (GRUPOS_TABLA y MetaData con tip=M)
+CATEGORIAS = {
+    'demografia': {
+        'plantilla': '{geo}. {sexo}. Total habitantes. Personas. ',
+        'dimensiones': {'sexo': ['Total', 'Hombres', 'Mujeres']},
+        'variables': {'geo': 'Municipios', 'sexo': 'Sexo'},
+        'periodicidad': 12, 'periodos': 25, 'anyo_final': 2023,
+        'unidad': (3, 'Personas'), 'base': 2500, 'decimales': 0, 'prefijo_cod': 'DPOP'
+    },
+    'provincias': {
+        'plantilla': '{geo}. {sexo}. Total habitantes. Personas. ',
+        'dimensiones': {'sexo': ['Total', 'Hombres', 'Mujeres']},
+        'variables': {'geo': 'Provincias', 'sexo': 'Sexo'},
+        'periodicidad': 12, 'periodos': 4, 'anyo_final': 2023,
+        'unidad': (3, 'Personas'), 'base': 400000, 'decimales': 0, 'prefijo_cod': 'DPOP'
+    },
+    'municipios_habitantes': {
+        'plantilla': '{geo}, {rango}, Número de municipios',
+        'dimensiones': {'rango': [
+            'Total', 'Menos de 101 habitantes', 'De 101 a 500', 'De 501 a 1.000',
+            'De 1.001 a 2.000', 'De 2.001 a 5.000', 'De 5.001 a 10.000', 'De 10.001 a 20.000',
+            'De 20.001 a 50.000', 'De 50.001 a 100.000', 'De 100.001 a 500.000', 'Más de 500.000'
+        ]},
+        'variables': {'geo': 'Provincias', 'rango': 'Tamaño de los municipios'},
+        'periodicidad': 12, 'periodos': 4, 'anyo_final': 2023,
+        'unidad': (7, 'Número'), 'base': 40, 'decimales': 0, 'prefijo_cod': 'MUN'
+    },
+    'censo_agrario': {
+        # Como la tabla 51156: separada por comas, con comas también dentro de los valores
+        'plantilla': '{geo}, {tamano}, {cultivo}, {dato}, {medida}',
+        'dimensiones': {
+            'tamano': list(TAMANOS_CENSO),
+            'cultivo': ['SAU (sin huertos)', 'Tierra arable', 'Hortalizas, incluidos melones y fresas',
+                        'Viñedo (uva para vinos)'],
+            'dato': ['Nº explotaciones', 'Superficie (ha.)'],
+            'medida': ['Valor absoluto', 'Tamaño medio']
+        },
+        'variables': {'geo': 'Provincias', 'tamano': 'Tamaño de las explotaciones según SAU',
+                      'cultivo': 'Tipo de cultivo', 'dato': 'Tipo de dato', 'medida': 'Medida'},
+        'periodicidad': 12, 'periodos': 3, 'anyo_final': 2020, 'cada': 10,
+        'unidad': (7, 'Número'), 'base': 900, 'decimales': 0, 'prop_secreto': 0.05,
+        'prefijo_cod': 'CA'
+    },
+    'tasa_empleo': {
+        'plantilla': '{tasa}. {geo}. {sexo}. Total. ',
+        'dimensiones': {
+            'tasa': ['Tasa de actividad', 'Tasa de paro', 'Tasa de empleo'],
+            'sexo': ['Ambos sexos', 'Hombres', 'Mujeres']
+        },
+        'variables': {'geo': 'Provincias', 'tasa': 'Tasas', 'sexo': 'Sexo'},
+        'periodicidad': 3, 'periodos': 4, 'anyo_final': 2023,
+        'unidad': (135, 'Tasa'), 'base': 50, 'decimales': 2, 'prefijo_cod': 'EPA'
+    },
+    'tasa_nacimientos': {
+        'plantilla': '{geo}. Total. Tasa bruta de natalidad. ',
+        'dimensiones': {},
+        'variables': {'geo': 'Provincias'},
+        'periodicidad': 12, 'periodos': 4, 'anyo_final': 2023, 'provisional_ultimo': True,
+        'unidad': (135, 'Tasa'), 'base': 7.5, 'decimales': 2, 'prefijo_cod': 'MNP'
+    },
+    'tasa_defunciones': {
+        'plantilla': '{geo}. Total. Tasa bruta de mortalidad. ',
+        'dimensiones': {},
+        'variables': {'geo': 'Provincias'},
+        'periodicidad': 12, 'periodos': 4, 'anyo_final': 2023, 'provisional_ultimo': True,
+        'unidad': (135, 'Tasa'), 'base': 9.0, 'decimales': 2, 'prefijo_cod': 'MNPD'
+    }
+}
+
+# Id (FK_Variable) de las variables del INE usadas en las tablas sintéticas
+ID_VARIABLES = {
+    'Provincias': 115,
+    'Municipios': 19,
+    'Sexo': 18,
+    'Tamaño de los municipios': 1162,
+    'Tipo de cultivo': 2311,
+    'Tamaño de las explotaciones según SAU': 2312,
+    'Tasas': 3069,
+    'Tipo de dato': 3070,
+    'Medida': 3071
+}
+
+# Categoría de cada tabla para el servidor mock (ids del registro de categorias.py)
+CATEGORIA_POR_TABLA = {
+    info['tabla']: categoria for categoria, info in REGISTRO.items() if info.get('tabla') and categoria in CATEGORIAS
+}
+
+
+def _geografias(categoria: str) -> List[str]:
+    if categoria == 'demografia':
+        return [
+            f"{i % len(PROVINCIAS) + 1:02d}{i // len(PROVINCIAS) + 1:03d} Municipio {i + 1}"
+            for i in range(NUM_MUNICIPIOS)
+        ]
+    return list(PROVINCIAS)
+
+
+def _id_valor(variable: str, indice: int) -> int:
+    """Id del valor de una variable; las provincias conservan su número (1-52)"""
+    if variable == 'Provincias':
+        return indice + 1
+    return ID_VARIABLES[variable] * 100000 + indice + 1
+
+
+def variables_tabla(categoria: str) -> List[Dict]:
+    """Variables de la tabla de una categoría con sus valores (GRUPOS_TABLA y
+    VALORES_GRUPOSTABLA del servidor mock)"""
+    if categoria not in CATEGORIAS:
+        raise ValueError(f"Categoría no válida: {categoria}")
+    info = CATEGORIAS[categoria]
+    valores_dimension = dict(info['dimensiones'], geo=_geografias(categoria))
+    variables = []
+    for dimension, variable in info['variables'].items():
+        variables.append({
+            'Id': ID_VARIABLES[variable],
+            'Nombre': variable,
+            'valores': [
+                {'Id': _id_valor(variable, i), 'Fk_Variable': ID_VARIABLES[variable], 'Nombre': nombre}
+                for i, nombre in enumerate(valores_dimension[dimension])
+            ]
+        })
+    return variables
+
+
+def _combinaciones(info: Dict) -> List[Dict[str, str]]:
+    """Producto de los valores de las dimensiones distintas de la geografía"""
+    combinaciones = [{}]
+    for dimension, valores in info['dimensiones'].items():
+        combinaciones = [dict(c, **{dimension: valor}) for c in combinaciones for valor in valores]
+    return combinaciones
+
+
+def _periodos(info: Dict, num_periodos: int, det: int) -> List[Dict]:
+    """Campos de periodo de cada dato, del más reciente al más antiguo (como el INE)"""
+    periodicidad = info['periodicidad']
+    periodos = []
+    for n in range(num_periodos):
+        if periodicidad == 3:
+            anyo, numero = info['anyo_final'] - n // 4, 4 - n % 4
+            nombre, mes, id_periodo = f"{anyo}T{numero}", 3 * numero - 2, 18 + numero
+            codigo = f"T{numero}"
+        else:
+            anyo, numero = info['anyo_final'] - n * info.get('cada', 1), 1
+            nombre, mes, id_periodo, codigo = str(anyo), 1, 28, '01'
+        provisional = n == 0 and info.get('provisional_ultimo', False)
+        tipo = (2, 'Provisional', 'P') if provisional else (1, 'Definitivo', 'D')
+        campos = {
+            # Fecha: milisegundos de la medianoche de Madrid del inicio del periodo
+            'Fecha': int(datetime(anyo, mes, 1, tzinfo=ZONA_MADRID).timestamp() * 1000),
+            'Anyo': anyo,
+            'NombrePeriodo': nombre,
+            'CodigoPeriodo': nombre
+        }
+        if det >= 1:
+            campos['TipoDato'] = {'Id': tipo[0], 'Nombre': tipo[1], 'Codigo': tipo[2]}
+            campos['Periodo'] = {'Id': id_periodo, 'Valor': numero, 'FK_Periodicidad': periodicidad,
+                                 'Codigo': codigo}
+        else:
+            campos['FK_TipoDato'] = tipo[0]
+            campos['FK_Periodo'] = id_periodo
+        periodos.append(campos)
+    return periodos
+
+
+def num_series_categoria(categoria: str, escala: float = 1.0, geografia: Optional[str] = None) -> int:
+    """Número de series que genera una categoría a la escala indicada"""
+    info = CATEGORIAS[categoria]
+    geografias = 1 if geografia else len(_geografias(categoria))
+    return max(1, round(geografias * len(_combinaciones(info)) * escala))
+
+
+def iter_series(categoria: str, escala: float = 1.0, num_series: Optional[int] = None,
+                num_periodos: Optional[int] = None, det: int = 2, semilla: int = 0,
+                geografia: Optional[str] = None, metadatos: bool = False) -> Iterator[Dict]:
+    """Genera de forma perezosa las series DATOS_TABLA sintéticas de una categoría
+
+    La serie i depende solo de (semilla, categoría, i), así que el prefijo de
+    una generación a escala 10 coincide con la generación a escala 1.
+    Args:
+        categoria: Categoría de DataProcessor (clave de CATEGORIAS)
+        escala: Múltiplo del volumen actual de series (10 o 100 para pruebas de carga)
+        num_series: Número exacto de series (tiene prioridad sobre escala)
+        num_periodos: Periodos por serie (por defecto los de la categoría)
+        det: Nivel de detalle del INE; con det >= 1 Periodo, TipoDato y Unidad son objetos
+        semilla: Semilla de los valores
+        geografia: Restringe la primera dimensión a un valor (como el filtro tv)
+        metadatos: Añade a cada serie la lista MetaData de la API con tip=M
+    """
+    if categoria not in CATEGORIAS:
+        raise ValueError(f"Categoría no válida: {categoria}")
+    info = CATEGORIAS[categoria]
+    geografias = [geografia] if geografia else _geografias(categoria)
+    combinaciones = [dict(c, geo=geo) for geo in geografias for c in _combinaciones(info)]
+    total = num_series if num_series is not None else num_series_categoria(categoria, escala, geografia)
+    periodos = _periodos(info, num_periodos or info['periodos'], det)
+    id_unidad, nombre_unidad = info['unidad']
+    prop_secreto = info.get('prop_secreto', 0.0)
+    decimales = info['decimales']
+    # Posición de cada valor en su dimensión, para el Id de MetaData
+    posiciones = {
+        dimension: {valor: i for i, valor in enumerate(valores)}
+        for dimension, valores in dict(info['dimensiones'], geo=_geografias(categoria)).items()
+    }
+
+    for i in range(total):
+        combinacion = combinaciones[i % len(combinaciones)]
+        copia = i // len(combinaciones)
+        if copia:
+            # Más allá del volumen real se añaden geografías numeradas
+            combinacion = dict(combinacion, geo=f"{combinacion['geo']} ({copia + 1})")
+        rng = random.Random(f"{semilla}:{categoria}:{i}")
+        valor = info['base'] * rng.uniform(0.2, 1.8)
+        datos = []
+        for campos in periodos:
+            secreto = rng.random() < prop_secreto
+            dato = dict(campos)
+            dato['Valor'] = None if secreto else round(valor, decimales) if decimales else float(round(valor))
+            dato['Secreto'] = secreto
+            datos.append(dato)
+            # Hacia atrás en el tiempo con variaciones pequeñas
+            valor = max(valor * (1 + rng.gauss(0, 0.02)), 0.0)
+        serie = {
+            'COD': f"{info['prefijo_cod']}{i + 1}",
+            'Nombre': info['plantilla'].format(**combinacion),
+            'Data': datos
+        }
+        if metadatos:
+            serie['MetaData'] = []
+            for dimension, variable in info['variables'].items():
+                id_valor = _id_valor(variable, posiciones[dimension].get(combinacion[dimension], 0))
+                if dimension == 'geo' and copia:
+                    # Las geografías numeradas no existen en el INE: Ids fuera de rango
+                    id_valor += copia * 1000000000
+                serie['MetaData'].append({'Id': id_valor, 'FK_Variable': ID_VARIABLES[variable],
+                                          'Nombre': combinacion[dimension]})
+        if det >= 1:
+            serie['Unidad'] = {'Id': id_unidad, 'Nombre': nombre_unidad, 'Codigo': None, 'Abrev': None}
+            serie['Escala'] = {'Id': 1, 'Nombre': ' ', 'Factor': '1E0', 'Codigo': None, 'Abrev': None}
+        else:
+            serie['FK_Unidad'] = id_unidad
+            serie['FK_Escala'] = 1
+        yield serie
+
+
+def generar_datos_tabla(categoria: str, **kwargs) -> List[Dict]:
+    """Lista completa de series sintéticas (mismos argumentos que iter_series)"""
+    return list(iter_series(categoria, **kwargs))
+
+
+def escribir_datos_tabla(ruta: str, categoria: str, **kwargs) -> int:
+    """Escribe la respuesta sintética en un fichero JSON serie a serie
+    Returns:
+        Número de series escritas
+    """
+    total = 0
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for serie in iter_series(categoria, **kwargs):
+            if total:
+                f.write(',\n')
+            f.write(json.dumps(serie, ensure_ascii=False))
+            total += 1
+        f.write(']\n')
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generador de datos DATOS_TABLA sintéticos")
+    parser.add_argument('categoria', choices=list(CATEGORIAS))
+    parser.add_argument('--escala', type=float, default=1.0, help="Múltiplo del volumen actual")
+    parser.add_argument('--series', type=int, default=None, help="Número exacto de series")
+    parser.add_argument('--periodos', type=int, default=None, help="Periodos por serie")
+    parser.add_argument('--det', type=int, default=2, choices=(0, 1, 2))
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', default=None, help="Fichero JSON de salida")
+    parser.add_argument('--procesar', action='store_true',
+                        help="Mide DataProcessor.procesar_datos sobre los datos generados")
+    args = parser.parse_args(argv)
+
+    opciones = dict(escala=args.escala, num_series=args.series, num_periodos=args.periodos,
+                    det=args.det, semilla=args.semilla)
+    if args.salida:
+        total = escribir_datos_tabla(args.salida, args.categoria, **opciones)
+        print(f"{total} series escritas en {args.salida}")
+    if args.procesar or not args.salida:
+        from data_processor import DataProcessor
+
+        inicio = time.perf_counter()
+        datos = generar_datos_tabla(args.categoria, **opciones)
+        generado = time.perf_counter()
+        df = DataProcessor.procesar_datos(datos, args.categoria)
+        fin = time.perf_counter()
+        puntos = sum(len(serie['Data']) for serie in datos)
+        print(f"{args.categoria}: {len(datos)} series, {puntos} datos generados en {generado - inicio:.2f}s; "
+              f"procesados en {fin - generado:.2f}s ({len(df)} filas)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
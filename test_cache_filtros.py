@@ -0,0 +1,50 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from data_processor import DataProcessor
+from indice_filtros import CacheFiltros
+
+
+def _df(valores):
+    return pd.DataFrame({
+        'Provincia': pd.Series(['A', 'B', 'A', 'C'], dtype='category'),
+        'Valor': valores,
+    })
+
+
+class TestCacheFiltros(unittest.TestCase):
+
+    def setUp(self):
+        parche = mock.patch.object(DataProcessor, '_cache_filtros', CacheFiltros())
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_mismos_datos_reutilizan_resultado(self):
+        # Un nuevo procesado de los mismos datos (otro objeto) acierta en la caché
+        primero = DataProcessor.filtrar_datos(_df([1.0, 2.0, 3.0, 4.0]), {'Provincia': 'A'}, 'x', 'v')
+        segundo = DataProcessor.filtrar_datos(_df([1.0, 2.0, 3.0, 4.0]), {'Provincia': 'A'}, 'x', 'v')
+        pd.testing.assert_frame_equal(primero, segundo)
+        self.assertEqual(DataProcessor.estadisticas_filtros()['aciertos'], 1)
+
+    def test_misma_forma_distintos_valores(self):
+        # Misma categoría, versión, longitud, columnas y tipos pero otros valores
+        df1 = _df([1.0, 2.0, 3.0, 4.0])
+        df2 = _df([10.0, 20.0, 30.0, 40.0])
+        resultado1 = DataProcessor.filtrar_datos(df1, {'Provincia': 'A'}, 'x', 'v')
+        resultado2 = DataProcessor.filtrar_datos(df2, {'Provincia': 'A'}, 'x', 'v')
+        self.assertEqual(resultado1['Valor'].tolist(), [1.0, 3.0])
+        self.assertEqual(resultado2['Valor'].tolist(), [10.0, 30.0])
+
+    def test_distintas_etiquetas(self):
+        df1 = _df([1.0, 2.0, 3.0, 4.0])
+        df2 = df1.assign(Provincia=pd.Series(['B', 'A', 'C', 'A'], dtype='category'))
+        self.assertEqual(DataProcessor.filtrar_datos(df1, {'Provincia': 'A'}, 'x', 'v')['Valor'].tolist(),
+                         [1.0, 3.0])
+        self.assertEqual(DataProcessor.filtrar_datos(df2, {'Provincia': 'A'}, 'x', 'v')['Valor'].tolist(),
+                         [2.0, 4.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
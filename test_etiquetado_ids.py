@@ -0,0 +1,57 @@
+import unittest
+
+import pandas as pd
+
+import sinteticos
+from data_processor import DataProcessor
+
+
+def _variables(categoria: str):
+    """Nombre de variable -> FK_Variable, como INEApiClient.get_variables_tabla"""
+    return {variable['Nombre']: variable['Id'] for variable in sinteticos.variables_tabla(categoria)}
+
+
+class TestEtiquetadoIds(unittest.TestCase):
+    """El etiquetado por Ids de MetaData y el del Nombre dan el mismo DataFrame"""
+
+    CATEGORIAS = ['provincias', 'municipios_habitantes', 'censo_agrario', 'tasa_empleo',
+                  'tasa_nacimientos', 'tasa_defunciones']
+
+    @staticmethod
+    def _procesar(categoria: str):
+        datos = sinteticos.generar_datos_tabla(categoria, num_periodos=2, metadatos=True, det=2)
+        por_nombre = DataProcessor.procesar_datos(datos, categoria)
+        por_ids = DataProcessor.procesar_datos(datos, categoria, _variables(categoria))
+        return por_nombre, por_ids
+
+    def test_mismo_resultado(self):
+        for categoria in self.CATEGORIAS:
+            with self.subTest(categoria=categoria):
+                por_nombre, por_ids = self._procesar(categoria)
+                self.assertFalse(por_ids.empty)
+                pd.testing.assert_frame_equal(por_nombre.reset_index(drop=True),
+                                              por_ids.reset_index(drop=True))
+
+    def test_tasa_empleo_provincia(self):
+        # La provincia va detrás del tipo de tasa en el Nombre
+        por_nombre, por_ids = self._procesar('tasa_empleo')
+        for df in (por_nombre, por_ids):
+            self.assertTrue(set(df['Provincia'].astype(str)) <= set(sinteticos.PROVINCIAS))
+            self.assertEqual(set(df['Tipo_Tasa'].astype(str)), {'Actividad', 'Paro', 'Empleo'})
+
+    def test_censo_agrario_solo_total_cultivos(self):
+        # Las filas de cada cultivo ('Tierra arable'...) no se cuentan como el total (SAU)
+        por_nombre, por_ids = self._procesar('censo_agrario')
+        tamanos = len(sinteticos.CATEGORIAS['censo_agrario']['dimensiones']['tamano']) - 1
+        for df in (por_nombre, por_ids):
+            self.assertEqual(set(df['Tipo_Cultivo'].astype(str)), {'SAU (sin huertos)'})
+            self.assertNotIn('Total', set(df['Rango_Tamano'].astype(str)))
+            self.assertEqual(set(df['Medida'].astype(str)), {'Valor absoluto'})
+            # Las provincias con coma en el nombre se conservan enteras
+            self.assertIn('Balears, Illes', set(df['Provincia'].astype(str)))
+            por_provincia_y_periodo = df.groupby(['Provincia', 'Periodo', 'Tipo_Dato'], observed=True).size()
+            self.assertTrue((por_provincia_y_periodo <= tamanos).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
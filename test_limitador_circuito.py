@@ -0,0 +1,203 @@
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from api_client import CircuitBreaker, INEApiClient, LimitadorAgotadoError, TokenBucket
+
+URL = 'http://ine.test/wstempus/datos'
+
+
+def _respuesta(status: int, retry_after: str = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = b'{}'
+    if retry_after is not None:
+        response.headers['Retry-After'] = retry_after
+    return response
+
+
+class _SesionFalsa:
+    """Sesión que devuelve las respuestas indicadas y cuenta las peticiones"""
+
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+        self.peticiones = 0
+
+    def get(self, url, **kwargs):
+        self.peticiones += 1
+        return self.respuestas.pop(0) if len(self.respuestas) > 1 else self.respuestas[0]
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_rafaga_y_timeout(self):
+        limitador = TokenBucket(tasa=1, rafaga=2)
+        self.assertTrue(limitador.adquirir(0))
+        self.assertTrue(limitador.adquirir(0))
+        # Sin fichas, la siguiente llega en ~1s: no cabe en 0.1s
+        inicio = time.monotonic()
+        self.assertFalse(limitador.adquirir(0.1))
+        self.assertLess(time.monotonic() - inicio, 0.5)
+        self.assertGreaterEqual(limitador.estadisticas()['esperas'], 1)
+
+    def test_espera_reposicion(self):
+        limitador = TokenBucket(tasa=20, rafaga=1)
+        self.assertTrue(limitador.adquirir(0))
+        inicio = time.monotonic()
+        self.assertTrue(limitador.adquirir(1))
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.03)
+
+    def test_penalizar_y_recuperar(self):
+        limitador = TokenBucket(tasa=8, rafaga=4)
+        limitador.penalizar(0.2)
+        self.assertEqual(limitador.tasa, 4)
+        self.assertEqual(limitador.estadisticas()['penalizaciones'], 1)
+        # Durante el Retry-After no se concede turno
+        self.assertFalse(limitador.adquirir(0.1))
+        for _ in range(100):
+            limitador.registrar_exito()
+        self.assertEqual(limitador.tasa, limitador.tasa_maxima)
+
+    def test_penalizar_tasa_minima(self):
+        limitador = TokenBucket(tasa=16, rafaga=1)
+        for _ in range(10):
+            limitador.penalizar()
+        self.assertEqual(limitador.tasa, 1)
+
+    def test_parametros_invalidos(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(tasa=0, rafaga=1)
+        with self.assertRaises(ValueError):
+            TokenBucket(tasa=1, rafaga=0)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_abre_tras_umbral(self):
+        circuito = CircuitBreaker(umbral_fallos=3, tiempo_apertura=60)
+        for _ in range(2):
+            circuito.registrar_fallo()
+        self.assertEqual(circuito.estado, 'cerrado')
+        circuito.registrar_fallo()
+        self.assertEqual(circuito.estado, 'abierto')
+        self.assertFalse(circuito.permitir())
+
+    def test_exito_reinicia_fallos(self):
+        circuito = CircuitBreaker(umbral_fallos=2, tiempo_apertura=60)
+        circuito.registrar_fallo()
+        circuito.registrar_exito()
+        circuito.registrar_fallo()
+        self.assertEqual(circuito.estado, 'cerrado')
+
+    def test_semiabierto_una_sola_prueba(self):
+        circuito = CircuitBreaker(umbral_fallos=1, tiempo_apertura=0.05)
+        circuito.registrar_fallo()
+        time.sleep(0.06)
+        self.assertEqual(circuito.estado, 'semiabierto')
+        self.assertTrue(circuito.permitir())
+        self.assertFalse(circuito.permitir())
+
+    def test_prueba_con_exito_cierra(self):
+        circuito = CircuitBreaker(umbral_fallos=1, tiempo_apertura=0.05)
+        circuito.registrar_fallo()
+        time.sleep(0.06)
+        self.assertTrue(circuito.permitir())
+        circuito.registrar_exito()
+        self.assertEqual(circuito.estado, 'cerrado')
+        self.assertTrue(circuito.permitir())
+
+    def test_prueba_fallida_reabre(self):
+        circuito = CircuitBreaker(umbral_fallos=1, tiempo_apertura=0.05)
+        circuito.registrar_fallo()
+        time.sleep(0.06)
+        self.assertTrue(circuito.permitir())
+        circuito.registrar_fallo()
+        self.assertEqual(circuito.estado, 'abierto')
+        self.assertFalse(circuito.permitir())
+
+    def test_liberar_prueba(self):
+        circuito = CircuitBreaker(umbral_fallos=1, tiempo_apertura=0.05)
+        circuito.registrar_fallo()
+        time.sleep(0.06)
+        self.assertTrue(circuito.permitir())
+        circuito.liberar_prueba()
+        # Sigue semiabierto y admite una nueva prueba
+        self.assertEqual(circuito.estado, 'semiabierto')
+        self.assertTrue(circuito.permitir())
+
+
+class TestPeticionCircuito(unittest.TestCase):
+    """_peticion solo cuenta como fallo del circuito los errores del INE"""
+
+    def setUp(self):
+        parches = [
+            mock.patch.object(INEApiClient, '_circuito', CircuitBreaker(umbral_fallos=1, tiempo_apertura=0.05)),
+            mock.patch.object(INEApiClient, '_limitador', TokenBucket(tasa=100, rafaga=10)),
+        ]
+        for parche in parches:
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def _con_sesion(self, sesion: _SesionFalsa):
+        parche = mock.patch.object(INEApiClient, '_get_session', return_value=sesion)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _abrir_hasta_semiabierto(self):
+        INEApiClient._circuito.registrar_fallo()
+        time.sleep(0.06)
+        self.assertEqual(INEApiClient._circuito.estado, 'semiabierto')
+
+    def test_limitador_agotado_no_abre_el_circuito(self):
+        sesion = _SesionFalsa(_respuesta(200))
+        self._con_sesion(sesion)
+        INEApiClient._limitador = TokenBucket(tasa=0.1, rafaga=1)
+        INEApiClient._limitador.adquirir(0)
+        with self.assertRaises(LimitadorAgotadoError):
+            INEApiClient._peticion(URL, presupuesto=0.2)
+        self.assertEqual(sesion.peticiones, 0)
+        self.assertEqual(INEApiClient._circuito.estado, 'cerrado')
+        self.assertTrue(INEApiClient._circuito.permitir())
+
+    def test_limitador_agotado_libera_la_prueba(self):
+        self._con_sesion(_SesionFalsa(_respuesta(200)))
+        self._abrir_hasta_semiabierto()
+        INEApiClient._limitador = TokenBucket(tasa=0.1, rafaga=1)
+        INEApiClient._limitador.adquirir(0)
+        with self.assertRaises(LimitadorAgotadoError):
+            INEApiClient._peticion(URL, presupuesto=0.2)
+        self.assertEqual(INEApiClient._circuito.estado, 'semiabierto')
+        self.assertTrue(INEApiClient._circuito.permitir())
+
+    def test_429_no_cuenta_como_fallo(self):
+        self._con_sesion(_SesionFalsa(_respuesta(429)))
+        response = INEApiClient._peticion(URL, presupuesto=0.05)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(INEApiClient._circuito.estado, 'cerrado')
+        self.assertEqual(INEApiClient._limitador.estadisticas()['penalizaciones'], 1)
+
+    def test_5xx_abre_el_circuito(self):
+        self._con_sesion(_SesionFalsa(_respuesta(503)))
+        INEApiClient._peticion(URL, presupuesto=0.05)
+        self.assertEqual(INEApiClient._circuito.estado, 'abierto')
+
+    def test_prueba_semiabierta_con_429_libera_el_turno(self):
+        self._con_sesion(_SesionFalsa(_respuesta(429)))
+        self._abrir_hasta_semiabierto()
+        response = INEApiClient._peticion(URL, presupuesto=0.05)
+        self.assertEqual(response.status_code, 429)
+        # Ni se cierra ni se reabre, y queda libre para la siguiente prueba
+        self.assertEqual(INEApiClient._circuito.estado, 'semiabierto')
+        self.assertTrue(INEApiClient._circuito.permitir())
+
+    def test_prueba_semiabierta_con_exito_cierra(self):
+        self._con_sesion(_SesionFalsa(_respuesta(200)))
+        self._abrir_hasta_semiabierto()
+        self.assertEqual(INEApiClient._peticion(URL, presupuesto=1).status_code, 200)
+        self.assertEqual(INEApiClient._circuito.estado, 'cerrado')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import unittest
+
+import categorias
+from cassette import cargar_muestra
+from data_processor import DataProcessor
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Muestras de la API pegadas en el repositorio
+MUESTRA_EPA_ALMERIA = 'Pasted--COD-EPA11365-Nombre-Tasa-de-actividad-Almer-a-Ambos-sexos-Total-U-1733149691670.txt'
+MUESTRA_EPA_NACIONAL = 'Pasted--COD-EPA77038-Nombre-Tasa-de-actividad-Ambos-sexos-Total-Nacional-Total--1733212123057.txt'
+MUESTRA_DPOP = 'Pasted--COD-DPOP160-Nombre-Albacete-Total-Total-habitantes-Personas-Unida-1732805255023.txt'
+MUESTRAS_CENSO = (
+    'Pasted--Nombre-Teruel-Todas-las-explotaciones-SAU-sin-huertos-N-explotaciones-Valor-absoluto-D-1733135696263.txt',
+    'Pasted--Nombre-Teruel-Todas-las-explotaciones-SAU-sin-huertos-N-explotaciones-Valor-absoluto-D-1733136313111.txt',
+)
+
+
+def _muestra(fichero: str):
+    return cargar_muestra(os.path.join(DIRECTORIO, fichero))
+
+
+def _etiquetas(categoria: str, nombre: str):
+    """Etiquetas del Nombre como diccionario columna -> valor (None si se descarta)"""
+    compilada = categorias.compilada(categoria)
+    etiquetas = compilada.etiquetar(nombre)
+    return None if etiquetas is None else dict(zip(compilada.columnas, etiquetas))
+
+
+class TestProvincias(unittest.TestCase):
+
+    def test_muestra(self):
+        df = DataProcessor.procesar_datos(_muestra(MUESTRA_DPOP), 'provincias')
+        self.assertEqual(set(df['Provincia'].astype(str)), {'Albacete'})
+        self.assertEqual(set(df['Genero'].astype(str)), {'Total', 'HOMBRE', 'MUJER'})
+        # Una fila por sexo y año
+        self.assertFalse(df.duplicated(['Genero', 'Periodo']).any())
+
+
+class TestCensoAgrario(unittest.TestCase):
+    """Nombre "Teruel, Tamaño, Cultivo, Tipo de dato, Medida" de la tabla 51156, con
+    comas dentro del tamaño ('De 1 a 1,99 ha.') y del cultivo"""
+
+    def test_nombres(self):
+        casos = {
+            'Teruel, Todas las explotaciones, SAU (sin huertos), Superficie (ha.), Valor absoluto':
+                ('Teruel', 'Total', 'SAU (sin huertos)', 'Superficie (ha.)', 'Valor absoluto'),
+            'Teruel, De 1 a 1,99 ha., Hortalizas, incluidos melones y fresas, Nº explotaciones, Valor absoluto':
+                ('Teruel', 'De 1 a 1,99 ha.', 'Hortalizas, incluidos melones y fresas',
+                 'Nº explotaciones', 'Valor absoluto'),
+            'Teruel, De 100 ha. o más, Trigo duro, Nº explotaciones, Valor absoluto':
+                ('Teruel', 'De 100 ha. o más', 'Trigo duro', 'Nº explotaciones', 'Valor absoluto'),
+            'Balears, Illes, Menor de 1 ha., Olivar, Superficie (ha.), Valor absoluto':
+                ('Balears, Illes', 'Menor de 1 ha.', 'Olivar', 'Superficie (ha.)', 'Valor absoluto'),
+        }
+        columnas = categorias.compilada('censo_agrario').columnas
+        for nombre, esperado in casos.items():
+            with self.subTest(nombre=nombre):
+                self.assertEqual(_etiquetas('censo_agrario', nombre), dict(zip(columnas, esperado)))
+
+    def test_tamano_medio_descartado(self):
+        self.assertIsNone(_etiquetas('censo_agrario',
+                                     'Teruel, De 100 ha. o más, Trigo duro, Nº explotaciones, Tamaño medio'))
+
+    def test_muestras(self):
+        for fichero in MUESTRAS_CENSO:
+            with self.subTest(fichero=fichero):
+                series = _muestra(fichero)
+                etiquetadas = [_etiquetas('censo_agrario', serie['Nombre']) for serie in series]
+                absolutas = [e for e in etiquetadas if e is not None]
+                # Se descartan exactamente las series de tamaño medio
+                self.assertEqual(len(absolutas),
+                                 sum(serie['Nombre'].endswith('Valor absoluto') for serie in series))
+                self.assertEqual({e['Provincia'] for e in absolutas}, {'Teruel'})
+                self.assertEqual({e['Rango_Tamano'] for e in absolutas}, set(categorias.TAMANOS_CENSO.values()))
+                self.assertEqual({e['Tipo_Dato'] for e in absolutas}, {'Nº explotaciones', 'Superficie (ha.)'})
+                cultivos = {e['Tipo_Cultivo'] for e in absolutas}
+                self.assertIn('SAU (sin huertos)', cultivos)
+                self.assertIn('Hortalizas, incluidos melones y fresas', cultivos)
+                # Ningún cultivo se queda con un trozo del tamaño o de la medida
+                self.assertFalse({c for c in cultivos if 'ha.' in c or c.startswith(('Nº', '99'))})
+
+
+class TestTasaEmpleo(unittest.TestCase):
+    """La provincia va detrás del tipo de tasa; en la serie nacional, detrás del sexo"""
+
+    def test_nombre_provincial(self):
+        self.assertEqual(_etiquetas('tasa_empleo', 'Tasa de actividad. Almería. Ambos sexos. Total. '),
+                         {'Provincia': 'Almería', 'Tipo_Tasa': 'Actividad', 'Genero': 'Ambos sexos'})
+
+    def test_nombre_nacional(self):
+        self.assertEqual(_etiquetas('tasa_empleo', 'Tasa de actividad. Ambos sexos. Total Nacional. Total. '),
+                         {'Provincia': 'Total Nacional', 'Tipo_Tasa': 'Actividad', 'Genero': 'Ambos sexos'})
+
+    def test_muestras(self):
+        for fichero, provincia in ((MUESTRA_EPA_ALMERIA, 'Almería'), (MUESTRA_EPA_NACIONAL, 'Total Nacional')):
+            with self.subTest(fichero=fichero):
+                df = DataProcessor.procesar_datos(_muestra(fichero), 'tasa_empleo')
+                self.assertFalse(df.empty)
+                self.assertEqual(set(df['Provincia'].astype(str)), {provincia})
+                self.assertEqual(set(df['Tipo_Tasa'].astype(str)), {'Actividad'})
+                self.assertEqual(set(df['Genero'].astype(str)), {'Ambos sexos'})
+
+
+class TestMunicipiosHabitantes(unittest.TestCase):
+    """Nombre "Provincia, Rango, Número de municipios" (tabla 61399); no hay muestra
+    pegada de esta tabla, así que se usan nombres con ese formato"""
+
+    def test_provincia_simple(self):
+        self.assertEqual(_etiquetas('municipios_habitantes', 'Teruel, De 101 a 500, Número de municipios'),
+                         {'Provincia': 'Teruel', 'Rango_Habitantes': 'De 101 a 500'})
+
+    def test_provincia_con_separador(self):
+        # 'unir' hasta -2 conserva la coma del nombre oficial de la provincia
+        for provincia in ('Balears, Illes', 'Coruña, A', 'Palmas, Las', 'Rioja, La'):
+            with self.subTest(provincia=provincia):
+                self.assertEqual(
+                    _etiquetas('municipios_habitantes', f'{provincia}, Más de 500.000, Número de municipios'),
+                    {'Provincia': provincia, 'Rango_Habitantes': 'Más de 500.000'}
+                )
+
+    def test_total(self):
+        self.assertEqual(_etiquetas('municipios_habitantes', 'Madrid, Total, Número de municipios'),
+                         {'Provincia': 'Madrid', 'Rango_Habitantes': 'Total'})
+
+    def test_total_nacional(self):
+        # 'Total' de 'Total Nacional' no es el rango
+        self.assertEqual(_etiquetas('municipios_habitantes', 'Total Nacional, De 501 a 1.000, Número de municipios'),
+                         {'Provincia': 'Total Nacional', 'Rango_Habitantes': 'De 501 a 1.000'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,6 +27,20 @@ def _format_fecha(fecha_str: str) -> str:
     except:
         return fecha_str
 
+def format_antiguedad(segundos: float) -> str:
+    """Formatea la antigüedad de unos datos en un texto legible"""
+    if segundos is None:
+        return "Antigüedad desconocida"
+    minutos = int(segundos // 60)
+    if minutos < 1:
+        return "hace menos de un minuto"
+    if minutos < 60:
+        return f"hace {minutos} min"
+    horas = minutos // 60
+    if horas < 48:
+        return f"hace {horas} h"
+    return f"hace {horas // 24} días"
+
 def format_nombre_operacion(operacion: Dict) -> str:
     """Formatea el nombre de una operación para mostrar"""
     if not isinstance(operacion, dict):